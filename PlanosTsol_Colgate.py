@@ -3,13 +3,25 @@ import pandas as pd
 import os
 from datetime import datetime
 import logging
-import re
 import json
 import zipfile
 import ftplib
 import calendar
 import shutil
 
+from tsol_cache import CacheBinaria
+from tsol_escritor import SalidaTsol, FORMATO_FECHA, FORMATOS_VENTAS
+from tsol_lectores import (
+    leer_ventas_periodo, leer_intercliente, leer_maestro,
+    COLUMNAS_INTERASESOR, COLUMNAS_INTERSUPERVISOR, COLUMNAS_INTERCIUDAD
+)
+from tsol_normalizacion import normalizar_por_valor
+from tsol_proveedores import FiltroProveedores
+from tsol_ventas import (
+    REGLAS_SIGNO, REGLAS_TIPOS, REGLAS_TOTAL, aplicar_reglas, compactar_ventas, configurar_memoria,
+    desde_centavos, fechas_de, sumar_por_claves
+)
+
 
 # Configuración del logging
 logging.basicConfig(
@@ -20,6 +32,13 @@ logging.basicConfig(
 logger = logging.getLogger()
 
 class VentaProcessor:
+    # Columnas de la hoja 'infoventas' que usa el proceso (además de 'Proveedor' para el filtro)
+    COLUMNAS_VENTAS = [
+        'Cod. cliente', 'Cod. vendedor', 'Cod. productto',
+        'Fecha', 'Fac. numero', 'Cantidad', 'Vta neta',
+        'Tipo', 'Costo', 'Unidad', 'Pedido'
+    ]
+
     def __init__(self, config_path):
         self.config = self._cargar_configuracion(config_path)
         self.ventas_path = self.config.get('ventas_path')
@@ -29,6 +48,10 @@ class VentaProcessor:
         self.ano = None
         self.proveedores = []
         self.filtered_data = None
+        # Caché binaria de insumos (config 'cache')
+        self.cache = CacheBinaria.desde_config(self.config)
+        # Destino de los TXT: carpeta de salida o directamente el ZIP (config 'salida')
+        self.salida = SalidaTsol.desde_config(self.config, self.output_folder)
         self._crear_carpeta_salida()
         if self.proveedores_file:
             self._cargar_proveedores()
@@ -84,39 +107,40 @@ class VentaProcessor:
         self.verificar_archivo(self.ventas_path)
 
         try:
-            # Cargar todos los datos primero para determinar la fecha más reciente
-            all_data = pd.read_excel(
+            # Leer solo las filas del mes más reciente y de los proveedores configurados: los filtros
+            # se aplican mientras se recorre la hoja (desde la caché si el archivo no ha cambiado)
+            columnas_lectura = self.COLUMNAS_VENTAS + ['Proveedor']
+            periodo = (self.ano, self.mes) if self.ano and self.mes else None
+            if not self.proveedores:
+                logger.warning("No se especificaron proveedores para filtrar.")
+            self.filtered_data = self.cache.obtener(
+                'infoventas',
                 self.ventas_path,
-                sheet_name='infoventas',
-                parse_dates=['Fecha']
+                lambda: leer_ventas_periodo(
+                    self.ventas_path,
+                    columnas_lectura,
+                    proveedores=self.proveedores,
+                    periodo=periodo,
+                    hoja='infoventas'
+                ),
+                parametros={'columnas': columnas_lectura, 'proveedores': self.proveedores, 'periodo': periodo}
             )
-            
-            # Encontrar la fecha más reciente en los datos
-            if all_data.empty or 'Fecha' not in all_data.columns:
+
+            # Fecha más reciente de todo el archivo (calculada durante la lectura)
+            fecha_maxima = self.filtered_data.attrs.get('fecha_maxima')
+            if fecha_maxima is None or pd.isna(pd.Timestamp(fecha_maxima)):
                 logger.error("No se encontraron datos o la columna 'Fecha' no existe")
                 raise ValueError("No se encontraron datos válidos en el archivo Excel")
-            
-            fecha_maxima = all_data['Fecha'].max()
-            self.mes = fecha_maxima.month
-            self.ano = fecha_maxima.year
-            
+
+            fecha_maxima = pd.Timestamp(fecha_maxima)
+            if periodo is None:
+                self.ano, self.mes = fecha_maxima.year, fecha_maxima.month
+
             logger.info(f"Fecha más reciente encontrada: {fecha_maxima}")
             logger.info(f"Mes y año determinados: Mes {self.mes}, Año {self.ano}")
-            
-            # Ahora filtrar por el período determinado
-            self.filtered_data = all_data[
-                (all_data['Fecha'].dt.month == self.mes) &
-                (all_data['Fecha'].dt.year == self.ano)
-            ]
             logger.info(f"Datos filtrados por período: Mes {self.mes}, Año {self.ano}.")
-
-            # Filtrar por proveedores si están definidos
             if self.proveedores:
-                regex_pattern = '|'.join([re.escape(proveedor) for proveedor in self.proveedores])
-                self.filtered_data = self.filtered_data[self.filtered_data['Proveedor'].str.contains(regex_pattern, case=False, na=False)]
                 logger.info(f"Datos filtrados por proveedores: {self.proveedores}")
-            else:
-                logger.warning("No se especificaron proveedores para filtrar.")
         except Exception as e:
             logger.error(f"Error al cargar y filtrar los datos: {e}")
             raise
@@ -127,11 +151,7 @@ class VentaProcessor:
             raise ValueError("Los datos no están cargados o filtrados. Ejecute 'cargar_y_filtrar_datos_por_periodo' primero.")
 
         try:
-            columnas_requeridas = [
-                'Cod. cliente', 'Cod. vendedor', 'Cod. productto',
-                'Fecha', 'Fac. numero', 'Cantidad', 'Vta neta',
-                'Tipo', 'Costo', 'Unidad', 'Pedido'
-            ]
+            columnas_requeridas = self.COLUMNAS_VENTAS
 
             # Validar columnas requeridas
             for columna in columnas_requeridas:
@@ -154,45 +174,15 @@ class VentaProcessor:
                 'Pedido': 'Numero Único de Pedido'
             })
 
-            # Convertir tipos y ajustar formato
-            self.filtered_data['Código Vendedor'] = self.filtered_data['Código Vendedor'].astype(str)
-            self.filtered_data['Código Producto (Sku)'] = self.filtered_data['Código Producto (Sku)'].astype(str).str.strip().str.upper()
-            self.filtered_data['Fecha'] = self.filtered_data['Fecha'].dt.strftime('%Y/%m/%d')
-            self.filtered_data['Numero Documento'] = self.filtered_data['Numero Documento'].astype(str)
-            self.filtered_data['Tipo'] = self.filtered_data['Tipo'].astype(str)
-            self.filtered_data['Cantidad'] = self.filtered_data['Cantidad'].astype(int)
-            self.filtered_data['Valor Total Item Vendido'] = pd.to_numeric(self.filtered_data['Valor Total Item Vendido'], errors='coerce').round(2)
-            self.filtered_data['Costo'] = pd.to_numeric(self.filtered_data['Costo'], errors='coerce').round(2)
-            # Reemplazar guiones en Código Cliente con "999"
-            self.filtered_data['Código Cliente'] = self.filtered_data['Código Cliente'].apply(
-                lambda x: str(x).replace('-', '999')
-            )
-            self.filtered_data_total = self.filtered_data.copy()
-            # Limpieza de la columna 'Código Cliente'
-            self.filtered_data_total['Código Cliente'] = (
-                self.filtered_data_total['Código Cliente']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-                .str.replace('"', '')
-                .str.replace("'", '')
-            )
+            # Tipos y formato con reglas vectorizadas (tsol_ventas); 'Fecha' se conserva como fecha
+            # (AAAAMMDD entero tras compactar) y se formatea al escribir ventas.txt y el listado de facturas
+            ventas = compactar_ventas(aplicar_reglas(self.filtered_data, REGLAS_TIPOS, 'tipos'))
 
-
-            # Limpieza de la columna 'Código Producto (Sku)'
-            self.filtered_data_total['Código Producto (Sku)'] = (
-                self.filtered_data_total['Código Producto (Sku)']
-                .astype(str)
-                .str.strip()
-                .str.replace('"', '')
-                .str.replace("'", '')
-            )
-            # Alternativa: Multiplicar por -1 para garantizar que los valores sean positivos cuando Tipo == 1
-            mask = self.filtered_data['Tipo'] == '1'
-            self.filtered_data.loc[mask, 'Cantidad'] = self.filtered_data.loc[mask, 'Cantidad'].apply(lambda x: x * -1 if x < 0 else x)
-            self.filtered_data.loc[mask, 'Valor Total Item Vendido'] = self.filtered_data.loc[mask, 'Valor Total Item Vendido'].apply(lambda x: x * -1 if x < 0 else x)
-            self.filtered_data.loc[mask, 'Costo'] = self.filtered_data.loc[mask, 'Costo'].apply(lambda x: x * -1 if x < 0 else x)
-            
+            # Una sola copia física de las ventas del mes: las dos variantes son columnas superpuestas
+            # sobre el mismo frame compacto (con memoria ligera las demás columnas se comparten)
+            self.filtered_data_total = aplicar_reglas(ventas, REGLAS_TOTAL, 'total')
+            # Cantidades, valores y costos positivos cuando Tipo == 1
+            self.filtered_data = aplicar_reglas(ventas, REGLAS_SIGNO, 'signo')
 
             logger.info("Datos procesados exitosamente.")
         except Exception as e:
@@ -211,23 +201,13 @@ class VentaProcessor:
             output_path_excel = os.path.join(self.output_folder, 'ventas.xlsx')
 
             # Guardar el archivo TXT
-            txt_data = self.filtered_data.copy()
-            txt_data['Valor Total Item Vendido'] = txt_data['Valor Total Item Vendido'].map(
-                lambda x: f"{x:.2f}".replace('.', ',')
-            )
-            txt_data['Costo'] = txt_data['Costo'].map(
-                lambda x: f"{x:.2f}".replace('.', ',')
-            )
+            # Fecha y valores se formatean al escribir (AAAA/MM/DD y dos decimales con coma)
             txt_columns = [
                 'Código Cliente', 'Código Vendedor', 'Código Producto (Sku)',
                 'Fecha', 'Numero Documento', 'Cantidad',
                 'Valor Total Item Vendido', 'Tipo', 'Costo', 'Unidad de Medida', 'Numero Único de Pedido'
             ]
-            encabezado = '{'.join(txt_columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as file:
-                file.write(encabezado + '\n')
-                for _, row in txt_data[txt_columns].iterrows():
-                    file.write('{'.join(row.astype(str)) + '\n')
+            self.salida.escribir_txt(self.filtered_data, output_path_txt, columnas=txt_columns, formatos=FORMATOS_VENTAS)
             logger.info(f"Archivo TXT guardado exitosamente en: {output_path_txt}")
 
             # Guardar el archivo Excel
@@ -253,27 +233,23 @@ class VentaProcessor:
                 raise KeyError(f"Las siguientes columnas están ausentes: {', '.join(missing_columns)}")
 
             # Agrupar datos por las columnas requeridas
-            facturas_resumen = self.filtered_data_total.groupby(
-                ['Código Cliente', 'Código Vendedor', 'Fecha', 'Numero Documento']
-            ).agg(
-                Valor_Total_Factura=('Valor Total Item Vendido', 'sum'),
-                Valor_Facturado_Casa_Comercial = ('Valor Total Item Vendido', 'sum')
-            ).reset_index()
+            facturas_resumen, total_factura = sumar_por_claves(
+                self.filtered_data_total,
+                ['Código Cliente', 'Código Vendedor', 'Fecha', 'Numero Documento'],
+                'Valor Total Item Vendido'
+            )
 
-            # Convertir valores a formato con dos decimales
-            facturas_resumen['Valor_Total_Factura'] = facturas_resumen['Valor_Total_Factura'].round(2)
-            facturas_resumen['Valor_Facturado_Casa_Comercial'] = facturas_resumen['Valor_Facturado_Casa_Comercial'].round(2)
+            # Convertir la suma (en centavos) a formato con dos decimales, una vez para ambas columnas
+            valor_factura = desde_centavos(total_factura).round(2)
+            facturas_resumen['Valor_Total_Factura'] = valor_factura
+            facturas_resumen['Valor_Facturado_Casa_Comercial'] = valor_factura
 
             # Ruta para los archivos de salida
             output_txt = os.path.join(self.output_folder, 'Listado de Facturas.txt')
             output_excel = os.path.join(self.output_folder, 'Listado de Facturas.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(facturas_resumen.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in facturas_resumen.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(facturas_resumen, output_txt, formatos={'Fecha': 'fecha'})
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -291,7 +267,7 @@ class VentaProcessor:
 
         try:
             # Calcular el total antes de cualquier conversión
-            total_valor_venta = self.filtered_data_total['Valor Total Item Vendido'].sum()
+            total_valor_venta = desde_centavos(self.filtered_data_total['Valor Total Item Vendido']).sum()
 
             # Crear el DataFrame con los resultados
             totales_control = pd.DataFrame({
@@ -304,11 +280,7 @@ class VentaProcessor:
             output_excel = os.path.join(self.output_folder, 'Totales de Control.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(totales_control.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in totales_control.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(totales_control, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -328,14 +300,9 @@ class VentaProcessor:
             # Verificar que el archivo exista
             self.verificar_archivo(interasesor_path)
 
-            # Cargar los datos de interasesor.txt
-            interasesor_data = pd.read_csv(
-                interasesor_path,
-                sep='{',
-                engine='python',
-                encoding='latin1',  # Codificación alternativa para evitar errores
-                names=["Codigo", "Documento", "Nombre", "Apellido", "Telefono", "Direccion",
-                       "Cargo", "Portafolio", "Estado", "Codigo supervisor", "Codigo bodega"]
+            # Cargar solo los asesores con ventas en el período (el cruce se repite más abajo)
+            interasesor_data = leer_maestro(
+                interasesor_path, COLUMNAS_INTERASESOR, claves=self.filtered_data_total['Código Vendedor'].unique()
             )
 
             # Filtrar solo los vendedores activos
@@ -365,11 +332,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Vendedores.txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(self.vendedores_final.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in self.vendedores_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(self.vendedores_final, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -389,22 +352,15 @@ class VentaProcessor:
             # Verificar que el archivo exista
             self.verificar_archivo(intersupervisor_path)
 
-            # Cargar los datos de intersupervisor.txt
-            intersupervisor_data = pd.read_csv(
-                intersupervisor_path,
-                sep='{',
-                engine='python',
-                encoding='latin1',  # Codificación alternativa para evitar errores
-                names=["Codigo", "Documento", "Nombre", "Apellido", "Telefono", "Direccion",
-                    "Cargo", "Portafolio", "Estado", "Codigo bodega"]
-            )
+            # Obtener los códigos de supervisor del archivo de vendedores
+            supervisores_codigo = self.vendedores_final['Código Supervisor'].unique()
+
+            # Cargar solo los supervisores de esos vendedores
+            intersupervisor_data = leer_maestro(intersupervisor_path, COLUMNAS_INTERSUPERVISOR, claves=supervisores_codigo)
 
             # Filtrar solo los supervisores activos
             intersupervisor_data = intersupervisor_data[intersupervisor_data['Estado'].str.contains("Activado", na=False)]
 
-            # Obtener los códigos de supervisor del archivo de vendedores
-            supervisores_codigo = self.vendedores_final['Código Supervisor'].unique()
-
             # Filtrar los supervisores en base a los códigos de supervisor
             supervisores_final = intersupervisor_data[intersupervisor_data['Codigo'].isin(supervisores_codigo)]
 
@@ -424,11 +380,7 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'Supervisores.txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(supervisores_final.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in supervisores_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(supervisores_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -455,11 +407,7 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'Tipos De Negocio.txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(tipos_negocio.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in tipos_negocio.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(tipos_negocio, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -483,35 +431,31 @@ class VentaProcessor:
             productos_data = pd.ExcelFile(productos_path)
             productos_df = productos_data.parse('Productos EQ')
 
-            # Filtrar las columnas necesarias
-            productos_df = productos_df[['Pro_Cod', 'Producto', 'ALTERNO']].rename(columns={
-                'Pro_Cod': 'Código',
-                'Producto': 'Nombre',
-                'ALTERNO': 'Código De Barras'
-            })
-
-            # Convertir las columnas relevantes a texto y limpiar los datos
-            productos_df['Código'] = productos_df['Código'].astype(str).str.strip().str.split('.').str[0]
-            productos_df['Código De Barras'] = productos_df['Código De Barras'].astype(str).str.strip()
+            # Convertir los códigos a texto y limpiar los datos
+            codigos = normalizar_por_valor(
+                productos_df['Pro_Cod'], lambda valores: valores.astype(str).str.strip().str.split('.').str[0]
+            )
 
             # Filtrar los productos según las nuevas restricciones
-            productos_final = productos_df[
-                (productos_df['Código'].str.len() <= 5) &  # Máximo 5 caracteres
-                (productos_df['Código'].str[:2] == '23')  # Empieza con "23"
-            ].copy()
-
-            # Agregar las columnas estáticas
-            productos_final.loc[:, 'Tipo Referencia'] = 'RG'
-            productos_final.loc[:, 'Tipo De Unidad'] = 'UND'
-            productos_final.loc[:, 'Compañía'] = productos_final['Código De Barras']
-
-            # Seleccionar y ordenar columnas
-            productos_final = productos_final[[
-                'Código', 'Nombre', 'Tipo Referencia', 'Tipo De Unidad', 'Código De Barras', 'Compañía'
-            ]]
-
-            # Asignar productos_final como la maestra SKU
-            self.sku_maestra = productos_final
+            seleccion = (
+                (codigos.str.len() <= 5) &  # Máximo 5 caracteres
+                (codigos.str[:2] == '23')  # Empieza con "23"
+            )
+            productos_df = productos_df[seleccion]
+            codigo_barras = productos_df['ALTERNO'].astype(str).str.strip()
+
+            # Proyección de la maestra: columnas estáticas en el orden requerido
+            productos_final = pd.DataFrame({
+                'Código': codigos[seleccion],
+                'Nombre': productos_df['Producto'],
+                'Tipo Referencia': 'RG',
+                'Tipo De Unidad': 'UND',
+                'Código De Barras': codigo_barras,
+                'Compañía': codigo_barras
+            }, index=productos_df.index)
+
+            # Asignar productos_final como la maestra SKU, indexada por código para los cruces posteriores
+            self.sku_maestra = productos_final.set_index('Código', drop=False).rename_axis(None)
 
             # Ruta para guardar el archivo Excel
             output_path_excel = os.path.join(self.output_folder, 'SKU (Productos).xlsx')
@@ -520,11 +464,7 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'SKU (Productos).txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(productos_final.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in productos_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(productos_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -553,30 +493,15 @@ class VentaProcessor:
             self.verificar_archivo(intercliente_path)
             self.verificar_archivo(colgate_path)
 
-            # Limpiar el archivo de entrada antes de cargarlo con pandas
-            cleaned_lines = []
-            with open(intercliente_path, 'r', encoding='Windows-1252') as file:
-                for line in file:
-                    # Reemplazar comillas estándar y no estándar con expresión regular
-                    cleaned_line = line.strip().strip('"').strip('“').strip('”').strip("'").strip('`')
-                    cleaned_line = re.sub(r'^"|"$', '', cleaned_line).strip()
-                    cleaned_lines.append(cleaned_line)
-
-            # Crear un archivo temporal limpio
-            temp_path = 'intercliente_cleaned.txt'
-            with open(temp_path, 'w', encoding='Windows-1252') as temp_file:
-                temp_file.write("\n".join(cleaned_lines))
-
-            # Cargar datos limpios con pandas
-            intercliente_data = pd.read_csv(
-                temp_path,
-                sep='{',
-                engine='python',
-                encoding='Windows-1252',
-                names=["Cod. Cliente", "Nom. Cliente", "Fecha Ingreso", "Nit", "Direccion",
-                    "Telefono", "Representante Legal", "Codigo Municipio",
-                    "Codigo Negocio", "Tipo Negocio", "Estracto", "Barrio"]
-            )
+            # Normalizar códigos de clientes únicos del DataFrame de ventas
+            clientes_unicos = normalizar_por_valor(
+                self.filtered_data_total['Código Cliente'],
+                lambda codigos: codigos.astype(str).str.strip().str.replace('-', '999')
+            ).unique()
+
+            # Quitar comillas de cada línea mientras se parsea, sin archivo temporal, y tokenizar
+            # solo los clientes con ventas (el cruce por código se repite más abajo)
+            intercliente_data = leer_intercliente(intercliente_path, clientes=clientes_unicos)
 
             # Renombrar y limpiar columnas
             intercliente_data.rename(columns={
@@ -588,88 +513,33 @@ class VentaProcessor:
                 "Telefono": "Teléfono"
             }, inplace=True)
 
-            # Normalizar códigos
-            intercliente_data['Código'] = (
-                intercliente_data['Código']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-            )
-            # Normalizar códigos
-            intercliente_data['Código'] = (
-                intercliente_data['Código']
-                .astype(str)
-                .str.strip()
-                .str.replace('"', '')
-            )
-
-            # Cargar TE Viejos de Colgate
-            colgate_data = pd.ExcelFile(colgate_path)
-            te_viejos = colgate_data.parse('TE Viejos')
-            te_viejos['CLIENTES'] = te_viejos['CLIENTES'].astype(str).str.strip()
-
-            # Normalizar códigos de clientes únicos del DataFrame de ventas
-            clientes_unicos = (
-                self.filtered_data_total['Código Cliente']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-                .unique()
+            # Normalizar códigos (una sola pasada por código distinto; el strip final cubre los
+            # espacios que quedan tras quitar comillas)
+            intercliente_data['Código'] = normalizar_por_valor(
+                intercliente_data['Código'],
+                lambda codigos: (
+                    codigos
+                    .astype(str)
+                    .str.strip()
+                    .str.replace('-', '999')
+                    .str.replace('"', '')
+                    .str.strip()
+                )
             )
 
             # Filtrar clientes presentes en intercliente.txt
-            intercliente_data['Código'] = intercliente_data['Código'].str.strip()
             clientes_final = intercliente_data[intercliente_data['Código'].isin(clientes_unicos)].copy()
 
-            # Cargar archivo mm.xlsx y obtener los clientes por tipología (MM o SN)
-            mm_path = self.config.get('mm_path', 'mm.xlsx')
-            clientes_mm_mm = set()
-            clientes_mm_sn = set()
-            if os.path.isfile(mm_path):
-                mm_df = pd.read_excel(mm_path, dtype={'Cod. cliente': str})
-                # Detectar nombre de la columna de tipología de forma flexible
-                tipologia_col = None
-                for col in mm_df.columns:
-                    col_norm = str(col).strip().lower()
-                    if col_norm in {'tipologia', 'tipología', 'tipo', 'tipo_negocio', 'tipologia mm/sn', 'mm_sn'}:
-                        tipologia_col = col
-                        break
-                # Normalizar código y tipología
-                mm_df['Cod. cliente'] = (
-                    mm_df['Cod. cliente'].astype(str).str.strip()
-                    .str.replace('-', '999').str.replace('"', '').str.replace("'", '')
-                )
-                if tipologia_col is not None:
-                    mm_df['__TIPOLOGIA__'] = mm_df[tipologia_col].astype(str).str.strip().str.upper()
-                    clientes_mm_mm = set(mm_df.loc[mm_df['__TIPOLOGIA__'] == 'MM', 'Cod. cliente'])
-                    clientes_mm_sn = set(mm_df.loc[mm_df['__TIPOLOGIA__'] == 'SN', 'Cod. cliente'])
-                else:
-                    # Compatibilidad hacia atrás: si no hay columna de tipología, todo es MM
-                    clientes_mm_mm = set(mm_df['Cod. cliente'])
-                print(f"MM.xlsx -> MM: {len(clientes_mm_mm)}, SN: {len(clientes_mm_sn)}")
-            
-            # Determinar Código Tipo Negocio con prioridad MM > SN > TE > TT
-            te_viejos_clientes = (
-                te_viejos['CLIENTES']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-                .str.replace('"', '')
-                .str.replace("'", '')
-                .values
+            # Determinar Código Tipo Negocio con prioridad MM > SN > TE > TT: índices por código
+            # (mm.xlsx y hoja TE Viejos, en caché mientras los archivos no cambien) cruzados por hash
+            indice_mm = self._indice_mm(self.config.get('mm_path', 'mm.xlsx'))
+            indice_te = self._indice_te_viejos(colgate_path)
+            if indice_mm is not None:
+                tipos_mm = indice_mm['Tipo Negocio'].value_counts()
+                print(f"MM.xlsx -> MM: {tipos_mm.get('MM', 0)}, SN: {tipos_mm.get('SN', 0)}")
+            clientes_final['Código Tipo Negocio'] = self.clasificar_tipo_negocio(
+                clientes_final['Código'], indice_mm, indice_te
             )
-            def tipo_negocio(codigo):
-                codigo = str(codigo).strip().replace('-', '999').replace('"', '').replace("'", '')
-                if codigo in clientes_mm_mm:
-                    return 'MM'
-                elif codigo in clientes_mm_sn:
-                    return 'SN'
-                elif codigo in te_viejos_clientes:
-                    return 'TE'
-                else:
-                    return 'TT'
-
-            clientes_final['Código Tipo Negocio'] = clientes_final['Código'].apply(tipo_negocio)
 
             # Agregar columnas adicionales
             clientes_final['Código Sector DANE'] = ''
@@ -691,11 +561,7 @@ class VentaProcessor:
             output_path_excel = os.path.join(self.output_folder, 'Clientes.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(columnas_finales)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in clientes_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(clientes_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -709,6 +575,78 @@ class VentaProcessor:
 
 
 
+    @staticmethod
+    def _normalizar_codigo_cliente(codigos):
+        """Código de cliente sin espacios, comillas ni guiones ('-' -> '999'), por valor distinto."""
+        return normalizar_por_valor(
+            codigos,
+            lambda valores: (
+                valores
+                .astype(str)
+                .str.strip()
+                .str.replace('-', '999')
+                .str.replace('"', '')
+                .str.replace("'", '')
+            )
+        )
+
+    def _indice_mm(self, mm_path):
+        """
+        Pares distintos (Código, Tipo Negocio) de mm.xlsx, con tipología MM o SN; sin columna de
+        tipología todos los clientes son MM (compatibilidad hacia atrás). None si el archivo no existe.
+        """
+        if not os.path.isfile(mm_path):
+            return None
+
+        def construir():
+            mm_df = pd.read_excel(mm_path, dtype={'Cod. cliente': str})
+            # Detectar nombre de la columna de tipología de forma flexible
+            tipologia_col = None
+            for col in mm_df.columns:
+                col_norm = str(col).strip().lower()
+                if col_norm in {'tipologia', 'tipología', 'tipo', 'tipo_negocio', 'tipologia mm/sn', 'mm_sn'}:
+                    tipologia_col = col
+                    break
+            if tipologia_col is not None:
+                tipologia = mm_df[tipologia_col].astype(str).str.strip().str.upper()
+            else:
+                tipologia = pd.Series('MM', index=mm_df.index)
+            indice = pd.DataFrame({
+                'Código': self._normalizar_codigo_cliente(mm_df['Cod. cliente']),
+                'Tipo Negocio': tipologia
+            })
+            indice = indice[indice['Tipo Negocio'].isin(['MM', 'SN'])]
+            return indice.drop_duplicates().reset_index(drop=True)
+
+        return self.cache.obtener('tipo_negocio_mm', mm_path, construir)
+
+    def _indice_te_viejos(self, colgate_path):
+        """Códigos distintos de la hoja 'TE Viejos' del archivo de Colgate, con Tipo Negocio 'TE'."""
+        def construir():
+            te_viejos = pd.read_excel(colgate_path, sheet_name='TE Viejos')
+            codigos = self._normalizar_codigo_cliente(te_viejos['CLIENTES'].astype(str).str.strip())
+            return pd.DataFrame({'Código': codigos, 'Tipo Negocio': 'TE'}).drop_duplicates().reset_index(drop=True)
+
+        return self.cache.obtener('tipo_negocio_te', colgate_path, construir, parametros={'hoja': 'TE Viejos'})
+
+    def clasificar_tipo_negocio(self, codigos, indice_mm, indice_te):
+        """
+        Código Tipo Negocio de cada cliente con prioridad MM > SN > TE > TT. Los índices se unen en una
+        Serie indexada por código (ante un código repetido queda el de mayor prioridad) y cada cliente
+        se resuelve con una búsqueda por hash, en lugar de recorrer la lista de TE Viejos por cliente.
+        """
+        prioridad = {'MM': 0, 'SN': 1, 'TE': 2}
+        indices = [indice for indice in (indice_mm, indice_te) if indice is not None]
+        if indices:
+            tipos = pd.concat(indices, ignore_index=True)
+            tipos = tipos.assign(prioridad=tipos['Tipo Negocio'].map(prioridad))
+            tipos = tipos.sort_values('prioridad', kind='stable').drop_duplicates('Código')
+            tipos = tipos.set_index('Código')['Tipo Negocio']
+        else:
+            tipos = pd.Series(dtype=object)
+        clasificados = self._normalizar_codigo_cliente(codigos).map(tipos)
+        return clasificados.fillna('TT')
+
     def generar_inventario(self):
         """Genera los archivos 'Inventario.txt' y 'Inventario.xlsx' filtrando por productos de 'Productos EQ' y proveedores."""
         try:
@@ -735,17 +673,20 @@ class VentaProcessor:
 
             # Filtrar las columnas necesarias de productos
             productos_df = productos_df[['Pro_Cod']].rename(columns={'Pro_Cod': 'Código Producto'})
-            productos_df['Código Producto'] = productos_df['Código Producto'].astype(str).str.strip().str.split('.').str[0]
+            productos_df['Código Producto'] = normalizar_por_valor(
+                productos_df['Código Producto'], lambda codigos: codigos.astype(str).str.strip().str.split('.').str[0]
+            )
 
             # Filtrar por proveedores definidos
             if not self.proveedores:
                 raise ValueError("No se encontraron proveedores para filtrar el inventario.")
 
-            regex_pattern = '|'.join([re.escape(proveedor) for proveedor in self.proveedores])
-            inventario_data = inventario_data[inventario_data['Proveedor'].str.contains(regex_pattern, case=False, na=False)]
+            inventario_data = FiltroProveedores(self.proveedores).filtrar(inventario_data, 'Proveedor')
 
             # Normalizar los códigos en inventario
-            inventario_data['Codigo articulo'] = inventario_data['Codigo articulo'].astype(str).str.strip().str.split('.').str[0]
+            inventario_data['Codigo articulo'] = normalizar_por_valor(
+                inventario_data['Codigo articulo'], lambda codigos: codigos.astype(str).str.strip().str.split('.').str[0]
+            )
 
             # Filtrar los productos que están en Productos EQ
             inventario_data = inventario_data[inventario_data['Codigo articulo'].isin(productos_df['Código Producto'])]
@@ -757,7 +698,7 @@ class VentaProcessor:
             })
             
             # Agregar columnas adicionales
-            inventario_final['Fecha'] = datetime.now().strftime('%Y/%m/%d')  # Fecha actual
+            inventario_final['Fecha'] = datetime.now().strftime(FORMATO_FECHA)  # Fecha actual
             inventario_final['Unidad de Medida'] = 'UND'
 
             # Seleccionar el orden de columnas
@@ -775,11 +716,7 @@ class VentaProcessor:
             output_path_excel = os.path.join(self.output_folder, 'Inventario.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(inventario_final.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in inventario_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(inventario_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -801,18 +738,12 @@ class VentaProcessor:
             # Verificar que el archivo exista
             self.verificar_archivo(interciudad_path)
 
-            # Cargar los datos del archivo interciudad.txt
-            interciudad_data = pd.read_csv(
-                interciudad_path,
-                sep='{',
-                engine='python',
-                encoding='latin1',  # Codificación alternativa para evitar errores
-                names=["Código", "Nombre"]
-            )
-
             # Extraer los municipios únicos del DataFrame de clientes
             municipios_clientes = self.clientes_final['Código Municipio'].dropna().unique()
 
+            # Cargar solo los municipios de esos clientes
+            interciudad_data = leer_maestro(interciudad_path, COLUMNAS_INTERCIUDAD, claves=municipios_clientes)
+
             # Filtrar los municipios en interciudad que aparecen en el DataFrame de clientes
             municipios_final = interciudad_data[interciudad_data['Código'].isin(municipios_clientes)].drop_duplicates()
 
@@ -823,11 +754,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Municipios.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(municipios_final.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in municipios_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(municipios_final, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -865,11 +792,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Barrios.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(barrios_df.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in barrios_df.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(barrios_df, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -894,15 +817,16 @@ class VentaProcessor:
 
             # Asegurarse de que las columnas necesarias existan
             rutas_df = rutas_df.rename(columns={'Codigo': 'Código Cliente', 'Cod. Asesor': 'Código Vendedor'})
-            self.filtered_data_total = self.filtered_data_total.rename(columns={'Cod. Cliente': 'Código Cliente', 'Cod. Vendedor': 'Código Vendedor'})
+            # Copia local renombrada: no se reemplaza filtered_data_total por otro frame completo
+            ventas_total = self.filtered_data_total.rename(columns={'Cod. Cliente': 'Código Cliente', 'Cod. Vendedor': 'Código Vendedor'})
 
             # Verificar columnas
-            logger.debug(f"Columnas en self.filtered_data_total: {self.filtered_data_total.columns}")
+            logger.debug(f"Columnas en self.filtered_data_total: {ventas_total.columns}")
             logger.debug(f"Columnas en rutas_df: {rutas_df.columns}")
 
             # Cruzar datos con ventas
             rutas_data = pd.merge(
-                self.filtered_data_total[['Código Cliente', 'Código Vendedor']],
+                ventas_total[['Código Cliente', 'Código Vendedor']],
                 rutas_df[['Código Cliente', 'Código Vendedor']],
                 on=['Código Cliente', 'Código Vendedor'],
                 how='inner'
@@ -914,18 +838,16 @@ class VentaProcessor:
             rutas_data['Frecuencia'] = 4
 
             # Aplicar el reemplazo en el código del cliente
-            rutas_data['Código Cliente'] = rutas_data['Código Cliente'].apply(lambda x: str(x).replace('-', '999'))
+            rutas_data['Código Cliente'] = normalizar_por_valor(
+                rutas_data['Código Cliente'], lambda codigos: codigos.map(lambda x: str(x).replace('-', '999'))
+            )
 
             # Guardar archivos
             output_path_txt = os.path.join(self.output_folder, 'Rutas.txt')
             output_path_excel = os.path.join(self.output_folder, 'Rutas.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(rutas_data.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in rutas_data.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(rutas_data, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -957,7 +879,7 @@ class VentaProcessor:
             if hasattr(self, 'filtered_data_total'):
                 productos_inventario = set(self.inventario_final['Código Producto'])
                 if hasattr(self, 'sku_maestra'):
-                    productos_maestra = set(self.sku_maestra['Código'])
+                    productos_maestra = set(self.sku_maestra.index)
                     productos_faltantes = productos_inventario - productos_maestra
                     if productos_faltantes:
                         inconsistencias.append({
@@ -990,28 +912,14 @@ class VentaProcessor:
         try:
             # Obtener la última fecha de venta reportada
             if hasattr(self, 'filtered_data_total') and not self.filtered_data_total.empty:
-                # Verificar si la fecha ya está en formato string o es datetime
-                if isinstance(self.filtered_data_total['Fecha'].iloc[0], str):
-                    # Convertir de string a datetime para poder encontrar el máximo
-                    fechas = pd.to_datetime(self.filtered_data_total['Fecha'])
-                    ultima_fecha = fechas.max()
-                else:
-                    # Si es datetime, simplemente encontrar el máximo
-                    ultima_fecha = self.filtered_data_total['Fecha'].max()
+                # 'Fecha' queda como AAAAMMDD entero (o datetime) hasta la escritura
+                ultima_fecha = fechas_de(self.filtered_data_total['Fecha']).max()
                     
                 # Extraer día, mes y año de la última fecha
                 try:
-                    if isinstance(ultima_fecha, str):
-                        # Si es string en formato 'YYYY/MM/DD'
-                        partes = ultima_fecha.split('/')
-                        dia = int(partes[2])
-                        mes = int(partes[1])
-                        ano = int(partes[0])
-                    else:
-                        # Si es datetime
-                        dia = ultima_fecha.day
-                        mes = ultima_fecha.month
-                        ano = ultima_fecha.year
+                    dia = ultima_fecha.day
+                    mes = ultima_fecha.month
+                    ano = ultima_fecha.year
                 except Exception:
                     # En caso de error, usar el último día del mes como fallback
                     logger.warning("No se pudo determinar la última fecha de venta. Usando último día del mes.")
@@ -1038,6 +946,12 @@ class VentaProcessor:
                 os.makedirs(historico_folder)
                 logger.info(f"Carpeta de histórico creada: {historico_folder}")
             
+            # En modo zip_directo cada etapa ya escribió su archivo dentro del ZIP: solo falta cerrarlo
+            if self.salida.zip_directo:
+                historico_zip_path = self.salida.cerrar_zip(os.path.join(historico_folder, zip_filename))
+                logger.info(f"Proceso de compresión completado. ZIP guardado en: {historico_zip_path}")
+                return historico_zip_path
+
             # Crear el archivo ZIP solo con archivos TXT
             txt_files = []
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
@@ -1123,6 +1037,9 @@ if __name__ == '__main__':
     config_path = 'config.json'  # Ruta del archivo de configuración
 
     processor = VentaProcessor(config_path)
+    # Memoria ligera (config 'memoria'): Copy-on-Write para no duplicar el frame de ventas; la opción es
+    # global, por eso se activa aquí y no al crear el procesador
+    configurar_memoria(processor.config)
 
     # Cargar y filtrar los datos
     processor.cargar_y_filtrar_datos_por_periodo()
@@ -6,27 +6,49 @@ import pandas as pd
 import os
 from datetime import datetime
 import logging
-import re
 import json
+import argparse
 import zipfile
 import ftplib
 import calendar
 import shutil
 
+from tsol_cache import CacheEtapas
+from tsol_escritor import SalidaTsol, FORMATO_FECHA, FORMATOS_VENTAS
+from tsol_lectores import (
+    EntradasCompartidas, COLUMNAS_INTERASESOR, COLUMNAS_INTERSUPERVISOR, COLUMNAS_INTERCIUDAD
+)
+from tsol_normalizacion import normalizar_por_valor, sin_tildes
+from tsol_pipeline import Etapa, Planificador, PuntosControl
+from tsol_proveedores import FiltroProveedores
+from tsol_ventas import (
+    REGLAS_SIGNO, REGLAS_TIPOS, REGLAS_TOTAL, aplicar_reglas, compactar_ventas, configurar_memoria,
+    desde_centavos, fechas_de, sumar_por_claves
+)
+
 
 # Configuración del logging
+LOG_FILE = 'distrijass_cali.log'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 logging.basicConfig(
-    filename='distrijass_cali.log',
+    filename=LOG_FILE,
     level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    format=LOG_FORMAT
 )
 logger = logging.getLogger()
 
 class VentaProcessor:
-    def __init__(self, config_path):
+    # Columnas de la hoja 'infoventas' que usa el proceso (además de 'Proveedor' para el filtro)
+    COLUMNAS_VENTAS = [
+        'Cod. cliente', 'Cod. vendedor', 'Cod. productto',
+        'Fecha', 'Fac. numero', 'Cantidad', 'Vta neta',
+        'Tipo', 'Costo', 'Unidad', 'Pedido', 'Codigo bodega'
+    ]
+
+    def __init__(self, config_path, empresa='distrijass', entradas=None):
         self.config = self._cargar_configuracion(config_path)
         # Usar configuración de empresa 'distrijass'
-        self.company_config = self.config['companies']['distrijass']
+        self.company_config = self.config['companies'][empresa]
         
         self.ventas_path = self.config['files'].get('ventas')
         self.output_folder = os.path.join(
@@ -37,11 +59,26 @@ class VentaProcessor:
         
         # Cargar proveedores desde archivo proveedores.txt
         self.proveedores = self._cargar_proveedores_desde_archivo()
+        self.filtro_proveedores = FiltroProveedores(self.proveedores)
         
         # mes y ano se determinarán dinámicamente desde los datos del Excel
         self.mes = None
         self.ano = None
         self.filtered_data = None
+        # Insumos compartidos (ventas, inventario, rutero, PROVEE-TSOL): propios si la empresa se
+        # ejecuta sola, o los de ejecutar_todos.py si se procesan varias empresas en un mismo proceso
+        self.entradas = entradas or EntradasCompartidas(self.config)
+        self.entradas.registrar_consumidor(self.COLUMNAS_VENTAS + ['Proveedor'], self.proveedores)
+        self.cache = self.entradas.cache
+        # PROVEE-TSOL.xlsx se abre una sola vez y cada hoja se parsea una vez por ejecución
+        self.catalogo = self.entradas.libro(self.catalogo_principal)
+        self.tipologia_df = None
+        # Destino de los TXT: carpeta de salida o directamente el ZIP (config 'salida')
+        self.salida = SalidaTsol.desde_config(self.config, self.output_folder)
+        # Maestros (SKU, vendedores, municipios...) reutilizables entre ejecuciones si sus entradas no cambian
+        self.cache_etapas = CacheEtapas.desde_config(
+            self.config, self.cache, self.salida, self.company_config.get('codigo', empresa)
+        )
         self._crear_carpeta_salida()
 
     def _cargar_configuracion(self, config_path):
@@ -102,39 +139,35 @@ class VentaProcessor:
         self.verificar_archivo(self.ventas_path)
 
         try:
-            # Cargar todos los datos primero para determinar la fecha más reciente
-            all_data = pd.read_excel(
+            # Leer solo las filas del mes más reciente y de los proveedores configurados: los filtros
+            # se aplican mientras se recorre la hoja (una vez por proceso y desde la caché si el archivo
+            # no ha cambiado)
+            columnas_lectura = self.COLUMNAS_VENTAS + ['Proveedor']
+            periodo = (self.ano, self.mes) if self.ano and self.mes else None
+            if not self.proveedores:
+                logger.warning("No se especificaron proveedores para filtrar.")
+            self.filtered_data = self.entradas.ventas_periodo(
                 self.ventas_path,
-                sheet_name='infoventas',
-                parse_dates=['Fecha']
+                columnas_lectura,
+                self.proveedores,
+                periodo=periodo
             )
-            
-            # Encontrar la fecha más reciente en los datos
-            if all_data.empty or 'Fecha' not in all_data.columns:
+
+            # Fecha más reciente de todo el archivo (calculada durante la lectura)
+            fecha_maxima = self.filtered_data.attrs.get('fecha_maxima')
+            if fecha_maxima is None or pd.isna(pd.Timestamp(fecha_maxima)):
                 logger.error("No se encontraron datos o la columna 'Fecha' no existe")
                 raise ValueError("No se encontraron datos válidos en el archivo Excel")
-            
-            fecha_maxima = all_data['Fecha'].max()
-            self.mes = fecha_maxima.month
-            self.ano = fecha_maxima.year
-            
+
+            fecha_maxima = pd.Timestamp(fecha_maxima)
+            if periodo is None:
+                self.ano, self.mes = fecha_maxima.year, fecha_maxima.month
+
             logger.info(f"Fecha más reciente encontrada: {fecha_maxima}")
             logger.info(f"Mes y año determinados: Mes {self.mes}, Año {self.ano}")
-            
-            # Ahora filtrar por el período determinado
-            self.filtered_data = all_data[
-                (all_data['Fecha'].dt.month == self.mes) &
-                (all_data['Fecha'].dt.year == self.ano)
-            ]
             logger.info(f"Datos filtrados por período: Mes {self.mes}, Año {self.ano}.")
-
-            # Filtrar por proveedores si están definidos
             if self.proveedores:
-                regex_pattern = '|'.join([re.escape(proveedor) for proveedor in self.proveedores])
-                self.filtered_data = self.filtered_data[self.filtered_data['Proveedor'].str.contains(regex_pattern, case=False, na=False)]
                 logger.info(f"Datos filtrados por proveedores: {self.proveedores}")
-            else:
-                logger.warning("No se especificaron proveedores para filtrar.")
         except Exception as e:
             logger.error(f"Error al cargar y filtrar los datos: {e}")
             raise
@@ -145,11 +178,7 @@ class VentaProcessor:
             raise ValueError("Los datos no están cargados o filtrados. Ejecute 'cargar_y_filtrar_datos_por_periodo' primero.")
 
         try:
-            columnas_requeridas = [
-                'Cod. cliente', 'Cod. vendedor', 'Cod. productto',
-                'Fecha', 'Fac. numero', 'Cantidad', 'Vta neta',
-                'Tipo', 'Costo', 'Unidad', 'Pedido', 'Codigo bodega'
-            ]
+            columnas_requeridas = self.COLUMNAS_VENTAS
 
             # Validar columnas requeridas
             for columna in columnas_requeridas:
@@ -173,45 +202,15 @@ class VentaProcessor:
                 'Codigo bodega': 'Codigo bodega'
             })
 
-            # Convertir tipos y ajustar formato
-            self.filtered_data['Código Vendedor'] = self.filtered_data['Código Vendedor'].astype(str)
-            self.filtered_data['Código Producto (Sku)'] = self.filtered_data['Código Producto (Sku)'].astype(str).str.strip().str.upper()
-            self.filtered_data['Fecha'] = self.filtered_data['Fecha'].dt.strftime('%Y/%m/%d')
-            self.filtered_data['Numero Documento'] = self.filtered_data['Numero Documento'].astype(str)
-            self.filtered_data['Tipo'] = self.filtered_data['Tipo'].astype(str)
-            self.filtered_data['Cantidad'] = self.filtered_data['Cantidad'].astype(int)
-            self.filtered_data['Valor Total Item Vendido'] = pd.to_numeric(self.filtered_data['Valor Total Item Vendido'], errors='coerce').round(2)
-            self.filtered_data['Costo'] = pd.to_numeric(self.filtered_data['Costo'], errors='coerce').round(2)
-            # Reemplazar guiones en Código Cliente con "999"
-            self.filtered_data['Código Cliente'] = self.filtered_data['Código Cliente'].apply(
-                lambda x: str(x).replace('-', '999')
-            )
-            self.filtered_data_total = self.filtered_data.copy()
-            # Limpieza de la columna 'Código Cliente'
-            self.filtered_data_total['Código Cliente'] = (
-                self.filtered_data_total['Código Cliente']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-                .str.replace('"', '')
-                .str.replace("'", '')
-            )
-
+            # Tipos y formato con reglas vectorizadas (tsol_ventas); 'Fecha' se conserva como fecha
+            # (AAAAMMDD entero tras compactar) y se formatea al escribir ventas.txt y el listado de facturas
+            ventas = compactar_ventas(aplicar_reglas(self.filtered_data, REGLAS_TIPOS, 'tipos'))
 
-            # Limpieza de la columna 'Código Producto (Sku)'
-            self.filtered_data_total['Código Producto (Sku)'] = (
-                self.filtered_data_total['Código Producto (Sku)']
-                .astype(str)
-                .str.strip()
-                .str.replace('"', '')
-                .str.replace("'", '')
-            )
-            # Alternativa: Multiplicar por -1 para garantizar que los valores sean positivos cuando Tipo == 1
-            mask = self.filtered_data['Tipo'] == '1'
-            self.filtered_data.loc[mask, 'Cantidad'] = self.filtered_data.loc[mask, 'Cantidad'].apply(lambda x: x * -1 if x < 0 else x)
-            self.filtered_data.loc[mask, 'Valor Total Item Vendido'] = self.filtered_data.loc[mask, 'Valor Total Item Vendido'].apply(lambda x: x * -1 if x < 0 else x)
-            self.filtered_data.loc[mask, 'Costo'] = self.filtered_data.loc[mask, 'Costo'].apply(lambda x: x * -1 if x < 0 else x)
-            
+            # Una sola copia física de las ventas del mes: las dos variantes son columnas superpuestas
+            # sobre el mismo frame compacto (con memoria ligera las demás columnas se comparten)
+            self.filtered_data_total = aplicar_reglas(ventas, REGLAS_TOTAL, 'total')
+            # Cantidades, valores y costos positivos cuando Tipo == 1
+            self.filtered_data = aplicar_reglas(ventas, REGLAS_SIGNO, 'signo')
 
             logger.info("Datos procesados exitosamente.")
         except Exception as e:
@@ -230,23 +229,13 @@ class VentaProcessor:
             output_path_excel = os.path.join(self.output_folder, 'ventas.xlsx')
 
             # Guardar el archivo TXT
-            txt_data = self.filtered_data.copy()
-            txt_data['Valor Total Item Vendido'] = txt_data['Valor Total Item Vendido'].map(
-                lambda x: f"{x:.2f}".replace('.', ',')
-            )
-            txt_data['Costo'] = txt_data['Costo'].map(
-                lambda x: f"{x:.2f}".replace('.', ',')
-            )
+            # Fecha y valores se formatean al escribir (AAAA/MM/DD y dos decimales con coma)
             txt_columns = [
                 'Código Cliente', 'Código Vendedor', 'Código Producto (Sku)',
                 'Fecha', 'Numero Documento', 'Cantidad',
                 'Valor Total Item Vendido', 'Tipo', 'Costo', 'Unidad de Medida', 'Codigo bodega'
             ]
-            encabezado = '{'.join(txt_columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as file:
-                file.write(encabezado + '\n')
-                for _, row in txt_data[txt_columns].iterrows():
-                    file.write('{'.join(row.astype(str)) + '\n')
+            self.salida.escribir_txt(self.filtered_data, output_path_txt, columnas=txt_columns, formatos=FORMATOS_VENTAS)
             logger.info(f"Archivo TXT guardado exitosamente en: {output_path_txt}")
 
             # Guardar el archivo Excel
@@ -272,27 +261,23 @@ class VentaProcessor:
                 raise KeyError(f"Las siguientes columnas están ausentes: {', '.join(missing_columns)}")
 
             # Agrupar datos por las columnas requeridas
-            facturas_resumen = self.filtered_data_total.groupby(
-                ['Código Cliente', 'Código Vendedor', 'Fecha', 'Numero Documento']
-            ).agg(
-                Valor_Total_Factura=('Valor Total Item Vendido', 'sum'),
-                Valor_Facturado_Casa_Comercial = ('Valor Total Item Vendido', 'sum')
-            ).reset_index()
+            facturas_resumen, total_factura = sumar_por_claves(
+                self.filtered_data_total,
+                ['Código Cliente', 'Código Vendedor', 'Fecha', 'Numero Documento'],
+                'Valor Total Item Vendido'
+            )
 
-            # Convertir valores a formato con dos decimales
-            facturas_resumen['Valor_Total_Factura'] = facturas_resumen['Valor_Total_Factura'].round(2)
-            facturas_resumen['Valor_Facturado_Casa_Comercial'] = facturas_resumen['Valor_Facturado_Casa_Comercial'].round(2)
+            # Convertir la suma (en centavos) a formato con dos decimales, una vez para ambas columnas
+            valor_factura = desde_centavos(total_factura).round(2)
+            facturas_resumen['Valor_Total_Factura'] = valor_factura
+            facturas_resumen['Valor_Facturado_Casa_Comercial'] = valor_factura
 
             # Ruta para los archivos de salida
             output_txt = os.path.join(self.output_folder, 'Listado de Facturas.txt')
             output_excel = os.path.join(self.output_folder, 'Listado de Facturas.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(facturas_resumen.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in facturas_resumen.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(facturas_resumen, output_txt, formatos={'Fecha': 'fecha'})
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -310,7 +295,7 @@ class VentaProcessor:
 
         try:
             # Calcular el total antes de cualquier conversión
-            total_valor_venta = self.filtered_data['Valor Total Item Vendido'].sum()
+            total_valor_venta = desde_centavos(self.filtered_data['Valor Total Item Vendido']).sum()
 
             # Crear el DataFrame con los resultados
             totales_control = pd.DataFrame({
@@ -323,11 +308,7 @@ class VentaProcessor:
             output_excel = os.path.join(self.output_folder, 'Totales de Control.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(totales_control.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in totales_control.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(totales_control, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -347,14 +328,10 @@ class VentaProcessor:
             # Verificar que el archivo exista
             self.verificar_archivo(interasesor_path)
 
-            # Cargar los datos de interasesor.txt
-            interasesor_data = pd.read_csv(
-                interasesor_path,
-                sep='{',
-                engine='python',
-                encoding='latin1',  # Codificación alternativa para evitar errores
-                names=["Codigo", "Documento", "Nombre", "Apellido", "Telefono", "Direccion",
-                       "Cargo", "Portafolio", "Estado", "Codigo supervisor", "Codigo bodega"]
+            # Cargar los asesores; solo se parsean los que tienen ventas en el período
+            # (el cruce se repite más abajo)
+            interasesor_data = self.entradas.maestro(
+                interasesor_path, COLUMNAS_INTERASESOR, claves=self.filtered_data_total['Código Vendedor'].unique()
             )
 
             # Filtrar solo los vendedores activos
@@ -397,11 +374,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Vendedores.txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(self.vendedores_final.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in self.vendedores_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(self.vendedores_final, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -421,22 +394,15 @@ class VentaProcessor:
             # Verificar que el archivo exista
             self.verificar_archivo(intersupervisor_path)
 
-            # Cargar los datos de intersupervisor.txt
-            intersupervisor_data = pd.read_csv(
-                intersupervisor_path,
-                sep='{',
-                engine='python',
-                encoding='latin1',  # Codificación alternativa para evitar errores
-                names=["Codigo", "Documento", "Nombre", "Apellido", "Telefono", "Direccion",
-                    "Cargo", "Portafolio", "Estado", "Codigo bodega"]
-            )
+            # Obtener los códigos de supervisor del archivo de vendedores
+            supervisores_codigo = self.vendedores_final['Código Supervisor'].unique()
+
+            # Cargar los supervisores (solo los de esos vendedores)
+            intersupervisor_data = self.entradas.maestro(intersupervisor_path, COLUMNAS_INTERSUPERVISOR, claves=supervisores_codigo)
 
             # Filtrar solo los supervisores activos
             intersupervisor_data = intersupervisor_data[intersupervisor_data['Estado'].str.contains("Activado", na=False)]
 
-            # Obtener los códigos de supervisor del archivo de vendedores
-            supervisores_codigo = self.vendedores_final['Código Supervisor'].unique()
-
             # Filtrar los supervisores en base a los códigos de supervisor
             supervisores_final = intersupervisor_data[intersupervisor_data['Codigo'].isin(supervisores_codigo)]
 
@@ -469,11 +435,7 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'Supervisores.txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(supervisores_final.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in supervisores_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(supervisores_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -484,18 +446,6 @@ class VentaProcessor:
             logger.error(f"Error al generar el archivo 'Supervisores': {e}")
             raise
 
-    def _normalizar_texto(self, texto):
-        """Normaliza texto eliminando tildes y caracteres especiales para matching."""
-        if pd.isna(texto):
-            return ""
-        texto = str(texto).strip()
-        # Eliminar tildes
-        texto = texto.replace('á', 'a').replace('é', 'e').replace('í', 'i')
-        texto = texto.replace('ó', 'o').replace('ú', 'u').replace('ñ', 'n')
-        texto = texto.replace('Á', 'A').replace('É', 'E').replace('Í', 'I')
-        texto = texto.replace('Ó', 'O').replace('Ú', 'U').replace('Ñ', 'N')
-        return texto
-
     def cargar_tipologia_negocio(self):
         """Carga la tipología de negocio desde PROVEE-TSOL.xlsx hoja TIPOLOGIA."""
         try:
@@ -507,11 +457,15 @@ class VentaProcessor:
             col_codigo = tip_config.get('columnas', {}).get('codigo', 'Cod. necesidad')
             col_descripcion = tip_config.get('columnas', {}).get('descripcion', 'Nom. necesidad')
             
-            # Leer hoja TIPOLOGIA
-            tipologia_df = pd.read_excel(self.catalogo_principal, sheet_name=hoja)
+            # La tipología se calcula una sola vez por ejecución (la usan Tipos De Negocio y Clientes)
+            if self.tipologia_df is not None:
+                return self.tipologia_df
+
+            # Leer hoja TIPOLOGIA (compartida: no se modifica en sitio)
+            tipologia_df = self.catalogo.hoja(hoja)
             
-            # Normalizar códigos para matching (eliminar tildes)
-            tipologia_df[col_codigo] = tipologia_df[col_codigo].apply(self._normalizar_texto)
+            # Normalizar códigos para matching (eliminar tildes), una vez por código distinto
+            tipologia_df = tipologia_df.assign(**{col_codigo: sin_tildes(tipologia_df[col_codigo])})
             
             # Crear diccionario de tipología: código normalizado -> código original
             self.tipologia_map = dict(zip(
@@ -520,7 +474,8 @@ class VentaProcessor:
             ))
             
             logger.info(f"Tipología cargada: {len(self.tipologia_map)} registros desde {hoja}")
-            return tipologia_df[[col_codigo, col_descripcion]]
+            self.tipologia_df = tipologia_df[[col_codigo, col_descripcion]]
+            return self.tipologia_df
             
         except Exception as e:
             logger.error(f"Error al cargar tipología de negocio: {e}")
@@ -549,11 +504,7 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'Tipos De Negocio.txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(tipos_negocio.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in tipos_negocio.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(tipos_negocio, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -582,122 +533,59 @@ class VentaProcessor:
             col_contenido = prod_config.get('columnas', {}).get('contenido', 'Contenido')
             
             # Cargar datos del catálogo principal
-            productos_df = pd.read_excel(self.catalogo_principal, sheet_name=hoja)
+            productos_df = self.catalogo.hoja(hoja)
 
             # Filtrar por proveedores si están definidos
             if self.proveedores:
-                regex_pattern = '|'.join([re.escape(proveedor) for proveedor in self.proveedores])
-                productos_df = productos_df[productos_df[col_proveedor].str.contains(regex_pattern, case=False, na=False)]
+                productos_df = self.filtro_proveedores.filtrar(productos_df, col_proveedor)
                 logger.info(f"Productos filtrados por proveedores: {len(productos_df)} registros")
 
-            # Seleccionar columnas disponibles, manejando las que podrían no existir
-            columnas_a_usar = [col_codigo, col_nombre, col_barras, col_proveedor]
-            
-            # Verificar si existe PROVEE 2
-            if col_proveedor2 in productos_df.columns:
-                columnas_a_usar.append(col_proveedor2)
-            
-            # Agregar columnas adicionales si existen
-            if col_categoria in productos_df.columns:
-                columnas_a_usar.append(col_categoria)
-            if col_tipo_producto in productos_df.columns:
-                columnas_a_usar.append(col_tipo_producto)
-            if col_contenido in productos_df.columns:
-                columnas_a_usar.append(col_contenido)
-                
-            productos_final = productos_df[columnas_a_usar].copy()
-            
-            # Renombrar columnas básicas
-            rename_dict = {
-                col_codigo: 'Código',
-                col_nombre: 'Nombre',
-                col_barras: 'Código De Barras',
-                col_proveedor: 'Proveedor'
-            }
-            
-            # Incluir PROVEE 2 si existe
-            if col_proveedor2 in productos_df.columns:
-                rename_dict[col_proveedor2] = 'PROVEE 2'
-            
-            # Mapear las columnas de PROVEE-TSOL a los campos requeridos
-            if col_categoria in productos_df.columns:
-                # La columna Categoría se usará tanto para código como para nombre
-                rename_dict[col_categoria] = 'temp_categoria'
-            if col_tipo_producto in productos_df.columns:
-                # La columna Tipo Prod se usará tanto para código como para nombre de subcategoría
-                rename_dict[col_tipo_producto] = 'temp_tipo_producto'
-            if col_contenido in productos_df.columns:
-                rename_dict[col_contenido] = 'Factor Conversion Unidad'
-                
-            productos_final = productos_final.rename(columns=rename_dict)
+            columnas = productos_df.columns
 
-            # Convertir a texto y limpiar
-            productos_final['Código'] = productos_final['Código'].astype(str).str.strip().str.split('.').str[0]
-            productos_final['Código De Barras'] = productos_final['Código De Barras'].astype(str).str.strip()
+            def texto(columna):
+                """Columna del catálogo como texto sin espacios en los extremos (una vez por valor distinto)."""
+                return normalizar_por_valor(productos_df[columna], lambda valores: valores.astype(str).str.strip())
 
-            # Agregar las columnas obligatorias requeridas por las especificaciones
-            productos_final['Tipo Referencia'] = 'RG'  # Regular por defecto
-            productos_final['Tipo De Unidad'] = 'UND'  # Unidad por defecto
-            
-            # Procesar campos de categorización usando datos reales de PROVEE-TSOL
-            if 'temp_categoria' in productos_final.columns:
-                # Usar la columna Categoría para ambos campos de categoría
-                productos_final['Código Categoría'] = productos_final['temp_categoria'].astype(str).str.strip()
-                productos_final['Nombre Categoría'] = productos_final['temp_categoria'].astype(str).str.strip()
-                productos_final = productos_final.drop('temp_categoria', axis=1)
-            else:
-                productos_final['Código Categoría'] = '001'
-                productos_final['Nombre Categoría'] = 'GENERAL'
-                
-            if 'temp_tipo_producto' in productos_final.columns:
-                # Usar la columna Tipo Prod para ambos campos de subcategoría
-                productos_final['Código SubCategoría'] = productos_final['temp_tipo_producto'].astype(str).str.strip()
-                productos_final['Nombre SubCategoría'] = productos_final['temp_tipo_producto'].astype(str).str.strip()
-                productos_final = productos_final.drop('temp_tipo_producto', axis=1)
-            else:
-                productos_final['Código SubCategoría'] = '001'
-                productos_final['Nombre SubCategoría'] = 'GENERAL'
-                
-            # Procesar Factor Conversion Unidad
-            if 'Factor Conversion Unidad' not in productos_final.columns:
-                productos_final['Factor Conversion Unidad'] = 1
-            else:
-                # Convertir a numérico, usar 1 como default para valores no válidos
-                productos_final['Factor Conversion Unidad'] = pd.to_numeric(
-                    productos_final['Factor Conversion Unidad'], errors='coerce'
-                ).fillna(1)
-                
-            # Campos adicionales
-            productos_final['Factor Peso'] = 1  # Valor por defecto
-            
             # Lógica condicional para el campo Proveedor
             # Si el Proveedor es 'TM - LO NUESTRO' usar PROVEE 2, de lo contrario usar Proveedor
-            if 'PROVEE 2' in productos_final.columns:
-                # Crear nueva columna Proveedor con lógica condicional
-                productos_final['Proveedor_Final'] = productos_final.apply(
-                    lambda row: row['PROVEE 2'] if row['Proveedor'] == 'TM - LO NUESTRO' else row['Proveedor'], 
-                    axis=1
-                )
-                # Reemplazar la columna Proveedor original
-                productos_final['Proveedor'] = productos_final['Proveedor_Final']
-                # Eliminar columnas temporales
-                productos_final = productos_final.drop(['PROVEE 2', 'Proveedor_Final'], axis=1)
+            proveedor = productos_df[col_proveedor]
+            if col_proveedor2 in columnas:
+                proveedor = proveedor.where(proveedor != 'TM - LO NUESTRO', productos_df[col_proveedor2])
                 logger.info("Aplicada lógica condicional para PROVEE 2 cuando Proveedor = 'TM - LO NUESTRO'")
-            
-            # Campos de sede (usar función auxiliar para obtener nombres de sede)
-            productos_final['Código Sede'] = '01'  # Sede principal por defecto
-            productos_final['Nombre Sede'] = 'PALMIRA/CALI'  # Sede principal por defecto
 
-            # Seleccionar y ordenar las columnas requeridas según especificaciones con Proveedor
-            columnas_finales = [
-                'Código', 'Nombre', 'Tipo Referencia', 'Tipo De Unidad', 'Código De Barras',
-                'Código Categoría', 'Nombre Categoría', 'Código SubCategoría', 'Nombre SubCategoría',
-                'Factor Conversion Unidad', 'Factor Peso', 'Código Sede', 'Nombre Sede', 'Proveedor'
-            ]
-            productos_final = productos_final[columnas_finales]
+            # La columna Categoría se usa tanto para código como para nombre (001 / GENERAL si no existe)
+            categoria = texto(col_categoria) if col_categoria in columnas else None
+            # La columna Tipo Prod se usa tanto para código como para nombre de subcategoría
+            tipo_producto = texto(col_tipo_producto) if col_tipo_producto in columnas else None
 
-            # Asignar productos_final como la maestra SKU
-            self.sku_maestra = productos_final
+            # Factor Conversion Unidad: numérico, 1 para valores no válidos o si no existe Contenido
+            if col_contenido in columnas:
+                factor_conversion = pd.to_numeric(productos_df[col_contenido], errors='coerce').fillna(1)
+            else:
+                factor_conversion = 1
+
+            # Proyección de la maestra en el orden requerido por las especificaciones (con Proveedor)
+            productos_final = pd.DataFrame({
+                'Código': normalizar_por_valor(
+                    productos_df[col_codigo], lambda codigos: codigos.astype(str).str.strip().str.split('.').str[0]
+                ),
+                'Nombre': productos_df[col_nombre],
+                'Tipo Referencia': 'RG',  # Regular por defecto
+                'Tipo De Unidad': 'UND',  # Unidad por defecto
+                'Código De Barras': texto(col_barras),
+                'Código Categoría': '001' if categoria is None else categoria,
+                'Nombre Categoría': 'GENERAL' if categoria is None else categoria,
+                'Código SubCategoría': '001' if tipo_producto is None else tipo_producto,
+                'Nombre SubCategoría': 'GENERAL' if tipo_producto is None else tipo_producto,
+                'Factor Conversion Unidad': factor_conversion,
+                'Factor Peso': 1,  # Valor por defecto
+                'Código Sede': '01',  # Sede principal por defecto
+                'Nombre Sede': 'PALMIRA/CALI',  # Sede principal por defecto
+                'Proveedor': proveedor
+            }, index=productos_df.index)
+
+            # Asignar productos_final como la maestra SKU, indexada por código para los cruces posteriores
+            self.sku_maestra = productos_final.set_index('Código', drop=False).rename_axis(None)
 
             # Ruta para guardar el archivo Excel
             output_path_excel = os.path.join(self.output_folder, 'SKU (Productos).xlsx')
@@ -706,11 +594,7 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'SKU (Productos).txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(productos_final.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in productos_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(productos_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -732,30 +616,15 @@ class VentaProcessor:
             self.verificar_archivo(intercliente_path)
             self.verificar_archivo(self.catalogo_principal)
 
-            # Limpiar el archivo de entrada antes de cargarlo con pandas
-            cleaned_lines = []
-            with open(intercliente_path, 'r', encoding='Windows-1252') as file:
-                for line in file:
-                    # Reemplazar comillas estándar y no estándar con expresión regular
-                    cleaned_line = line.strip().strip('"').strip('“').strip('”').strip("'").strip('`')
-                    cleaned_line = re.sub(r'^"|"$', '', cleaned_line).strip()
-                    cleaned_lines.append(cleaned_line)
-
-            # Crear un archivo temporal limpio
-            temp_path = 'intercliente_cleaned_distrijass.txt'
-            with open(temp_path, 'w', encoding='Windows-1252') as temp_file:
-                temp_file.write("\n".join(cleaned_lines))
-
-            # Cargar datos limpios con pandas
-            intercliente_data = pd.read_csv(
-                temp_path,
-                sep='{',
-                engine='python',
-                encoding='Windows-1252',
-                names=["Cod. Cliente", "Nom. Cliente", "Fecha Ingreso", "Nit", "Direccion",
-                    "Telefono", "Representante Legal", "Codigo Municipio",
-                    "Codigo Negocio", "Tipo Negocio", "Estracto", "Barrio"]
-            )
+            # Normalizar códigos de clientes únicos del DataFrame de ventas
+            clientes_unicos = normalizar_por_valor(
+                self.filtered_data_total['Código Cliente'],
+                lambda codigos: codigos.astype(str).str.strip().str.replace('-', '999')
+            ).unique()
+
+            # Quitar comillas de cada línea mientras se parsea, sin archivo temporal; solo se
+            # tokenizan los clientes con ventas (el cruce se repite más abajo)
+            intercliente_data = self.entradas.intercliente(intercliente_path, clientes=clientes_unicos)
 
             # Renombrar y limpiar columnas
             intercliente_data.rename(columns={
@@ -767,36 +636,24 @@ class VentaProcessor:
                 "Telefono": "Teléfono"
             }, inplace=True)
 
-            # Normalizar códigos
-            intercliente_data['Código'] = (
-                intercliente_data['Código']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-            )
-            # Normalizar códigos
-            intercliente_data['Código'] = (
-                intercliente_data['Código']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-                .str.replace('"', '')
+            # Normalizar códigos (una sola pasada por código distinto; el segundo reemplazo de guiones
+            # era redundante y el strip final cubre los espacios que quedaban tras quitar comillas)
+            intercliente_data['Código'] = normalizar_por_valor(
+                intercliente_data['Código'],
+                lambda codigos: (
+                    codigos
+                    .astype(str)
+                    .str.strip()
+                    .str.replace('-', '999')
+                    .str.replace('"', '')
+                    .str.strip()
+                )
             )
 
             # Cargar tipología desde PROVEE-TSOL
             self.cargar_tipologia_negocio()
 
-            # Normalizar códigos de clientes únicos del DataFrame de ventas
-            clientes_unicos = (
-                self.filtered_data_total['Código Cliente']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-                .unique()
-            )
-
             # Filtrar clientes presentes en intercliente.txt
-            intercliente_data['Código'] = intercliente_data['Código'].str.strip()
             clientes_final = intercliente_data[intercliente_data['Código'].isin(clientes_unicos)].copy()
 
             # Usar directamente la columna 'Tipo Negocio' como 'Código Tipo Negocio'
@@ -825,11 +682,7 @@ class VentaProcessor:
             output_path_excel = os.path.join(self.output_folder, 'Clientes.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(columnas_finales)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in clientes_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(clientes_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -853,21 +706,22 @@ class VentaProcessor:
             self.verificar_archivo(inventario_path)
 
             # Cargar los datos del archivo de inventario
-            inventario_data = pd.read_excel(inventario_path, sheet_name='Informe')
+            inventario_data = self.entradas.libro(inventario_path).hoja('Informe')
 
             # Filtrar por proveedores definidos
             if not self.proveedores:
                 raise ValueError("No se encontraron proveedores para filtrar el inventario.")
 
-            regex_pattern = '|'.join([re.escape(proveedor) for proveedor in self.proveedores])
-            inventario_data = inventario_data[inventario_data['Proveedor'].str.contains(regex_pattern, case=False, na=False)]
+            inventario_data = self.filtro_proveedores.filtrar(inventario_data, 'Proveedor')
 
             # Normalizar los códigos en inventario
-            inventario_data['Codigo articulo'] = inventario_data['Codigo articulo'].astype(str).str.strip().str.split('.').str[0]
+            inventario_data['Codigo articulo'] = normalizar_por_valor(
+                inventario_data['Codigo articulo'], lambda codigos: codigos.astype(str).str.strip().str.split('.').str[0]
+            )
 
             # Filtrar los productos que están en la maestra SKU
             if hasattr(self, 'sku_maestra'):
-                inventario_data = inventario_data[inventario_data['Codigo articulo'].isin(self.sku_maestra['Código'])]
+                inventario_data = inventario_data[inventario_data['Codigo articulo'].isin(self.sku_maestra.index)]
 
             # Crear DataFrame con las columnas requeridas
             inventario_final = inventario_data[['Codigo articulo', 'Unidades']].rename(columns={
@@ -876,7 +730,7 @@ class VentaProcessor:
             })
             
             # Agregar columnas obligatorias según especificaciones TSOL
-            inventario_final['Fecha'] = datetime.now().strftime('%Y/%m/%d')  # Fecha actual
+            inventario_final['Fecha'] = datetime.now().strftime(FORMATO_FECHA)  # Fecha actual
             inventario_final['Unidad de Medida'] = 'UND'
             inventario_final['Código de bodega'] = '001'  # Bodega principal por defecto
             inventario_final['Código Sede'] = '01'  # Sede principal por defecto  
@@ -905,11 +759,7 @@ class VentaProcessor:
             output_path_excel = os.path.join(self.output_folder, 'Inventario.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(inventario_final.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in inventario_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(inventario_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -931,18 +781,12 @@ class VentaProcessor:
             # Verificar que el archivo exista
             self.verificar_archivo(interciudad_path)
 
-            # Cargar los datos del archivo interciudad.txt
-            interciudad_data = pd.read_csv(
-                interciudad_path,
-                sep='{',
-                engine='python',
-                encoding='latin1',  # Codificación alternativa para evitar errores
-                names=["Código", "Nombre"]
-            )
-
             # Extraer los municipios únicos del DataFrame de clientes
             municipios_clientes = self.clientes_final['Código Municipio'].dropna().unique()
 
+            # Cargar los municipios (solo los de esos clientes)
+            interciudad_data = self.entradas.maestro(interciudad_path, COLUMNAS_INTERCIUDAD, claves=municipios_clientes)
+
             # Filtrar los municipios en interciudad que aparecen en el DataFrame de clientes
             municipios_final = interciudad_data[interciudad_data['Código'].isin(municipios_clientes)].drop_duplicates()
 
@@ -953,11 +797,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Municipios.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(municipios_final.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in municipios_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(municipios_final, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -995,11 +835,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Barrios.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(barrios_df.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in barrios_df.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(barrios_df, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
             # Guardar archivo Excel
@@ -1020,19 +856,20 @@ class VentaProcessor:
             self.verificar_archivo(rutas_path)
             
             # Cargar datos del archivo rutero
-            rutas_df = pd.read_excel(rutas_path, sheet_name='Informe')
+            rutas_df = self.entradas.libro(rutas_path).hoja('Informe')
 
             # Asegurarse de que las columnas necesarias existan
             rutas_df = rutas_df.rename(columns={'Codigo': 'Código Cliente', 'Cod. Asesor': 'Código Vendedor'})
-            self.filtered_data_total = self.filtered_data_total.rename(columns={'Cod. Cliente': 'Código Cliente', 'Cod. Vendedor': 'Código Vendedor'})
+            # Copia local renombrada: otras etapas leen filtered_data_total al mismo tiempo
+            ventas_total = self.filtered_data_total.rename(columns={'Cod. Cliente': 'Código Cliente', 'Cod. Vendedor': 'Código Vendedor'})
 
             # Verificar columnas
-            logger.debug(f"Columnas en self.filtered_data_total: {self.filtered_data_total.columns}")
+            logger.debug(f"Columnas en self.filtered_data_total: {ventas_total.columns}")
             logger.debug(f"Columnas en rutas_df: {rutas_df.columns}")
 
             # Cruzar datos con ventas
             rutas_data = pd.merge(
-                self.filtered_data_total[['Código Cliente', 'Código Vendedor']],
+                ventas_total[['Código Cliente', 'Código Vendedor']],
                 rutas_df[['Código Cliente', 'Código Vendedor']],
                 on=['Código Cliente', 'Código Vendedor'],
                 how='inner'
@@ -1049,7 +886,9 @@ class VentaProcessor:
             rutas_data['Identificador de sucursal'] = '001'  # Sucursal principal por defecto
 
             # Aplicar el reemplazo en el código del cliente
-            rutas_data['Código Cliente'] = rutas_data['Código Cliente'].apply(lambda x: str(x).replace('-', '999'))
+            rutas_data['Código Cliente'] = normalizar_por_valor(
+                rutas_data['Código Cliente'], lambda codigos: codigos.map(lambda x: str(x).replace('-', '999'))
+            )
             
             # Reordenar columnas según especificaciones (Código Vendedor primero)
             columnas_finales = [
@@ -1063,11 +902,7 @@ class VentaProcessor:
             output_path_excel = os.path.join(self.output_folder, 'Rutas.xlsx')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(rutas_data.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in rutas_data.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(rutas_data, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
             # Guardar archivo Excel
@@ -1099,7 +934,7 @@ class VentaProcessor:
             if hasattr(self, 'filtered_data_total'):
                 productos_inventario = set(self.inventario_final['Código Producto'])
                 if hasattr(self, 'sku_maestra'):
-                    productos_maestra = set(self.sku_maestra['Código'])
+                    productos_maestra = set(self.sku_maestra.index)
                     productos_faltantes = productos_inventario - productos_maestra
                     if productos_faltantes:
                         inconsistencias.append({
@@ -1132,28 +967,14 @@ class VentaProcessor:
         try:
             # Obtener la última fecha de venta reportada
             if hasattr(self, 'filtered_data_total') and not self.filtered_data_total.empty:
-                # Verificar si la fecha ya está en formato string o es datetime
-                if isinstance(self.filtered_data_total['Fecha'].iloc[0], str):
-                    # Convertir de string a datetime para poder encontrar el máximo
-                    fechas = pd.to_datetime(self.filtered_data_total['Fecha'])
-                    ultima_fecha = fechas.max()
-                else:
-                    # Si es datetime, simplemente encontrar el máximo
-                    ultima_fecha = self.filtered_data_total['Fecha'].max()
+                # 'Fecha' queda como AAAAMMDD entero (o datetime) hasta la escritura
+                ultima_fecha = fechas_de(self.filtered_data_total['Fecha']).max()
                     
                 # Extraer día, mes y año de la última fecha
                 try:
-                    if isinstance(ultima_fecha, str):
-                        # Si es string en formato 'YYYY/MM/DD'
-                        partes = ultima_fecha.split('/')
-                        dia = int(partes[2])
-                        mes = int(partes[1])
-                        ano = int(partes[0])
-                    else:
-                        # Si es datetime
-                        dia = ultima_fecha.day
-                        mes = ultima_fecha.month
-                        ano = ultima_fecha.year
+                    dia = ultima_fecha.day
+                    mes = ultima_fecha.month
+                    ano = ultima_fecha.year
                 except Exception:
                     # En caso de error, usar el último día del mes como fallback
                     logger.warning("No se pudo determinar la última fecha de venta. Usando último día del mes.")
@@ -1175,6 +996,12 @@ class VentaProcessor:
                 os.makedirs(historico_folder)
                 logger.info(f"Carpeta de histórico creada: {historico_folder}")
             
+            # En modo zip_directo cada etapa ya escribió su archivo dentro del ZIP: solo falta cerrarlo
+            if self.salida.zip_directo:
+                historico_zip_path = self.salida.cerrar_zip(os.path.join(historico_folder, zip_filename))
+                logger.info(f"Proceso de compresión completado. ZIP guardado en: {historico_zip_path}")
+                return historico_zip_path
+
             # Crear el archivo ZIP solo con archivos TXT
             txt_files = []
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
@@ -1273,63 +1100,141 @@ class VentaProcessor:
             logger.error(f"Error al enviar el archivo por FTP: {e}")
             return False
 
-    # Ejecución del script
-if __name__ == '__main__':
-    config_path = 'config.json'  # Ruta del archivo de configuración
-
-    processor = VentaProcessor(config_path)
-
-    # Cargar y filtrar los datos
-    processor.cargar_y_filtrar_datos_por_periodo()
-
-    # Procesar los datos
-    processor.procesar_datos()
 
-    # Guardar los resultados
-    processor.guardar_archivo_ventas()
-    
-    # Generar el listado de facturas
-    processor.generar_listado_facturas()
-    
-    # Generar los totales de control
-    processor.generar_totales_de_control()
-    
-    # Generar el archivo de vendedores
-    processor.generar_vendedores()
-
-    # Generar el archivo de supervisores
-    processor.generar_supervisores()
-    
-    # Generar el archivo de Tipos De Negocio
-    processor.generar_tipos_de_negocio()
-    
-    # Generar el archivo SKU (Productos)
-    processor.generar_sku_productos()
-    
-    # Generar los archivos de clientes
-    processor.generar_clientes()
-    
-    # Generar el archivo de municipios
-    processor.generar_municipios()
-    
-    # Generar el archivo de inventario
-    processor.generar_inventario()
-    
-    # Generar el archivo de barrios (comentado temporalmente - no en especificaciones TSOL)
-    # processor.generar_barrios()
-    
-    # Generar rutas
-    processor.generar_rutas()
-    
-    # Validar inconsistencias
-    processor.validar_inconsistencias()
-    
-    # Comprimir archivos
-    zip_path = processor.comprimir_archivos()
+def etapas_pipeline(processor):
+    """
+    Etapas TSOL de la empresa con los datos que cada una lee y produce. El planificador deduce de aquí
+    qué etapas pueden correr a la vez (por ejemplo vendedores, SKU y tipos de negocio).
+    """
+    def comprimir():
+        # Liberar los libros Excel abiertos (las hojas ya parseadas quedan en memoria)
+        processor.entradas.cerrar()
+        return processor.comprimir_archivos()
+
+    # Maestros que se reutilizan de la ejecución anterior si no cambiaron sus archivos, su parte del
+    # config ni las claves que reciben de etapas previas (config 'cache.etapas')
+    cache = processor.cache_etapas
+    config_empresa = processor.company_config
+    paths = config_empresa['paths']
+    generar_vendedores = cache.envolver(
+        'generar_vendedores', processor.generar_vendedores,
+        lambda: cache.huella([paths['interasesor']], claves=[processor.filtered_data_total['Código Vendedor']]),
+        processor, 'vendedores_final'
+    )
+    generar_supervisores = cache.envolver(
+        'generar_supervisores', processor.generar_supervisores,
+        lambda: cache.huella([paths['intersupervisor']], claves=[processor.vendedores_final['Código Supervisor']])
+    )
+    generar_tipos_de_negocio = cache.envolver(
+        'generar_tipos_de_negocio', processor.generar_tipos_de_negocio,
+        lambda: cache.huella([processor.catalogo_principal], config=config_empresa.get('tipologia_negocio', {}))
+    )
+    generar_sku_productos = cache.envolver(
+        'generar_sku_productos', processor.generar_sku_productos,
+        lambda: cache.huella([processor.catalogo_principal], config={
+            'filtros_productos': config_empresa.get('filtros_productos', {}),
+            'proveedores': processor.proveedores
+        }),
+        processor, 'sku_maestra'
+    )
+    generar_municipios = cache.envolver(
+        'generar_municipios', processor.generar_municipios,
+        lambda: cache.huella([paths['interciudad']], claves=[processor.clientes_final['Código Municipio']])
+    )
+
+    return [
+        Etapa('cargar_y_filtrar_datos_por_periodo', processor.cargar_y_filtrar_datos_por_periodo,
+              salidas=['ventas_periodo'], estado=['filtered_data', 'mes', 'ano']),
+        Etapa('procesar_datos', processor.procesar_datos,
+              entradas=['ventas_periodo'], salidas=['filtered_data', 'filtered_data_total'],
+              estado=['filtered_data', 'filtered_data_total']),
+        Etapa('guardar_archivo_ventas', processor.guardar_archivo_ventas,
+              entradas=['filtered_data'], salidas=['ventas.txt']),
+        Etapa('generar_listado_facturas', processor.generar_listado_facturas,
+              entradas=['filtered_data_total'], salidas=['Listado de Facturas.txt']),
+        Etapa('generar_totales_de_control', processor.generar_totales_de_control,
+              entradas=['filtered_data'], salidas=['Totales de Control.txt']),
+        Etapa('generar_vendedores', generar_vendedores,
+              entradas=['filtered_data_total'], salidas=['vendedores_final', 'Vendedores.txt'],
+              estado=['vendedores_final']),
+        Etapa('generar_supervisores', generar_supervisores,
+              entradas=['vendedores_final'], salidas=['Supervisores.txt']),
+        Etapa('cargar_tipologia_negocio', processor.cargar_tipologia_negocio,
+              salidas=['tipologia_df'], estado=['tipologia_df', 'tipologia_map']),
+        Etapa('generar_tipos_de_negocio', generar_tipos_de_negocio,
+              entradas=['tipologia_df'], salidas=['Tipos De Negocio.txt']),
+        Etapa('generar_sku_productos', generar_sku_productos,
+              salidas=['sku_maestra', 'SKU (Productos).txt'], estado=['sku_maestra']),
+        Etapa('generar_clientes', processor.generar_clientes,
+              entradas=['filtered_data_total', 'tipologia_df'], salidas=['clientes_final', 'Clientes.txt'],
+              estado=['clientes_final']),
+        Etapa('generar_municipios', generar_municipios,
+              entradas=['clientes_final'], salidas=['Municipios.txt']),
+        Etapa('generar_inventario', processor.generar_inventario,
+              entradas=['sku_maestra'], salidas=['inventario_final', 'Inventario.txt'],
+              estado=['inventario_final']),
+        # generar_barrios queda fuera: no está en las especificaciones TSOL
+        Etapa('generar_rutas', processor.generar_rutas,
+              entradas=['filtered_data_total'], salidas=['Rutas.txt']),
+        Etapa('validar_inconsistencias', processor.validar_inconsistencias,
+              entradas=['clientes_final', 'filtered_data_total', 'inventario_final', 'sku_maestra'],
+              salidas=['Reporte de Inconsistencias.xlsx']),
+        # El ZIP se arma al final, con todos los archivos escritos
+        Etapa('comprimir_archivos', comprimir,
+              entradas=['ventas.txt', 'Listado de Facturas.txt', 'Totales de Control.txt', 'Vendedores.txt',
+                        'Supervisores.txt', 'Tipos De Negocio.txt', 'SKU (Productos).txt', 'Clientes.txt',
+                        'Municipios.txt', 'Inventario.txt', 'Rutas.txt',
+                        'Reporte de Inconsistencias.xlsx'],
+              salidas=['zip_path'])
+    ]
+
+
+def ejecutar_pipeline(processor, reanudar=False):
+    """
+    Ejecuta todas las etapas TSOL de una empresa y devuelve la ruta del ZIP generado.
+    Las etapas independientes corren en paralelo con config['pipeline']['workers'] hilos (1 = en serie).
+    Cada etapa deja un punto de control (config 'checkpoint'); con reanudar=True se retoma la última
+    ejecución incompleta desde la primera etapa sin terminar.
+    """
+    workers = processor.config.get('pipeline', {}).get('workers', 4)
+    puntos_control = PuntosControl.desde_config(
+        processor.config, processor, processor.company_config['codigo'],
+        salida=processor.salida, reanudar=reanudar, archivos=processor.company_config['paths'].values()
+    )
+    resultados = Planificador(etapas_pipeline(processor), workers=workers, puntos_control=puntos_control).ejecutar()
+
+    zip_path = resultados['comprimir_archivos']
     print(f"Archivos TXT comprimidos y guardados en: {zip_path}")
     
     # Enviar por FTP
-    if processor.enviar_por_ftp(zip_path):
+    enviado = processor.enviar_por_ftp(zip_path)
+    if enviado:
         print(f"Archivo enviado exitosamente al servidor FTP")
     else:
         print("No se envió el archivo por FTP (deshabilitado o error)")
+
+    if puntos_control is not None:
+        if enviado or not processor.company_config.get('ftp_enabled', False):
+            puntos_control.finalizar()
+        else:
+            # El ZIP ya está listo: al reanudar solo se reintenta el envío
+            puntos_control.liberar()
+            print("Use --resume para reintentar el envío sin regenerar los archivos")
+
+    return zip_path
+
+
+# Ejecución del script
+if __name__ == '__main__':
+    config_path = 'config.json'  # Ruta del archivo de configuración
+
+    parser = argparse.ArgumentParser(description="Genera los archivos TSOL de la empresa")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reanudar la última ejecución incompleta desde la primera etapa sin terminar")
+    args = parser.parse_args()
+
+    processor = VentaProcessor(config_path)
+    # Memoria ligera (config 'memoria'): Copy-on-Write para no duplicar el frame de ventas; la opción es
+    # global, por eso se activa aquí y no al crear el procesador
+    configurar_memoria(processor.config)
+    ejecutar_pipeline(processor, reanudar=args.resume)
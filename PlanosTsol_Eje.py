@@ -7,26 +7,48 @@ import pandas as pd
 import os
 from datetime import datetime
 import logging
-import re
 import json
+import argparse
 import zipfile
 import ftplib
 import calendar
 import shutil
 
+from tsol_cache import CacheEtapas
+from tsol_escritor import SalidaTsol, FORMATO_FECHA, FORMATOS_VENTAS
+from tsol_lectores import (
+    EntradasCompartidas, COLUMNAS_INTERASESOR, COLUMNAS_INTERSUPERVISOR, COLUMNAS_INTERCIUDAD
+)
+from tsol_normalizacion import normalizar_por_valor, sin_tildes
+from tsol_pipeline import Etapa, Planificador, PuntosControl
+from tsol_proveedores import FiltroProveedores
+from tsol_ventas import (
+    REGLAS_SIGNO, REGLAS_TIPOS, REGLAS_TOTAL, aplicar_reglas, compactar_ventas, configurar_memoria,
+    desde_centavos, fechas_de, sumar_por_claves
+)
+
 # Configuración del logging
+LOG_FILE = 'distrijass_eje.log'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 logging.basicConfig(
-    filename='distrijass_eje.log',
+    filename=LOG_FILE,
     level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    format=LOG_FORMAT
 )
 logger = logging.getLogger()
 
 class VentaProcessor:
-    def __init__(self, config_path):
+    # Columnas de la hoja 'infoventas' que usa el proceso (además de 'Proveedor' para el filtro)
+    COLUMNAS_VENTAS = [
+        'Cod. cliente', 'Cod. vendedor', 'Cod. productto',
+        'Fecha', 'Fac. numero', 'Cantidad', 'Vta neta',
+        'Tipo', 'Costo', 'Unidad', 'Pedido'
+    ]
+
+    def __init__(self, config_path, empresa='eje_cafetero', entradas=None):
         self.config = self._cargar_configuracion(config_path)
         # Usar configuración de empresa 'eje_cafetero'
-        self.company_config = self.config['companies']['eje_cafetero']
+        self.company_config = self.config['companies'][empresa]
         
         self.ventas_path = self.config['files'].get('ventas')
         self.output_folder = os.path.join(
@@ -37,11 +59,26 @@ class VentaProcessor:
         
         # Proveedores desde filtro_proveedores.criterios
         self.proveedores = self.company_config.get('filtro_proveedores', {}).get('criterios', [])
+        self.filtro_proveedores = FiltroProveedores(self.proveedores)
         
         # Mes y año se determinarán dinámicamente desde los datos del Excel
         self.mes = None
         self.ano = None
         self.filtered_data = None
+        # Insumos compartidos (ventas, inventario, rutero, PROVEE-TSOL): propios si la empresa se
+        # ejecuta sola, o los de ejecutar_todos.py si se procesan varias empresas en un mismo proceso
+        self.entradas = entradas or EntradasCompartidas(self.config)
+        self.entradas.registrar_consumidor(self.COLUMNAS_VENTAS + ['Proveedor'], self.proveedores)
+        self.cache = self.entradas.cache
+        # PROVEE-TSOL.xlsx se abre una sola vez y cada hoja se parsea una vez por ejecución
+        self.catalogo = self.entradas.libro(self.catalogo_principal)
+        self.tipologia_df = None
+        # Destino de los TXT: carpeta de salida o directamente el ZIP (config 'salida')
+        self.salida = SalidaTsol.desde_config(self.config, self.output_folder)
+        # Maestros (SKU, vendedores, municipios...) reutilizables entre ejecuciones si sus entradas no cambian
+        self.cache_etapas = CacheEtapas.desde_config(
+            self.config, self.cache, self.salida, self.company_config.get('codigo', empresa)
+        )
         self._crear_carpeta_salida()
 
     def _cargar_configuracion(self, config_path):
@@ -80,39 +117,35 @@ class VentaProcessor:
         self.verificar_archivo(self.ventas_path)
 
         try:
-            # Cargar todos los datos primero para determinar la fecha más reciente
-            all_data = pd.read_excel(
+            # Leer solo las filas del mes más reciente y de los proveedores configurados: los filtros
+            # se aplican mientras se recorre la hoja (una vez por proceso y desde la caché si el archivo
+            # no ha cambiado)
+            columnas_lectura = self.COLUMNAS_VENTAS + ['Proveedor']
+            periodo = (self.ano, self.mes) if self.ano and self.mes else None
+            if not self.proveedores:
+                logger.warning("No se especificaron proveedores para filtrar.")
+            self.filtered_data = self.entradas.ventas_periodo(
                 self.ventas_path,
-                sheet_name='infoventas',
-                parse_dates=['Fecha']
+                columnas_lectura,
+                self.proveedores,
+                periodo=periodo
             )
-            
-            # Encontrar la fecha más reciente en los datos
-            if all_data.empty or 'Fecha' not in all_data.columns:
+
+            # Fecha más reciente de todo el archivo (calculada durante la lectura)
+            fecha_maxima = self.filtered_data.attrs.get('fecha_maxima')
+            if fecha_maxima is None or pd.isna(pd.Timestamp(fecha_maxima)):
                 logger.error("No se encontraron datos o la columna 'Fecha' no existe")
                 raise ValueError("No se encontraron datos válidos en el archivo Excel")
-            
-            fecha_maxima = all_data['Fecha'].max()
-            self.mes = fecha_maxima.month
-            self.ano = fecha_maxima.year
-            
+
+            fecha_maxima = pd.Timestamp(fecha_maxima)
+            if periodo is None:
+                self.ano, self.mes = fecha_maxima.year, fecha_maxima.month
+
             logger.info(f"Fecha más reciente encontrada: {fecha_maxima}")
             logger.info(f"Mes y año determinados: Mes {self.mes}, Año {self.ano}")
-            
-            # Ahora filtrar por el período determinado
-            self.filtered_data = all_data[
-                (all_data['Fecha'].dt.month == self.mes) &
-                (all_data['Fecha'].dt.year == self.ano)
-            ]
             logger.info(f"Datos filtrados por período: Mes {self.mes}, Año {self.ano}.")
-
-            # Filtrar por proveedores si están definidos
             if self.proveedores:
-                regex_pattern = '|'.join([re.escape(proveedor) for proveedor in self.proveedores])
-                self.filtered_data = self.filtered_data[self.filtered_data['Proveedor'].str.contains(regex_pattern, case=False, na=False)]
                 logger.info(f"Datos filtrados por proveedores: {self.proveedores}")
-            else:
-                logger.warning("No se especificaron proveedores para filtrar.")
         except Exception as e:
             logger.error(f"Error al cargar y filtrar los datos: {e}")
             raise
@@ -123,11 +156,7 @@ class VentaProcessor:
             raise ValueError("Los datos no están cargados o filtrados. Ejecute 'cargar_y_filtrar_datos_por_periodo' primero.")
 
         try:
-            columnas_requeridas = [
-                'Cod. cliente', 'Cod. vendedor', 'Cod. productto',
-                'Fecha', 'Fac. numero', 'Cantidad', 'Vta neta',
-                'Tipo', 'Costo', 'Unidad', 'Pedido'
-            ]
+            columnas_requeridas = self.COLUMNAS_VENTAS
 
             # Validar columnas requeridas
             for columna in columnas_requeridas:
@@ -150,47 +179,15 @@ class VentaProcessor:
                 'Pedido': 'Numero Único de Pedido'
             })
 
-            # Convertir tipos y ajustar formato
-            self.filtered_data['Código Vendedor'] = self.filtered_data['Código Vendedor'].astype(str)
-            self.filtered_data['Código Producto (Sku)'] = self.filtered_data['Código Producto (Sku)'].astype(str).str.strip().str.upper()
-            self.filtered_data['Fecha'] = self.filtered_data['Fecha'].dt.strftime('%Y/%m/%d')
-            self.filtered_data['Numero Documento'] = self.filtered_data['Numero Documento'].astype(str)
-            self.filtered_data['Tipo'] = self.filtered_data['Tipo'].astype(str)
-            self.filtered_data['Cantidad'] = self.filtered_data['Cantidad'].astype(int)
-            self.filtered_data['Valor Total Item Vendido'] = pd.to_numeric(self.filtered_data['Valor Total Item Vendido'], errors='coerce').round(2)
-            self.filtered_data['Costo'] = pd.to_numeric(self.filtered_data['Costo'], errors='coerce').round(2)
-            
-            # Reemplazar guiones en Código Cliente con "999"
-            self.filtered_data['Código Cliente'] = self.filtered_data['Código Cliente'].apply(
-                lambda x: str(x).replace('-', '999')
-            )
-            
-            self.filtered_data_total = self.filtered_data.copy()
-            
-            # Limpieza de la columna 'Código Cliente'
-            self.filtered_data_total['Código Cliente'] = (
-                self.filtered_data_total['Código Cliente']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-                .str.replace('"', '')
-                .str.replace("'", '')
-            )
+            # Tipos y formato con reglas vectorizadas (tsol_ventas); 'Fecha' se conserva como fecha
+            # (AAAAMMDD entero tras compactar) y se formatea al escribir ventas.txt y el listado de facturas
+            ventas = compactar_ventas(aplicar_reglas(self.filtered_data, REGLAS_TIPOS, 'tipos'))
 
-            # Limpieza de la columna 'Código Producto (Sku)'
-            self.filtered_data_total['Código Producto (Sku)'] = (
-                self.filtered_data_total['Código Producto (Sku)']
-                .astype(str)
-                .str.strip()
-                .str.replace('"', '')
-                .str.replace("'", '')
-            )
-            
-            # Alternativa: Multiplicar por -1 para garantizar que los valores sean positivos cuando Tipo == 1
-            mask = self.filtered_data['Tipo'] == '1'
-            self.filtered_data.loc[mask, 'Cantidad'] = self.filtered_data.loc[mask, 'Cantidad'].apply(lambda x: x * -1 if x < 0 else x)
-            self.filtered_data.loc[mask, 'Valor Total Item Vendido'] = self.filtered_data.loc[mask, 'Valor Total Item Vendido'].apply(lambda x: x * -1 if x < 0 else x)
-            self.filtered_data.loc[mask, 'Costo'] = self.filtered_data.loc[mask, 'Costo'].apply(lambda x: x * -1 if x < 0 else x)
+            # Una sola copia física de las ventas del mes: las dos variantes son columnas superpuestas
+            # sobre el mismo frame compacto (con memoria ligera las demás columnas se comparten)
+            self.filtered_data_total = aplicar_reglas(ventas, REGLAS_TOTAL, 'total')
+            # Cantidades, valores y costos positivos cuando Tipo == 1
+            self.filtered_data = aplicar_reglas(ventas, REGLAS_SIGNO, 'signo')
 
             logger.info("Datos procesados exitosamente.")
         except Exception as e:
@@ -207,23 +204,13 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'ventas.txt')
 
             # Guardar el archivo TXT
-            txt_data = self.filtered_data.copy()
-            txt_data['Valor Total Item Vendido'] = txt_data['Valor Total Item Vendido'].map(
-                lambda x: f"{x:.2f}".replace('.', ',')
-            )
-            txt_data['Costo'] = txt_data['Costo'].map(
-                lambda x: f"{x:.2f}".replace('.', ',')
-            )
+            # Fecha y valores se formatean al escribir (AAAA/MM/DD y dos decimales con coma)
             txt_columns = [
                 'Código Cliente', 'Código Vendedor', 'Código Producto (Sku)',
                 'Fecha', 'Numero Documento', 'Cantidad',
                 'Valor Total Item Vendido', 'Tipo', 'Costo', 'Unidad de Medida', 'Numero Único de Pedido'
             ]
-            encabezado = '{'.join(txt_columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as file:
-                file.write(encabezado + '\n')
-                for _, row in txt_data[txt_columns].iterrows():
-                    file.write('{'.join(row.astype(str)) + '\n')
+            self.salida.escribir_txt(self.filtered_data, output_path_txt, columnas=txt_columns, formatos=FORMATOS_VENTAS)
             logger.info(f"Archivo TXT guardado exitosamente en: {output_path_txt}")
 
         except Exception as e:
@@ -243,26 +230,22 @@ class VentaProcessor:
                 raise KeyError(f"Las siguientes columnas están ausentes: {', '.join(missing_columns)}")
 
             # Agrupar datos por las columnas requeridas
-            facturas_resumen = self.filtered_data_total.groupby(
-                ['Código Cliente', 'Código Vendedor', 'Fecha', 'Numero Documento']
-            ).agg(
-                Valor_Total_Factura=('Valor Total Item Vendido', 'sum'),
-                Valor_Facturado_Casa_Comercial=('Valor Total Item Vendido', 'sum')
-            ).reset_index()
+            facturas_resumen, total_factura = sumar_por_claves(
+                self.filtered_data_total,
+                ['Código Cliente', 'Código Vendedor', 'Fecha', 'Numero Documento'],
+                'Valor Total Item Vendido'
+            )
 
-            # Convertir valores a formato con dos decimales
-            facturas_resumen['Valor_Total_Factura'] = facturas_resumen['Valor_Total_Factura'].round(2)
-            facturas_resumen['Valor_Facturado_Casa_Comercial'] = facturas_resumen['Valor_Facturado_Casa_Comercial'].round(2)
+            # Convertir la suma (en centavos) a formato con dos decimales, una vez para ambas columnas
+            valor_factura = desde_centavos(total_factura).round(2)
+            facturas_resumen['Valor_Total_Factura'] = valor_factura
+            facturas_resumen['Valor_Facturado_Casa_Comercial'] = valor_factura
 
             # Ruta para los archivos de salida
             output_txt = os.path.join(self.output_folder, 'Listado de Facturas.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(facturas_resumen.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in facturas_resumen.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(facturas_resumen, output_txt, formatos={'Fecha': 'fecha'})
             logger.info(f"Archivo TXT generado: {output_txt}")
 
         except Exception as e:
@@ -276,7 +259,7 @@ class VentaProcessor:
 
         try:
             # Calcular el total antes de cualquier conversión
-            total_valor_venta = self.filtered_data_total['Valor Total Item Vendido'].sum()
+            total_valor_venta = desde_centavos(self.filtered_data_total['Valor Total Item Vendido']).sum()
 
             # Crear el DataFrame con los resultados
             totales_control = pd.DataFrame({
@@ -288,11 +271,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Totales de Control.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(totales_control.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in totales_control.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(totales_control, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
         except Exception as e:
@@ -308,14 +287,10 @@ class VentaProcessor:
             # Verificar que el archivo exista
             self.verificar_archivo(interasesor_path)
 
-            # Cargar los datos de interasesor.txt
-            interasesor_data = pd.read_csv(
-                interasesor_path,
-                sep='{',
-                engine='python',
-                encoding='latin1',
-                names=["Codigo", "Documento", "Nombre", "Apellido", "Telefono", "Direccion",
-                       "Cargo", "Portafolio", "Estado", "Codigo supervisor", "Codigo bodega"]
+            # Cargar los asesores; solo se parsean los que tienen ventas en el período
+            # (el cruce se repite más abajo)
+            interasesor_data = self.entradas.maestro(
+                interasesor_path, COLUMNAS_INTERASESOR, claves=self.filtered_data_total['Código Vendedor'].unique()
             )
 
             # Filtrar solo los vendedores activos
@@ -342,11 +317,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Vendedores.txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(self.vendedores_final.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in self.vendedores_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(self.vendedores_final, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
         except Exception as e:
@@ -362,22 +333,15 @@ class VentaProcessor:
             # Verificar que el archivo exista
             self.verificar_archivo(intersupervisor_path)
 
-            # Cargar los datos de intersupervisor.txt
-            intersupervisor_data = pd.read_csv(
-                intersupervisor_path,
-                sep='{',
-                engine='python',
-                encoding='latin1',
-                names=["Codigo", "Documento", "Nombre", "Apellido", "Telefono", "Direccion",
-                       "Cargo", "Portafolio", "Estado", "Codigo bodega"]
-            )
+            # Obtener los códigos de supervisor del archivo de vendedores
+            supervisores_codigo = self.vendedores_final['Código Supervisor'].unique()
+
+            # Cargar los supervisores (solo los de esos vendedores)
+            intersupervisor_data = self.entradas.maestro(intersupervisor_path, COLUMNAS_INTERSUPERVISOR, claves=supervisores_codigo)
 
             # Filtrar solo los supervisores activos
             intersupervisor_data = intersupervisor_data[intersupervisor_data['Estado'].str.contains("Activado", na=False)]
 
-            # Obtener los códigos de supervisor del archivo de vendedores
-            supervisores_codigo = self.vendedores_final['Código Supervisor'].unique()
-
             # Filtrar los supervisores en base a los códigos de supervisor
             supervisores_final = intersupervisor_data[intersupervisor_data['Codigo'].isin(supervisores_codigo)]
 
@@ -394,29 +358,13 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'Supervisores.txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(supervisores_final.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in supervisores_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(supervisores_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
         except Exception as e:
             logger.error(f"Error al generar el archivo 'Supervisores': {e}")
             raise
 
-    def _normalizar_texto(self, texto):
-        """Normaliza texto eliminando tildes y caracteres especiales para matching."""
-        if pd.isna(texto):
-            return ""
-        texto = str(texto).strip()
-        # Eliminar tildes
-        texto = texto.replace('á', 'a').replace('é', 'e').replace('í', 'i')
-        texto = texto.replace('ó', 'o').replace('ú', 'u').replace('ñ', 'n')
-        texto = texto.replace('Á', 'A').replace('É', 'E').replace('Í', 'I')
-        texto = texto.replace('Ó', 'O').replace('Ú', 'U').replace('Ñ', 'N')
-        return texto
-
     def cargar_tipologia_negocio(self):
         """Carga la tipología de negocio desde PROVEE-TSOL.xlsx hoja TIPOLOGIA."""
         try:
@@ -428,11 +376,15 @@ class VentaProcessor:
             col_codigo = tip_config.get('columnas', {}).get('codigo', 'Cod. necesidad')
             col_descripcion = tip_config.get('columnas', {}).get('descripcion', 'Nom. necesidad')
             
-            # Leer hoja TIPOLOGIA
-            tipologia_df = pd.read_excel(self.catalogo_principal, sheet_name=hoja)
+            # La tipología se calcula una sola vez por ejecución (la usan Tipos De Negocio y Clientes)
+            if self.tipologia_df is not None:
+                return self.tipologia_df
+
+            # Leer hoja TIPOLOGIA (compartida: no se modifica en sitio)
+            tipologia_df = self.catalogo.hoja(hoja)
             
-            # Normalizar códigos para matching (eliminar tildes)
-            tipologia_df[col_codigo] = tipologia_df[col_codigo].apply(self._normalizar_texto)
+            # Normalizar códigos para matching (eliminar tildes), una vez por código distinto
+            tipologia_df = tipologia_df.assign(**{col_codigo: sin_tildes(tipologia_df[col_codigo])})
             
             # Crear diccionario de tipología: código normalizado -> código original
             self.tipologia_map = dict(zip(
@@ -441,7 +393,8 @@ class VentaProcessor:
             ))
             
             logger.info(f"Tipología cargada: {len(self.tipologia_map)} registros desde {hoja}")
-            return tipologia_df[[col_codigo, col_descripcion]]
+            self.tipologia_df = tipologia_df[[col_codigo, col_descripcion]]
+            return self.tipologia_df
             
         except Exception as e:
             logger.error(f"Error al cargar tipología de negocio: {e}")
@@ -467,11 +420,7 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'Tipos De Negocio.txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(tipos_negocio.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in tipos_negocio.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(tipos_negocio, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
         except Exception as e:
@@ -492,48 +441,34 @@ class VentaProcessor:
             col_proveedor = prod_config.get('columnas', {}).get('proveedor', 'Proveedor')
             
             # Cargar datos del catálogo principal
-            productos_df = pd.read_excel(self.catalogo_principal, sheet_name=hoja)
+            productos_df = self.catalogo.hoja(hoja)
 
             # Filtrar por proveedores si están definidos
             if self.proveedores:
-                regex_pattern = '|'.join([re.escape(proveedor) for proveedor in self.proveedores])
-                productos_df = productos_df[productos_df[col_proveedor].str.contains(regex_pattern, case=False, na=False)]
+                productos_df = self.filtro_proveedores.filtrar(productos_df, col_proveedor)
                 logger.info(f"Productos filtrados por proveedores: {len(productos_df)} registros")
 
-            # Seleccionar y renombrar columnas
-            productos_final = productos_df[[col_codigo, col_nombre, col_barras]].copy()
-            productos_final = productos_final.rename(columns={
-                col_codigo: 'Código',
-                col_nombre: 'Nombre',
-                col_barras: 'Código De Barras'
-            })
-
-            # Convertir a texto y limpiar
-            productos_final['Código'] = productos_final['Código'].astype(str).str.strip().str.split('.').str[0]
-            productos_final['Código De Barras'] = productos_final['Código De Barras'].astype(str).str.strip()
-
-            # Agregar las columnas estáticas
-            productos_final['Tipo Referencia'] = 'RG'
-            productos_final['Tipo De Unidad'] = 'UND'
-            productos_final['Compañía'] = productos_final['Código De Barras']
-
-            # Seleccionar y ordenar columnas
-            productos_final = productos_final[[
-                'Código', 'Nombre', 'Tipo Referencia', 'Tipo De Unidad', 'Código De Barras', 'Compañía'
-            ]]
-
-            # Asignar productos_final como la maestra SKU
-            self.sku_maestra = productos_final
+            # Proyección de la maestra: códigos limpios y columnas estáticas en el orden requerido
+            codigo_barras = productos_df[col_barras].astype(str).str.strip()
+            productos_final = pd.DataFrame({
+                'Código': normalizar_por_valor(
+                    productos_df[col_codigo], lambda codigos: codigos.astype(str).str.strip().str.split('.').str[0]
+                ),
+                'Nombre': productos_df[col_nombre],
+                'Tipo Referencia': 'RG',
+                'Tipo De Unidad': 'UND',
+                'Código De Barras': codigo_barras,
+                'Compañía': codigo_barras
+            }, index=productos_df.index)
+
+            # Asignar productos_final como la maestra SKU, indexada por código para los cruces posteriores
+            self.sku_maestra = productos_final.set_index('Código', drop=False).rename_axis(None)
 
             # Ruta para guardar el archivo TXT
             output_path_txt = os.path.join(self.output_folder, 'SKU (Productos).txt')
             
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(productos_final.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in productos_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(productos_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
         except Exception as e:
@@ -550,30 +485,16 @@ class VentaProcessor:
             self.verificar_archivo(intercliente_path)
             self.verificar_archivo(self.catalogo_principal)
 
-            # Limpiar el archivo de entrada antes de cargarlo con pandas
-            cleaned_lines = []
-            with open(intercliente_path, 'r', encoding='Windows-1252') as file:
-                for line in file:
-                    # Reemplazar comillas estándar y no estándar con expresión regular
-                    cleaned_line = line.strip().strip('"').strip('"').strip('"').strip("'").strip('`')
-                    cleaned_line = re.sub(r'^"|"$', '', cleaned_line).strip()
-                    cleaned_lines.append(cleaned_line)
-
-            # Crear un archivo temporal limpio
-            temp_path = 'intercliente_cleaned_eje.txt'
-            with open(temp_path, 'w', encoding='Windows-1252') as temp_file:
-                temp_file.write("\n".join(cleaned_lines))
-
-            # Cargar datos limpios con pandas
-            intercliente_data = pd.read_csv(
-                temp_path,
-                sep='{',
-                engine='python',
-                encoding='Windows-1252',
-                names=["Cod. Cliente", "Nom. Cliente", "Fecha Ingreso", "Nit", "Direccion",
-                       "Telefono", "Representante Legal", "Codigo Municipio",
-                       "Codigo Negocio", "Tipo Negocio", "Estracto", "Barrio"]
-            )
+            # Normalizar códigos de clientes únicos del DataFrame de ventas
+            clientes_unicos = normalizar_por_valor(
+                self.filtered_data_total['Código Cliente'],
+                lambda codigos: codigos.astype(str).str.strip().str.replace('-', '999')
+            ).unique()
+
+            # Quitar comillas de cada línea mientras se parsea, sin archivo temporal (este archivo solo
+            # trae comillas rectas en los extremos); solo se tokenizan los clientes con ventas
+            # (el cruce se repite más abajo)
+            intercliente_data = self.entradas.intercliente(intercliente_path, comillas=('"', "'", '`'), clientes=clientes_unicos)
 
             # Renombrar y limpiar columnas
             intercliente_data.rename(columns={
@@ -585,41 +506,29 @@ class VentaProcessor:
                 "Telefono": "Teléfono"
             }, inplace=True)
 
-            # Normalizar códigos
-            intercliente_data['Código'] = (
-                intercliente_data['Código']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-                .str.replace('"', '')
+            # Normalizar códigos (el strip final cubre los espacios que quedan tras quitar comillas)
+            intercliente_data['Código'] = normalizar_por_valor(
+                intercliente_data['Código'],
+                lambda codigos: (
+                    codigos
+                    .astype(str)
+                    .str.strip()
+                    .str.replace('-', '999')
+                    .str.replace('"', '')
+                    .str.strip()
+                )
             )
 
             # Cargar tipología desde PROVEE-TSOL
             self.cargar_tipologia_negocio()
 
-            # Normalizar códigos de clientes únicos del DataFrame de ventas
-            clientes_unicos = (
-                self.filtered_data_total['Código Cliente']
-                .astype(str)
-                .str.strip()
-                .str.replace('-', '999')
-                .unique()
-            )
-
             # Filtrar clientes presentes en intercliente.txt
-            intercliente_data['Código'] = intercliente_data['Código'].str.strip()
             clientes_final = intercliente_data[intercliente_data['Código'].isin(clientes_unicos)].copy()
 
-            # Determinar Código Tipo Negocio desde columna 'Codigo Negocio' cruzando con tipología
-            def tipo_negocio(codigo_negocio):
-                codigo_negocio_norm = self._normalizar_texto(codigo_negocio)
-                # Buscar en tipología map
-                if codigo_negocio_norm in self.tipologia_map:
-                    return self.tipologia_map[codigo_negocio_norm]
-                # Default: devolver el código normalizado
-                return codigo_negocio_norm
-
-            clientes_final['Código Tipo Negocio'] = clientes_final['Codigo Negocio'].apply(tipo_negocio)
+            # Determinar Código Tipo Negocio desde columna 'Codigo Negocio' cruzando con tipología:
+            # código sin tildes y un solo cruce indexado contra el mapa; sin coincidencia queda el código normalizado
+            codigo_negocio_norm = sin_tildes(clientes_final['Codigo Negocio'])
+            clientes_final['Código Tipo Negocio'] = codigo_negocio_norm.map(self.tipologia_map).fillna(codigo_negocio_norm)
 
             # Agregar columnas adicionales
             clientes_final['Código Sector DANE'] = ''
@@ -640,11 +549,7 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'Clientes.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(columnas_finales)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in clientes_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(clientes_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
         except Exception as e:
@@ -661,21 +566,22 @@ class VentaProcessor:
             self.verificar_archivo(inventario_path)
 
             # Cargar los datos del archivo de inventario
-            inventario_data = pd.read_excel(inventario_path, sheet_name='Informe')
+            inventario_data = self.entradas.libro(inventario_path).hoja('Informe')
 
             # Filtrar por proveedores definidos
             if not self.proveedores:
                 raise ValueError("No se encontraron proveedores para filtrar el inventario.")
 
-            regex_pattern = '|'.join([re.escape(proveedor) for proveedor in self.proveedores])
-            inventario_data = inventario_data[inventario_data['Proveedor'].str.contains(regex_pattern, case=False, na=False)]
+            inventario_data = self.filtro_proveedores.filtrar(inventario_data, 'Proveedor')
 
             # Normalizar los códigos en inventario
-            inventario_data['Codigo articulo'] = inventario_data['Codigo articulo'].astype(str).str.strip().str.split('.').str[0]
+            inventario_data['Codigo articulo'] = normalizar_por_valor(
+                inventario_data['Codigo articulo'], lambda codigos: codigos.astype(str).str.strip().str.split('.').str[0]
+            )
 
             # Filtrar los productos que están en la maestra SKU
             if hasattr(self, 'sku_maestra'):
-                inventario_data = inventario_data[inventario_data['Codigo articulo'].isin(self.sku_maestra['Código'])]
+                inventario_data = inventario_data[inventario_data['Codigo articulo'].isin(self.sku_maestra.index)]
 
             # Crear DataFrame con las columnas requeridas
             inventario_final = inventario_data[['Codigo articulo', 'Unidades']].rename(columns={
@@ -684,7 +590,7 @@ class VentaProcessor:
             })
             
             # Agregar columnas adicionales
-            inventario_final['Fecha'] = datetime.now().strftime('%Y/%m/%d')
+            inventario_final['Fecha'] = datetime.now().strftime(FORMATO_FECHA)
             inventario_final['Unidad de Medida'] = 'UND'
 
             # Seleccionar el orden de columnas
@@ -701,11 +607,7 @@ class VentaProcessor:
             output_path_txt = os.path.join(self.output_folder, 'Inventario.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(inventario_final.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in inventario_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(inventario_final, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
         except Exception as e:
@@ -721,18 +623,12 @@ class VentaProcessor:
             # Verificar que el archivo exista
             self.verificar_archivo(interciudad_path)
 
-            # Cargar los datos del archivo interciudad.txt
-            interciudad_data = pd.read_csv(
-                interciudad_path,
-                sep='{',
-                engine='python',
-                encoding='latin1',
-                names=["Código", "Nombre"]
-            )
-
             # Extraer los municipios únicos del DataFrame de clientes
             municipios_clientes = self.clientes_final['Código Municipio'].dropna().unique()
 
+            # Cargar los municipios (solo los de esos clientes)
+            interciudad_data = self.entradas.maestro(interciudad_path, COLUMNAS_INTERCIUDAD, claves=municipios_clientes)
+
             # Filtrar los municipios en interciudad que aparecen en el DataFrame de clientes
             municipios_final = interciudad_data[interciudad_data['Código'].isin(municipios_clientes)].drop_duplicates()
 
@@ -740,11 +636,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Municipios.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(municipios_final.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in municipios_final.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(municipios_final, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
         except Exception as e:
@@ -775,11 +667,7 @@ class VentaProcessor:
             output_txt = os.path.join(self.output_folder, 'Barrios.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(barrios_df.columns)
-            with open(output_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in barrios_df.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(barrios_df, output_txt)
             logger.info(f"Archivo TXT generado: {output_txt}")
 
         except Exception as e:
@@ -796,7 +684,7 @@ class VentaProcessor:
             self.verificar_archivo(rutas_path)
             
             # Cargar datos del archivo rutero
-            rutas_df = pd.read_excel(rutas_path, sheet_name='Informe')
+            rutas_df = self.entradas.libro(rutas_path).hoja('Informe')
 
             # Asegurarse de que las columnas necesarias existan
             rutas_df = rutas_df.rename(columns={'Codigo': 'Código Cliente', 'Cod. Asesor': 'Código Vendedor'})
@@ -815,17 +703,15 @@ class VentaProcessor:
             rutas_data['Frecuencia'] = 4
 
             # Aplicar el reemplazo en el código del cliente
-            rutas_data['Código Cliente'] = rutas_data['Código Cliente'].apply(lambda x: str(x).replace('-', '999'))
+            rutas_data['Código Cliente'] = normalizar_por_valor(
+                rutas_data['Código Cliente'], lambda codigos: codigos.map(lambda x: str(x).replace('-', '999'))
+            )
 
             # Guardar archivos
             output_path_txt = os.path.join(self.output_folder, 'Rutas.txt')
 
             # Guardar archivo TXT
-            encabezado_txt = '{'.join(rutas_data.columns)
-            with open(output_path_txt, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(encabezado_txt + '\n')
-                for _, row in rutas_data.iterrows():
-                    txt_file.write('{'.join(map(str, row)) + '\n')
+            self.salida.escribir_txt(rutas_data, output_path_txt)
             logger.info(f"Archivo TXT generado: {output_path_txt}")
 
         except Exception as e:
@@ -853,7 +739,7 @@ class VentaProcessor:
             if hasattr(self, 'filtered_data_total') and hasattr(self, 'inventario_final'):
                 productos_inventario = set(self.inventario_final['Código Producto'])
                 if hasattr(self, 'sku_maestra'):
-                    productos_maestra = set(self.sku_maestra['Código'])
+                    productos_maestra = set(self.sku_maestra.index)
                     productos_faltantes = productos_inventario - productos_maestra
                     if productos_faltantes:
                         inconsistencias.append({
@@ -883,22 +769,13 @@ class VentaProcessor:
         try:
             # Obtener la última fecha de venta reportada
             if hasattr(self, 'filtered_data_total') and not self.filtered_data_total.empty:
-                if isinstance(self.filtered_data_total['Fecha'].iloc[0], str):
-                    fechas = pd.to_datetime(self.filtered_data_total['Fecha'])
-                    ultima_fecha = fechas.max()
-                else:
-                    ultima_fecha = self.filtered_data_total['Fecha'].max()
+                # 'Fecha' queda como AAAAMMDD entero (o datetime) hasta la escritura
+                ultima_fecha = fechas_de(self.filtered_data_total['Fecha']).max()
                     
                 try:
-                    if isinstance(ultima_fecha, str):
-                        partes = ultima_fecha.split('/')
-                        dia = int(partes[2])
-                        mes = int(partes[1])
-                        ano = int(partes[0])
-                    else:
-                        dia = ultima_fecha.day
-                        mes = ultima_fecha.month
-                        ano = ultima_fecha.year
+                    dia = ultima_fecha.day
+                    mes = ultima_fecha.month
+                    ano = ultima_fecha.year
                 except Exception:
                     logger.warning("No se pudo determinar la última fecha de venta. Usando último día del mes.")
                     dia = calendar.monthrange(int(self.ano), int(self.mes))[1]
@@ -919,6 +796,12 @@ class VentaProcessor:
                 os.makedirs(historico_folder)
                 logger.info(f"Carpeta de histórico creada: {historico_folder}")
             
+            # En modo zip_directo cada etapa ya escribió su archivo dentro del ZIP: solo falta cerrarlo
+            if self.salida.zip_directo:
+                historico_zip_path = self.salida.cerrar_zip(os.path.join(historico_folder, zip_filename))
+                logger.info(f"Proceso de compresión completado. ZIP guardado en: {historico_zip_path}")
+                return historico_zip_path
+
             # Crear el archivo ZIP solo con archivos TXT
             txt_files = []
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
@@ -1004,39 +887,142 @@ class VentaProcessor:
             logger.error(f"Error al enviar el archivo por FTP: {e}")
             return False
 
-# Ejecución del script
-if __name__ == '__main__':
-    config_path = 'config.json'
 
-    processor = VentaProcessor(config_path)
-
-    # Cargar y filtrar los datos
-    processor.cargar_y_filtrar_datos_por_periodo()
-
-    # Procesar los datos
-    processor.procesar_datos()
-
-    # Guardar los resultados
-    processor.guardar_archivo_ventas()
-    processor.generar_listado_facturas()
-    processor.generar_totales_de_control()
-    processor.generar_vendedores()
-    processor.generar_supervisores()
-    processor.generar_tipos_de_negocio()
-    processor.generar_sku_productos()
-    processor.generar_clientes()
-    processor.generar_municipios()
-    processor.generar_inventario()
-    processor.generar_barrios()
-    processor.generar_rutas()
-    processor.validar_inconsistencias()
-    
-    # Comprimir archivos
-    zip_path = processor.comprimir_archivos()
+def etapas_pipeline(processor):
+    """
+    Etapas TSOL de la empresa con los datos que cada una lee y produce. El planificador deduce de aquí
+    qué etapas pueden correr a la vez (por ejemplo vendedores, SKU y tipos de negocio).
+    """
+    def comprimir():
+        # Liberar los libros Excel abiertos (las hojas ya parseadas quedan en memoria)
+        processor.entradas.cerrar()
+        return processor.comprimir_archivos()
+
+    # Maestros que se reutilizan de la ejecución anterior si no cambiaron sus archivos, su parte del
+    # config ni las claves que reciben de etapas previas (config 'cache.etapas')
+    cache = processor.cache_etapas
+    config_empresa = processor.company_config
+    paths = config_empresa['paths']
+    generar_vendedores = cache.envolver(
+        'generar_vendedores', processor.generar_vendedores,
+        lambda: cache.huella([paths['interasesor']], claves=[processor.filtered_data_total['Código Vendedor']]),
+        processor, 'vendedores_final'
+    )
+    generar_supervisores = cache.envolver(
+        'generar_supervisores', processor.generar_supervisores,
+        lambda: cache.huella([paths['intersupervisor']], claves=[processor.vendedores_final['Código Supervisor']])
+    )
+    generar_tipos_de_negocio = cache.envolver(
+        'generar_tipos_de_negocio', processor.generar_tipos_de_negocio,
+        lambda: cache.huella([processor.catalogo_principal], config=config_empresa.get('tipologia_negocio', {}))
+    )
+    generar_sku_productos = cache.envolver(
+        'generar_sku_productos', processor.generar_sku_productos,
+        lambda: cache.huella([processor.catalogo_principal], config={
+            'filtros_productos': config_empresa.get('filtros_productos', {}),
+            'proveedores': processor.proveedores
+        }),
+        processor, 'sku_maestra'
+    )
+    generar_municipios = cache.envolver(
+        'generar_municipios', processor.generar_municipios,
+        lambda: cache.huella([paths['interciudad']], claves=[processor.clientes_final['Código Municipio']])
+    )
+
+    return [
+        Etapa('cargar_y_filtrar_datos_por_periodo', processor.cargar_y_filtrar_datos_por_periodo,
+              salidas=['ventas_periodo'], estado=['filtered_data', 'mes', 'ano']),
+        Etapa('procesar_datos', processor.procesar_datos,
+              entradas=['ventas_periodo'], salidas=['filtered_data', 'filtered_data_total'],
+              estado=['filtered_data', 'filtered_data_total']),
+        Etapa('guardar_archivo_ventas', processor.guardar_archivo_ventas,
+              entradas=['filtered_data'], salidas=['ventas.txt']),
+        Etapa('generar_listado_facturas', processor.generar_listado_facturas,
+              entradas=['filtered_data_total'], salidas=['Listado de Facturas.txt']),
+        Etapa('generar_totales_de_control', processor.generar_totales_de_control,
+              entradas=['filtered_data_total'], salidas=['Totales de Control.txt']),
+        Etapa('generar_vendedores', generar_vendedores,
+              entradas=['filtered_data_total'], salidas=['vendedores_final', 'Vendedores.txt'],
+              estado=['vendedores_final']),
+        Etapa('generar_supervisores', generar_supervisores,
+              entradas=['vendedores_final'], salidas=['Supervisores.txt']),
+        Etapa('cargar_tipologia_negocio', processor.cargar_tipologia_negocio,
+              salidas=['tipologia_df'], estado=['tipologia_df', 'tipologia_map']),
+        Etapa('generar_tipos_de_negocio', generar_tipos_de_negocio,
+              entradas=['tipologia_df'], salidas=['Tipos De Negocio.txt']),
+        Etapa('generar_sku_productos', generar_sku_productos,
+              salidas=['sku_maestra', 'SKU (Productos).txt'], estado=['sku_maestra']),
+        Etapa('generar_clientes', processor.generar_clientes,
+              entradas=['filtered_data_total', 'tipologia_df'], salidas=['clientes_final', 'Clientes.txt'],
+              estado=['clientes_final']),
+        Etapa('generar_municipios', generar_municipios,
+              entradas=['clientes_final'], salidas=['Municipios.txt']),
+        Etapa('generar_inventario', processor.generar_inventario,
+              entradas=['sku_maestra'], salidas=['inventario_final', 'Inventario.txt'],
+              estado=['inventario_final']),
+        Etapa('generar_barrios', processor.generar_barrios,
+              entradas=['clientes_final'], salidas=['Barrios.txt']),
+        Etapa('generar_rutas', processor.generar_rutas,
+              entradas=['filtered_data_total'], salidas=['Rutas.txt']),
+        Etapa('validar_inconsistencias', processor.validar_inconsistencias,
+              entradas=['clientes_final', 'filtered_data_total', 'inventario_final', 'sku_maestra'],
+              salidas=['Reporte de Inconsistencias.xlsx']),
+        # El ZIP se arma al final, con todos los archivos escritos
+        Etapa('comprimir_archivos', comprimir,
+              entradas=['ventas.txt', 'Listado de Facturas.txt', 'Totales de Control.txt', 'Vendedores.txt',
+                        'Supervisores.txt', 'Tipos De Negocio.txt', 'SKU (Productos).txt', 'Clientes.txt',
+                        'Municipios.txt', 'Inventario.txt', 'Barrios.txt', 'Rutas.txt',
+                        'Reporte de Inconsistencias.xlsx'],
+              salidas=['zip_path'])
+    ]
+
+
+def ejecutar_pipeline(processor, reanudar=False):
+    """
+    Ejecuta todas las etapas TSOL de una empresa y devuelve la ruta del ZIP generado.
+    Las etapas independientes corren en paralelo con config['pipeline']['workers'] hilos (1 = en serie).
+    Cada etapa deja un punto de control (config 'checkpoint'); con reanudar=True se retoma la última
+    ejecución incompleta desde la primera etapa sin terminar.
+    """
+    workers = processor.config.get('pipeline', {}).get('workers', 4)
+    puntos_control = PuntosControl.desde_config(
+        processor.config, processor, processor.company_config['codigo'],
+        salida=processor.salida, reanudar=reanudar, archivos=processor.company_config['paths'].values()
+    )
+    resultados = Planificador(etapas_pipeline(processor), workers=workers, puntos_control=puntos_control).ejecutar()
+
+    zip_path = resultados['comprimir_archivos']
     print(f"Archivos TXT comprimidos y guardados en: {zip_path}")
     
     # Enviar por FTP
-    if processor.enviar_por_ftp(zip_path):
+    enviado = processor.enviar_por_ftp(zip_path)
+    if enviado:
         print(f"Archivo enviado exitosamente al servidor FTP")
     else:
         print("No se envió el archivo por FTP (deshabilitado o error)")
+
+    if puntos_control is not None:
+        if enviado or not processor.company_config.get('ftp_enabled', False):
+            puntos_control.finalizar()
+        else:
+            # El ZIP ya está listo: al reanudar solo se reintenta el envío
+            puntos_control.liberar()
+            print("Use --resume para reintentar el envío sin regenerar los archivos")
+
+    return zip_path
+
+
+# Ejecución del script
+if __name__ == '__main__':
+    config_path = 'config.json'
+
+    parser = argparse.ArgumentParser(description="Genera los archivos TSOL de la empresa")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reanudar la última ejecución incompleta desde la primera etapa sin terminar")
+    args = parser.parse_args()
+
+    processor = VentaProcessor(config_path)
+    # Memoria ligera (config 'memoria'): Copy-on-Write para no duplicar el frame de ventas; la opción es
+    # global, por eso se activa aquí y no al crear el procesador
+    configurar_memoria(processor.config)
+    ejecutar_pipeline(processor, reanudar=args.resume)
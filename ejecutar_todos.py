@@ -1,11 +1,36 @@
 """
 Script para ejecutar la generación TSOL de ambas empresas
 DISTRIJASS CALI (211688) y EJE CAFETERO (211697)
+
+Modos:
+  python ejecutar_todos.py              -> un subproceso por empresa (modo original)
+  python ejecutar_todos.py --un-proceso -> todas las empresas de config['companies'] en un solo proceso,
+                                           leyendo una sola vez ventas, inventario, rutero y PROVEE-TSOL
+  python ejecutar_todos.py --paralelo [--workers N]
+                                        -> las empresas de config['companies'] en paralelo (un proceso
+                                           por empresa, como máximo N a la vez), cada una con su log
+  --resume                              -> en cualquier modo, cada empresa retoma su última ejecución
+                                           incompleta desde la primera etapa sin terminar
 """
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import os
 import subprocess
 import sys
+import time
+
+from tsol_pipeline import memoria_pico_mb
+
+# Módulo por empresa cuando config['companies'][...] no define 'modulo'
+MODULOS_POR_EMPRESA = {
+    'distrijass': 'PlanosTsol_Distrijass',
+    'eje_cafetero': 'PlanosTsol_Eje'
+}
 
-def ejecutar_script(nombre_script, descripcion):
+def ejecutar_script(nombre_script, descripcion, argumentos=()):
     """Ejecuta un script Python y muestra el resultado"""
     print(f"\n{'='*80}")
     print(f"Ejecutando: {descripcion}")
@@ -13,7 +38,7 @@ def ejecutar_script(nombre_script, descripcion):
     
     try:
         resultado = subprocess.run(
-            [sys.executable, nombre_script],
+            [sys.executable, nombre_script, *argumentos],
             capture_output=False,
             text=True,
             check=True
@@ -27,20 +52,148 @@ def ejecutar_script(nombre_script, descripcion):
         print(f"\n✗ Error inesperado: {e}")
         return False
 
+def ejecutar_en_un_proceso(config_path, reanudar=False):
+    """
+    Procesa todas las empresas de config['companies'] dentro de este proceso.
+    Los insumos compartidos (config['files']) se leen una vez y cada empresa aplica
+    sus propios filtros de proveedores y sus archivos 'paths'.
+    """
+    from tsol_lectores import EntradasCompartidas
+    from tsol_ventas import configurar_memoria
+
+    with open(config_path, 'r', encoding='utf-8') as file:
+        config = json.load(file)
+
+    # Memoria ligera (config 'memoria'): una sola vez para todo el proceso, antes de leer los insumos
+    configurar_memoria(config)
+    entradas = EntradasCompartidas(config)
+
+    # Crear primero todos los procesadores para que la lectura compartida conozca
+    # las columnas y proveedores de todas las empresas
+    empresas = []
+    resultados = {}
+    for clave, empresa_config in config['companies'].items():
+        nombre = empresa_config.get('name', clave)
+        try:
+            modulo = importlib.import_module(empresa_config.get('modulo', MODULOS_POR_EMPRESA.get(clave)))
+            processor = modulo.VentaProcessor(config_path, empresa=clave, entradas=entradas)
+            empresas.append((nombre, modulo, processor))
+        except Exception as e:
+            print(f"\n✗ Error al preparar {nombre}: {e}")
+            resultados[nombre] = False
+
+    for indice, (nombre, modulo, processor) in enumerate(empresas, start=1):
+        print(f"\n{'='*80}")
+        print(f"[{indice}/{len(empresas)}] Procesando: {nombre} ({processor.company_config.get('codigo')})")
+        print(f"{'='*80}\n")
+
+        # Cada empresa escribe en su propio log
+        logging.basicConfig(filename=modulo.LOG_FILE, level=logging.DEBUG, format=modulo.LOG_FORMAT, force=True)
+        inicio = time.perf_counter()
+        try:
+            modulo.ejecutar_pipeline(processor, reanudar=reanudar)
+            resultados[nombre] = True
+        except Exception as e:
+            logging.getLogger().error(f"Error al procesar {nombre}: {e}")
+            print(f"\n✗ Error al procesar {nombre}: {e}")
+            resultados[nombre] = False
+        print(f"Duración {nombre}: {time.perf_counter() - inicio:.1f}s")
+
+    entradas.cerrar()
+    return resultados
+
+def ejecutar_empresa(config_path, clave, reanudar=False):
+    """
+    Procesa una empresa en un proceso del pool y devuelve su resumen.
+    Los errores se devuelven en el resumen para que una empresa fallida no detenga a las demás.
+    """
+    from tsol_ventas import configurar_memoria
+
+    inicio = time.perf_counter()
+    resumen = {'clave': clave, 'nombre': clave, 'exito': False, 'duracion': 0.0,
+               'filas': None, 'memoria_pico_mb': None, 'error': None}
+    try:
+        with open(config_path, 'r', encoding='utf-8') as file:
+            config = json.load(file)
+        empresa_config = config['companies'][clave]
+        resumen['nombre'] = empresa_config.get('name', clave)
+
+        modulo = importlib.import_module(empresa_config.get('modulo', MODULOS_POR_EMPRESA.get(clave)))
+        # Log propio de la empresa aunque el proceso del pool venga de otra configuración
+        logging.basicConfig(filename=modulo.LOG_FILE, level=logging.DEBUG, format=modulo.LOG_FORMAT, force=True)
+
+        # Memoria ligera (config 'memoria'): el proceso del pool atiende solo esta empresa
+        configurar_memoria(config)
+
+        processor = modulo.VentaProcessor(config_path, empresa=clave)
+        modulo.ejecutar_pipeline(processor, reanudar=reanudar)
+        resumen['filas'] = len(processor.filtered_data)
+        resumen['exito'] = True
+    except Exception as e:
+        logging.getLogger().error(f"Error al procesar {resumen['nombre']}: {e}")
+        resumen['error'] = str(e)
+    resumen['duracion'] = time.perf_counter() - inicio
+    resumen['memoria_pico_mb'] = memoria_pico_mb()
+    return resumen
+
+def ejecutar_en_paralelo(config_path, workers=None, reanudar=False):
+    """
+    Procesa las empresas de config['companies'] en un pool de procesos.
+    Cada proceso atiende una sola empresa (maxtasksperchild=1), así el log y la memoria pico
+    reportada corresponden únicamente a esa empresa.
+    """
+    with open(config_path, 'r', encoding='utf-8') as file:
+        config = json.load(file)
+
+    claves = list(config['companies'])
+    workers = workers or min(len(claves), os.cpu_count() or 1)
+    print(f"\nProcesando {len(claves)} empresas en paralelo con {workers} procesos...")
+
+    resultados = {}
+    with multiprocessing.Pool(processes=workers, maxtasksperchild=1) as pool:
+        tareas = [pool.apply_async(ejecutar_empresa, (config_path, clave, reanudar)) for clave in claves]
+        for tarea in tareas:
+            resumen = tarea.get()
+            if resumen['exito']:
+                print(f"✓ {resumen['nombre']} terminó en {resumen['duracion']:.1f}s")
+            else:
+                print(f"\n✗ Error al procesar {resumen['nombre']}: {resumen['error']}")
+            resultados[resumen['nombre']] = resumen
+    return resultados
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera los archivos TSOL de todas las empresas")
+    parser.add_argument('--un-proceso', action='store_true',
+                        help="Procesar todas las empresas en un solo proceso compartiendo los insumos leídos")
+    parser.add_argument('--paralelo', action='store_true',
+                        help="Procesar las empresas en paralelo, un proceso por empresa")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Número máximo de empresas simultáneas con --paralelo (por defecto, una por empresa sin superar los CPU)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reanudar la última ejecución incompleta de cada empresa desde la primera etapa sin terminar")
+    parser.add_argument('--config', default='config.json', help="Ruta del archivo de configuración")
+    args = parser.parse_args()
+
     print("\n" + "="*80)
     print("=== GENERADOR TSOL - DISTRIJASS (AMBAS EMPRESAS) ===")
     print("="*80)
     
     resultados = {}
+    inicio_total = time.perf_counter()
     
-    # Ejecutar Distrijass Cali
-    print("\n[1/2] Procesando DISTRIJASS CALI...")
-    resultados['Distrijass Cali'] = ejecutar_script('PlanosTsol_Distrijass.py', 'DISTRIJASS CALI (211688)')
+    if args.paralelo:
+        resultados = ejecutar_en_paralelo(args.config, workers=args.workers, reanudar=args.resume)
+    elif args.un_proceso:
+        resultados = ejecutar_en_un_proceso(args.config, reanudar=args.resume)
+    else:
+        argumentos = ['--resume'] if args.resume else []
+        # Ejecutar Distrijass Cali
+        print("\n[1/2] Procesando DISTRIJASS CALI...")
+        resultados['Distrijass Cali'] = ejecutar_script('PlanosTsol_Distrijass.py', 'DISTRIJASS CALI (211688)', argumentos)
     
-    # Ejecutar Eje Cafetero
-    print("\n[2/2] Procesando DISTRIJASS EJE CAFETERO...")
-    resultados['Eje Cafetero'] = ejecutar_script('PlanosTsol_Eje.py', 'DISTRIJASS EJE CAFETERO (211697)')
+        # Ejecutar Eje Cafetero
+        print("\n[2/2] Procesando DISTRIJASS EJE CAFETERO...")
+        resultados['Eje Cafetero'] = ejecutar_script('PlanosTsol_Eje.py', 'DISTRIJASS EJE CAFETERO (211697)', argumentos)
     
     # Resumen final
     print("\n" + "="*80)
@@ -50,15 +203,23 @@ if __name__ == '__main__':
     exitosos = 0
     fallidos = 0
     
-    for empresa, exito in resultados.items():
-        if exito:
-            print(f"✓ {empresa}: EXITOSO")
+    for empresa, resultado in resultados.items():
+        # En modo paralelo cada empresa devuelve su resumen; en los demás modos, solo el estado
+        resumen = resultado if isinstance(resultado, dict) else {'exito': resultado}
+        detalle = ''
+        if 'duracion' in resumen:
+            filas = resumen['filas'] if resumen['filas'] is not None else 'n/d'
+            memoria = f"{resumen['memoria_pico_mb']:.0f} MB" if resumen['memoria_pico_mb'] is not None else 'n/d'
+            detalle = f" ({resumen['duracion']:.1f}s, {filas} filas de ventas, memoria pico {memoria})"
+        if resumen['exito']:
+            print(f"✓ {empresa}: EXITOSO{detalle}")
             exitosos += 1
         else:
-            print(f"✗ {empresa}: FALLIDO")
+            print(f"✗ {empresa}: FALLIDO{detalle}")
             fallidos += 1
     
     print(f"\nTotal: {exitosos} exitosos, {fallidos} fallidos")
+    print(f"Tiempo total: {time.perf_counter() - inicio_total:.1f}s")
     print("\nProcesamiento completado.\n")
     
     # Salir con código de error si hubo fallos
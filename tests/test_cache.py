@@ -0,0 +1,146 @@
+# test_cache.py
+# Ida y vuelta de CacheBinaria (pickle y, si pyarrow está instalado, Parquet) conservando attrs
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import tsol_cache
+from tsol_cache import CacheBinaria
+
+
+def _ventas():
+    df = pd.DataFrame({
+        'Cod. cliente': ['001', '002', None],
+        'Vta neta': [1500.5, -20.0, 3.25],
+        'Fecha': pd.to_datetime(['2024-03-01', '2024-03-15', '2024-03-31'])
+    })
+    df.attrs['fecha_maxima'] = '2024-03-31T00:00:00'
+    df.attrs['periodo'] = [2024, 3]
+    return df
+
+
+def _ida_y_vuelta(tmp_path, df):
+    cache = CacheBinaria(carpeta=str(tmp_path / 'cache'))
+    origen = tmp_path / 'infoventas.xlsx'
+    origen.write_bytes(b'contenido')
+    guardado = cache.obtener('infoventas', str(origen), lambda: df, parametros={'periodo': None})
+    leido = cache.obtener('infoventas', str(origen), lambda: pytest.fail('la caché debía reutilizarse'),
+                          parametros={'periodo': None})
+    return guardado, leido
+
+
+def test_pickle_conserva_frame_y_attrs(tmp_path, monkeypatch):
+    monkeypatch.setattr(tsol_cache, 'PARQUET_DISPONIBLE', False)
+
+    _, leido = _ida_y_vuelta(tmp_path, _ventas())
+
+    pd.testing.assert_frame_equal(leido, _ventas())
+    assert leido.attrs == _ventas().attrs
+
+
+def test_parquet_conserva_frame_y_attrs(tmp_path, caplog):
+    pytest.importorskip('pyarrow')
+
+    _, leido = _ida_y_vuelta(tmp_path, _ventas())
+
+    assert list((tmp_path / 'cache').glob('infoventas_*.parquet')), 'la entrada debía guardarse en Parquet'
+    assert 'se usa pickle' not in caplog.text
+    pd.testing.assert_frame_equal(leido, _ventas())
+    assert leido.attrs == _ventas().attrs
+
+
+def test_attrs_de_la_entrada_son_json(tmp_path):
+    _ida_y_vuelta(tmp_path, _ventas())
+
+    meta, = (tmp_path / 'cache').glob('infoventas_*.json')
+    assert json.loads(meta.read_text(encoding='utf-8'))['attrs'] == _ventas().attrs
+
+
+def test_cambio_del_origen_reconstruye_la_entrada(tmp_path):
+    cache = CacheBinaria(carpeta=str(tmp_path / 'cache'))
+    origen = tmp_path / 'maestro.txt'
+    origen.write_text('1{a\n')
+    cache.obtener('maestro', str(origen), lambda: pd.DataFrame({'x': [1]}))
+
+    origen.write_text('1{a\n2{b\n')
+    nuevo = cache.obtener('maestro', str(origen), lambda: pd.DataFrame({'x': [1, 2]}))
+
+    assert nuevo['x'].tolist() == [1, 2]
+
+
+def _etapa(tmp_path):
+    """Etapa que escribe un TXT, envuelta con la caché de etapas y con 'modulo' como único módulo tsol_*."""
+    from tsol_cache import CacheEtapas
+    from tsol_escritor import SalidaTsol
+
+    salida = SalidaTsol(str(tmp_path))
+    etapas = CacheEtapas(CacheBinaria(carpeta=str(tmp_path / 'cache')), salida, 'empresa')
+    ejecuciones = []
+
+    def generar():
+        ejecuciones.append(1)
+        salida.escribir_txt(pd.DataFrame({'Código': ['1']}), str(tmp_path / 'Municipios.txt'))
+
+    return etapas.envolver('generar', generar, lambda: {'hoja': 'X'}), ejecuciones
+
+
+def test_etapa_se_reutiliza_sin_cambios(tmp_path, monkeypatch):
+    modulo = tmp_path / 'tsol_escritor.py'
+    modulo.write_text('VERSION = 1\n')
+    monkeypatch.setattr(tsol_cache, 'MODULOS_COMPARTIDOS', [str(modulo)])
+
+    etapa, ejecuciones = _etapa(tmp_path)
+    etapa()
+    etapa()
+
+    assert len(ejecuciones) == 1
+    assert (tmp_path / 'Municipios.txt').exists()
+
+
+def test_cambio_en_un_modulo_compartido_invalida_la_etapa(tmp_path, monkeypatch):
+    modulo = tmp_path / 'tsol_escritor.py'
+    modulo.write_text('VERSION = 1\n')
+    monkeypatch.setattr(tsol_cache, 'MODULOS_COMPARTIDOS', [str(modulo)])
+
+    etapa, ejecuciones = _etapa(tmp_path)
+    etapa()
+    modulo.write_text('VERSION = 2\n')
+    etapa()
+
+    assert len(ejecuciones) == 2
+
+
+def test_modulos_compartidos_incluyen_los_del_repositorio():
+    nombres = {os.path.basename(ruta) for ruta in tsol_cache.MODULOS_COMPARTIDOS}
+
+    assert {'tsol_escritor.py', 'tsol_normalizacion.py', 'tsol_ventas.py', 'tsol_lectores.py'} <= nombres
+
+
+def test_huella_archivo_cambia_con_el_contenido(tmp_path):
+    from tsol_cache import huella_archivo
+
+    ruta = tmp_path / 'interasesor.txt'
+    ruta.write_bytes(b'10{Vend 10\n')
+    antes = huella_archivo(str(ruta))
+    ruta.write_bytes(b'11{Vend 10\n')
+
+    assert huella_archivo(str(ruta))['contenido'] != antes['contenido']
+    assert 'contenido' not in huella_archivo(str(ruta), contenido=False)
+
+
+def test_recortar_borra_las_entradas_usadas_hace_mas_tiempo(tmp_path):
+    carpeta = tmp_path / 'cache'
+    cache = CacheBinaria(carpeta=str(carpeta))
+    for numero, nombre in enumerate(['vieja', 'media', 'nueva']):
+        for extension in ('.pkl', '.json'):
+            archivo = carpeta / f'{nombre}{extension}'
+            archivo.write_bytes(b'x' * 400 * 1024)
+            os.utime(archivo, (1000 + numero, 1000 + numero))
+    cache.limite_mb = 2
+
+    cache.recortar(conservar=str(carpeta / 'vieja'))
+
+    assert sorted(archivo.name for archivo in carpeta.iterdir()) == ['nueva.json', 'nueva.pkl', 'vieja.json', 'vieja.pkl']
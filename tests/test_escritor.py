@@ -0,0 +1,60 @@
+# test_escritor.py
+# Los TXT TSOL armados por columnas contra la escritura fila a fila del script original
+
+import numpy as np
+import pandas as pd
+
+from tsol_escritor import aplicar_formatos, escribir_txt, lineas_tsol
+
+
+def _fila_a_fila(df):
+    """Escritura original: '{'.join(row.astype(str)) por cada fila de iterrows()."""
+    return ['{'.join(fila.astype(str)) for _, fila in df.iterrows()]
+
+
+def test_lineas_iguales_a_iterrows_con_columnas_mezcladas():
+    df = pd.DataFrame({
+        'Código': ['001', '002', None],
+        'Cantidad': [5, -2, 0],
+        'Valor': [1.5, np.nan, 3.0],
+        'Fecha': pd.to_datetime(['2024-03-01', '2024-03-02 10:30', None], format='ISO8601')
+    })
+
+    assert lineas_tsol(df).tolist() == _fila_a_fila(df)
+
+
+def test_lineas_iguales_a_iterrows_en_frame_numerico():
+    # Con columnas int y float iterrows entrega filas float: el entero se escribe '5.0'
+    df = pd.DataFrame({'Factor Peso': [5, 1], 'Factor Conversion Unidad': [1.0, 12.5]})
+
+    assert lineas_tsol(df).tolist() == _fila_a_fila(df)
+
+
+def test_lineas_con_indice_de_codigos_repetidos():
+    # La maestra SKU queda indexada por código y puede repetir códigos
+    df = pd.DataFrame({'Código': ['230', '230', '231'], 'Nombre': ['A', 'B', 'C']}).set_index(
+        pd.Index(['230', '230', '231'])
+    )
+
+    assert lineas_tsol(df).tolist() == ['230{A', '230{B', '231{C']
+
+
+def test_formatos_de_fecha_y_decimal_como_el_original():
+    df = pd.DataFrame({
+        'Fecha': pd.to_datetime(['2024-03-01 08:00', '2024-12-31'], format='ISO8601'),
+        'Valor': [1234.5, -0.004]
+    })
+
+    formateado = aplicar_formatos(df, {'Fecha': 'fecha', 'Valor': 'decimal'})
+
+    assert formateado['Fecha'].tolist() == df['Fecha'].dt.strftime('%Y/%m/%d').tolist()
+    assert formateado['Valor'].tolist() == [f"{valor:.2f}".replace('.', ',') for valor in df['Valor']]
+
+
+def test_escribir_txt_con_encabezado(tmp_path):
+    df = pd.DataFrame({'Código': ['1', '2'], 'Nombre': ['Cali', 'Tuluá']})
+    ruta = tmp_path / 'Municipios.txt'
+
+    escribir_txt(df, str(ruta))
+
+    assert ruta.read_text(encoding='utf-8').splitlines() == ['Código{Nombre', '1{Cali', '2{Tuluá']
@@ -0,0 +1,105 @@
+# test_lectores.py
+# Lectura filtrada de la hoja 'infoventas' (período, proveedores y attrs)
+
+import json
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+
+from tsol_lectores import leer_ventas_periodo
+
+
+COLUMNAS = ['Cod. cliente', 'Fecha', 'Fac. numero', 'Vta neta', 'Proveedor']
+
+
+def _libro_ventas(tmp_path, filas, encabezado=COLUMNAS):
+    """Escribe un infoventas.xlsx con la hoja 'infoventas' y devuelve su ruta."""
+    libro = openpyxl.Workbook()
+    hoja = libro.active
+    hoja.title = 'infoventas'
+    hoja.append(list(encabezado))
+    for fila in filas:
+        hoja.append(list(fila))
+    ruta = tmp_path / 'infoventas.xlsx'
+    libro.save(ruta)
+    return str(ruta)
+
+
+def test_attrs_son_serializables_y_recuperan_la_fecha(tmp_path):
+    ruta = _libro_ventas(tmp_path, [
+        ['C1', datetime(2024, 3, 2), 'F1', 100.0, 'COLGATE'],
+        ['C2', datetime(2024, 3, 28, 17, 45), 'F2', 50.0, 'OTRO'],
+    ])
+
+    datos = leer_ventas_periodo(ruta, COLUMNAS, proveedores=['colgate'])
+
+    json.dumps(datos.attrs)
+    assert pd.Timestamp(datos.attrs['fecha_maxima']) == pd.Timestamp('2024-03-28 17:45')
+    assert datos.attrs['periodo'] == [2024, 3]
+    assert datos['Fac. numero'].tolist() == ['F1']
+
+
+def _como_read_excel(ruta, columnas, ano, mes):
+    """Lectura del script original: hoja completa con pd.read_excel y filtro del mes en memoria."""
+    datos = pd.read_excel(ruta, sheet_name='infoventas', parse_dates=['Fecha'])
+    del_mes = datos[(datos['Fecha'].dt.year == ano) & (datos['Fecha'].dt.month == mes)]
+    return del_mes[columnas].reset_index(drop=True)
+
+
+def test_codigos_con_el_tipo_que_infiere_read_excel(tmp_path):
+    encabezado = ['Cod. cliente', 'Cod. vendedor', 'Fecha', 'Fac. numero', 'Codigo bodega', 'Unidad', 'Proveedor']
+    ruta = _libro_ventas(tmp_path, [
+        # Mes anterior: un vendedor vacío lleva la columna a float y 'X9' deja 'Fac. numero' como object
+        ['00285', None, datetime(2024, 2, 27), 'X9', '01', 'UND', 'COLGATE'],
+        [],
+        ['00265', 15, datetime(2024, 3, 1, 9, 30), 1280, '02', 'UND', 'COLGATE'],
+        ['A-17', 16, datetime(2024, 3, 2), '1034', '01', '#N/A', 'COLGATE'],
+        [132, 11.0, datetime(2024, 3, 15), 1144.0, 2, 'CJ', 'COLGATE'],
+        [],
+    ], encabezado=encabezado)
+    columnas = [columna for columna in encabezado if columna != 'Fecha']
+
+    datos = leer_ventas_periodo(ruta, encabezado)[columnas]
+
+    pd.testing.assert_frame_equal(datos, _como_read_excel(ruta, columnas, 2024, 3))
+    assert datos['Codigo bodega'].tolist() == [2, 1, 2]
+    assert datos['Cod. vendedor'].astype(str).tolist() == ['15.0', '16.0', '11.0']
+
+
+def _ventas_desordenadas(tmp_path):
+    """Meses fuera de orden; la fecha más reciente es de un proveedor que no se filtra."""
+    return _libro_ventas(tmp_path, [
+        ['C1', datetime(2024, 3, 5), 'F1', 10.0, 'COLGATE'],
+        ['C2', datetime(2024, 1, 9), 'F2', 20.0, 'COLGATE'],
+        ['C3', datetime(2024, 4, 2), 'F3', 30.0, 'COLGATE'],
+        ['C4', datetime(2024, 2, 29), 'F4', 40.0, 'COLGATE'],
+        ['C5', datetime(2024, 4, 30, 18, 0), 'F5', 50.0, 'OTRO'],
+        ['C6', datetime(2023, 12, 31), 'F6', 60.0, 'COLGATE'],
+        ['C7', datetime(2024, 4, 11), 'F7', 70.0, 'COLGATE'],
+        ['C8', None, 'F8', 80.0, 'COLGATE'],
+    ])
+
+
+def test_periodo_automatico_con_meses_desordenados(tmp_path):
+    ruta = _ventas_desordenadas(tmp_path)
+
+    datos = leer_ventas_periodo(ruta, COLUMNAS, proveedores=['COLGATE'])
+
+    esperado = _como_read_excel(ruta, COLUMNAS, 2024, 4)
+    esperado = esperado[esperado['Proveedor'].str.contains('COLGATE', case=False, na=False)].reset_index(drop=True)
+    pd.testing.assert_frame_equal(datos, esperado)
+    assert datos['Fac. numero'].tolist() == ['F3', 'F7']
+    assert pd.Timestamp(datos.attrs['fecha_maxima']) == pd.Timestamp('2024-04-30 18:00')
+    assert datos.attrs['periodo'] == [2024, 4]
+
+
+def test_periodo_explicito_con_meses_desordenados(tmp_path):
+    ruta = _ventas_desordenadas(tmp_path)
+
+    datos = leer_ventas_periodo(ruta, COLUMNAS, periodo=(2024, 2))
+
+    assert datos['Fac. numero'].tolist() == ['F4']
+    assert datos.attrs['periodo'] == [2024, 2]
+    # La fecha máxima sigue siendo la de todo el archivo
+    assert pd.Timestamp(datos.attrs['fecha_maxima']) == pd.Timestamp('2024-04-30 18:00')
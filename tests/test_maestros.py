@@ -0,0 +1,242 @@
+# test_maestros.py
+# Maestros 'inter*.txt': lectura con el parser C como texto contra el read_csv original (motor python),
+# limpieza de intercliente.txt al parsear contra la limpieza original con archivo temporal y filtro de
+# códigos activos antes de parsear contra la lectura completa seguida de isin (también a través de la
+# caché de maestros)
+
+import io
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tsol_lectores
+from tsol_lectores import (
+    COLUMNAS_INTERASESOR, COLUMNAS_INTERCLIENTE, EntradasCompartidas, LineasLimpias, codigo_cliente,
+    leer_intercliente, leer_maestro, limpiar_linea
+)
+
+# Comillas de Eje (el script original hacía strip('"') tres veces y no quitaba las curvas)
+COMILLAS_EJE = ('"', "'", '`')
+
+LINEAS_INTERCLIENTE = [
+    '"001{TIENDA LA 14{20200101{900123{CL 5 # 10-20{3001234567{JUAN PEREZ{76001{01{TIENDA{3{CENTRO"',
+    '“002{DROGUERÍA “SAN JORGE”{20210315{800456{KR 1{3100000000{ANA ROJAS{76520{02{DROGUERIA{2{NORTE”',
+    "'003{MINIMERCADO{20190101{700789{AV 3N{3200000000{LUIS GOMEZ{76001{01{TIENDA{4{GRANADA'",
+    '`004{SUPER "EL AHORRO"{20180101{600111{CL 9{3150000000{EVA DIAZ{76834{03{SUPERMERCADO{3{SUR`',
+    '   005{PANADERIA{20170101{500222{CL 10{3160000000{LEO MORA{76001{01{TIENDA{2{OESTE   ',
+    '"-12{CLIENTE CON GUION{20160101{400333{CL 11{3170000000{SOL VEGA{76001{01{TIENDA{1{ESTE"',
+    '006{LINEA CORTA{20150101',
+    '',
+    '""007{DOBLE COMILLA{20140101{300444{CL 12{3180000000{RAUL PAZ{76111{02{DROGUERIA{5{CENTRO""',
+    '\'“008{MEZCLADAS{20130101{200555{CL 13{3190000000{IVAN LUNA{76001{01{TIENDA{3{NORTE”\'',
+    '009{SIN COMILLAS{20120101{100666{CL 14{3110000000{ROSA CANO{76520{01{TIENDA{2{SUR',
+]
+
+
+def _limpieza_original(linea, comillas):
+    """Limpieza de cada línea del script original (strip por comilla y re.sub de una comilla recta por extremo)."""
+    linea = linea.strip()
+    for comilla in comillas:
+        linea = linea.strip(comilla)
+    return re.sub(r'^"|"$', '', linea).strip()
+
+
+def _intercliente_original(ruta, tmp_path, comillas):
+    """
+    Camino original: archivo temporal con las líneas limpias y read_csv del temporal. El temporal se lee
+    con los parámetros de leer_maestro (C, texto) para comparar solo la limpieza.
+    """
+    with open(ruta, 'r', encoding='Windows-1252') as archivo:
+        limpias = [_limpieza_original(linea, comillas) for linea in archivo]
+    temporal = tmp_path / 'intercliente_cleaned.txt'
+    with open(temporal, 'w', encoding='Windows-1252') as archivo:
+        archivo.write('\n'.join(limpias))
+    return pd.read_csv(temporal, sep='{', engine='c', encoding='Windows-1252', dtype=str,
+                       names=COLUMNAS_INTERCLIENTE)
+
+
+def _escribir(tmp_path, nombre, lineas, encoding):
+    ruta = tmp_path / nombre
+    with open(ruta, 'w', encoding=encoding, newline='') as archivo:
+        archivo.write('\r\n'.join(lineas) + '\r\n')
+    return str(ruta)
+
+
+@pytest.mark.parametrize('comillas', [('"', '“', '”', "'", '`'), COMILLAS_EJE], ids=['cali', 'eje'])
+def test_limpiar_linea_igual_a_la_limpieza_original(comillas):
+    extra = ['""', '"', '“”', ' " x " ', "'\"a\"'", '`“b”`']
+    for linea in LINEAS_INTERCLIENTE + extra:
+        assert limpiar_linea(linea + '\r\n', comillas) == _limpieza_original(linea + '\r\n', comillas)
+
+
+@pytest.mark.parametrize('comillas', [('"', '“', '”', "'", '`'), COMILLAS_EJE], ids=['cali', 'eje'])
+def test_intercliente_igual_al_camino_con_archivo_temporal(tmp_path, comillas):
+    ruta = _escribir(tmp_path, 'intercliente.txt', LINEAS_INTERCLIENTE, 'Windows-1252')
+
+    datos = leer_intercliente(ruta, comillas=comillas)
+
+    pd.testing.assert_frame_equal(datos, _intercliente_original(ruta, tmp_path, comillas))
+    assert datos['Cod. Cliente'].tolist()[:3] == ['001', '“002' if comillas == COMILLAS_EJE else '002', '003']
+
+
+@pytest.mark.parametrize('tamano', [1, 7, 64, -1])
+def test_lineas_limpias_entrega_el_texto_completo_en_bloques(tamano):
+    origen = io.StringIO('\n'.join(LINEAS_INTERCLIENTE) + '\n')
+    lineas = LineasLimpias(origen, limpiar_linea)
+
+    partes = []
+    while True:
+        parte = lineas.read(tamano)
+        if not parte:
+            break
+        partes.append(parte)
+
+    assert ''.join(partes) == ''.join(limpiar_linea(linea) + '\n' for linea in LINEAS_INTERCLIENTE)
+    assert lineas.leidas == lineas.conservadas == len(LINEAS_INTERCLIENTE)
+
+
+LINEAS_INTERASESOR = [
+    '015{1094000111{MARÍA JOSÉ{PEÑA{3001112233{CL 1{VENDEDOR{CONSUMO{Activado{S01{01',
+    '16{1094000222{PEDRO{GÓMEZ{3002223344{CL 2{VENDEDOR{CONSUMO{Desactivado{S02{02',
+    '0017{1094000333{LUZ{RÍOS{{CL 3{VENDEDOR{{Activado{S01{01',
+    '018{1094000444{ANA{SOTO',
+    'NULL{1094000555{SIN{CODIGO{3005556677{CL 5{VENDEDOR{CONSUMO{Activado{S03{03',
+    '',
+    ' 019 {1094000666{CON{ESPACIOS{3006667788{CL 6{VENDEDOR{CONSUMO{Activado{S01{ 01 ',
+]
+
+
+def _maestro_original(ruta, columnas, encoding='latin1'):
+    """read_csv del script original (motor python) con los códigos como texto; nulos como NaN."""
+    datos = pd.read_csv(ruta, sep='{', engine='python', encoding=encoding, names=columnas, dtype=str)
+    # Con dtype=str el motor python completa las líneas cortas con None; el parser C, con NaN
+    return datos.where(datos.notna(), np.nan)
+
+
+def test_maestro_igual_al_read_csv_original_con_codigos_como_texto(tmp_path):
+    ruta = _escribir(tmp_path, 'interasesor.txt', LINEAS_INTERASESOR, 'latin1')
+
+    datos = leer_maestro(ruta, COLUMNAS_INTERASESOR)
+
+    pd.testing.assert_frame_equal(datos, _maestro_original(ruta, COLUMNAS_INTERASESOR))
+    # Ceros a la izquierda conservados (el read_csv original los leía como enteros)
+    assert datos['Codigo'].tolist()[:3] == ['015', '16', '0017']
+    assert datos['Codigo bodega'].tolist()[:2] == ['01', '02']
+    assert datos.loc[3, 'Estado'] is np.nan
+
+
+def test_maestro_recorta_campos_de_mas_en_cualquier_linea(tmp_path):
+    # Un campo de más en la primera línea y dos en una posterior: el motor python los volvía índice o fallaba
+    lineas = list(LINEAS_INTERASESOR)
+    lineas[0] += '{EXTRA'
+    lineas[4] += '{EXTRA{OTRO'
+    ruta = _escribir(tmp_path, 'interasesor.txt', lineas, 'latin1')
+    sin_extras = _escribir(tmp_path, 'esperado.txt', LINEAS_INTERASESOR, 'latin1')
+
+    datos = leer_maestro(ruta, COLUMNAS_INTERASESOR)
+
+    pd.testing.assert_frame_equal(datos, _maestro_original(sin_extras, COLUMNAS_INTERASESOR))
+
+
+def _con_isin(datos, columna, claves, normalizar=None):
+    """Cruce que hace quien llama (generar_vendedores, generar_clientes...) sobre el maestro leído."""
+    codigos = datos[columna] if normalizar is None else datos[columna].map(normalizar, na_action='ignore')
+    return datos[codigos.isin(claves)].reset_index(drop=True)
+
+
+# Primer campo entre comillas (el parser C las quita), nulos como texto, espacios y ceros a la izquierda
+LINEAS_CON_CLAVES = LINEAS_INTERASESOR + [
+    '"020"{1094000777{ENTRE{COMILLAS{3007778899{CL 7{VENDEDOR{CONSUMO{Activado{S02{02',
+    '{1094000888{SIN{CODIGO{3008889900{CL 8{VENDEDOR{CONSUMO{Activado{S02{02',
+    'nan{1094000999{CODIGO{NAN{3009990011{CL 9{VENDEDOR{CONSUMO{Activado{S03{03',
+    '015{1094001000{REPETIDO{PEÑA{3001112233{CL 1{VENDEDOR{CONSUMO{Activado{S01{01',
+]
+
+
+@pytest.mark.parametrize('claves', [
+    ['015', '0017', '020', ' 019 '],
+    ['15', '17', '19', '20'],
+    np.array(['015', np.nan, '018'], dtype=object),
+    [15, 16.0, '16'],
+], ids=['textos', 'sin_ceros', 'con_nulo', 'tipos_mezclados'])
+def test_maestro_con_claves_igual_a_leer_todo_y_cruzar(tmp_path, claves):
+    ruta = _escribir(tmp_path, 'interasesor.txt', LINEAS_CON_CLAVES, 'latin1')
+
+    filtrado = leer_maestro(ruta, COLUMNAS_INTERASESOR, claves=claves)
+
+    esperado = _con_isin(_maestro_original(ruta, COLUMNAS_INTERASESOR), 'Codigo', claves)
+    pd.testing.assert_frame_equal(_con_isin(filtrado, 'Codigo', claves), esperado)
+    pd.testing.assert_frame_equal(
+        _con_isin(filtrado, 'Codigo', claves),
+        _con_isin(leer_maestro(ruta, COLUMNAS_INTERASESOR), 'Codigo', claves)
+    )
+
+
+@pytest.mark.parametrize('comillas', [('"', '“', '”', "'", '`'), COMILLAS_EJE], ids=['cali', 'eje'])
+def test_intercliente_con_clientes_igual_a_leer_todo_y_cruzar(tmp_path, comillas):
+    lineas = LINEAS_INTERCLIENTE + [
+        '"011"{COMILLA INTERNA{20110101{100777{CL 15{3120000000{OTTO RUIZ{76001{01{TIENDA{3{CENTRO',
+        '“012”{CURVAS EN EL CODIGO{20100101{100888{CL 16{3130000000{EVA RUIZ{76001{01{TIENDA{3{CENTRO',
+    ]
+    ruta = _escribir(tmp_path, 'intercliente.txt', lineas, 'Windows-1252')
+    clientes = ['001', '002', '005', '99912', '006', '007', '008', '011', '012', '“012”']
+
+    filtrado = leer_intercliente(ruta, comillas=comillas, clientes=clientes)
+
+    completo = leer_intercliente(ruta, comillas=comillas)
+    pd.testing.assert_frame_equal(
+        _con_isin(filtrado, 'Cod. Cliente', clientes, codigo_cliente),
+        _con_isin(completo, 'Cod. Cliente', clientes, codigo_cliente)
+    )
+    pd.testing.assert_frame_equal(
+        _con_isin(completo, 'Cod. Cliente', clientes, codigo_cliente),
+        _con_isin(_intercliente_original(ruta, tmp_path, comillas), 'Cod. Cliente', clientes, codigo_cliente)
+    )
+    assert len(filtrado) < len(completo)
+
+
+def test_ningun_codigo_activo_entrega_un_maestro_vacio(tmp_path):
+    ruta = _escribir(tmp_path, 'interasesor.txt', LINEAS_INTERASESOR[:3], 'latin1')
+
+    filtrado = leer_maestro(ruta, COLUMNAS_INTERASESOR, claves=['999'])
+
+    esperado = _con_isin(_maestro_original(ruta, COLUMNAS_INTERASESOR), 'Codigo', ['999'])
+    pd.testing.assert_frame_equal(filtrado, esperado)
+    assert list(filtrado.columns) == COLUMNAS_INTERASESOR and filtrado.empty
+
+
+def test_archivo_vacio_con_y_sin_claves(tmp_path):
+    ruta = tmp_path / 'interasesor.txt'
+    ruta.write_text('', encoding='latin1')
+
+    completo = leer_maestro(str(ruta), COLUMNAS_INTERASESOR)
+
+    pd.testing.assert_frame_equal(leer_maestro(str(ruta), COLUMNAS_INTERASESOR, claves=['015']), completo)
+    assert list(completo.columns) == COLUMNAS_INTERASESOR and completo.empty
+    assert (completo.dtypes == object).all()
+
+
+def test_cache_de_maestros_guarda_el_frame_filtrado_por_conjunto_de_claves(tmp_path, monkeypatch):
+    ruta = _escribir(tmp_path, 'interasesor.txt', LINEAS_CON_CLAVES, 'latin1')
+    entradas = EntradasCompartidas({'cache': {'carpeta': str(tmp_path / 'cache'), 'maestros': True}})
+    lecturas = []
+    original = tsol_lectores.leer_maestro
+
+    def contar(*args, **kwargs):
+        lecturas.append(kwargs.get('claves'))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(tsol_lectores, 'leer_maestro', contar)
+
+    primero = entradas.maestro(ruta, COLUMNAS_INTERASESOR, claves=['015', '020'])
+    repetido = entradas.maestro(ruta, COLUMNAS_INTERASESOR, claves=['020', '015', '015'])
+    otro = entradas.maestro(ruta, COLUMNAS_INTERASESOR, claves=['017'])
+
+    pd.testing.assert_frame_equal(primero, original(ruta, COLUMNAS_INTERASESOR, claves=['015', '020']))
+    pd.testing.assert_frame_equal(repetido, primero)
+    pd.testing.assert_frame_equal(otro, original(ruta, COLUMNAS_INTERASESOR, claves=['017']))
+    assert len(primero) < len(original(ruta, COLUMNAS_INTERASESOR))
+    # El mismo conjunto de claves reutiliza la entrada; otro conjunto se lee y se guarda aparte
+    assert lecturas == [['015', '020'], ['017']]
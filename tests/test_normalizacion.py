@@ -0,0 +1,81 @@
+# test_normalizacion.py
+# sin_tildes y normalizar_por_valor con nulos, con frames recién armados y leídos desde la caché pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tsol_cache import CacheBinaria
+from tsol_normalizacion import normalizar_por_valor, sin_tildes
+
+
+def _tipologia():
+    return pd.DataFrame({
+        'Cod. necesidad': [' Tienda Ñaña ', None, 'CAFÉ', np.nan, 'Tienda Ñaña'],
+        'Nom. necesidad': ['a', 'b', 'c', 'd', 'e']
+    })
+
+
+def _desde_cache(tmp_path, df):
+    """El frame tal como lo devuelve la caché (sin pyarrow, pickle)."""
+    cache = CacheBinaria(carpeta=str(tmp_path / 'cache'))
+    origen = tmp_path / 'origen.txt'
+    origen.write_text('x')
+    cache.obtener('prueba', str(origen), lambda: df)
+    return cache.obtener('prueba', str(origen), lambda: pytest.fail('la caché debía reutilizarse'))
+
+
+@pytest.mark.parametrize('cacheado', [False, True])
+def test_sin_tildes_deja_vacios_los_nulos(tmp_path, cacheado):
+    df = _desde_cache(tmp_path, _tipologia()) if cacheado else _tipologia()
+
+    resultado = sin_tildes(df['Cod. necesidad'])
+
+    assert resultado.tolist() == ['Tienda Nana', '', 'CAFE', '', 'Tienda Nana']
+
+
+@pytest.mark.parametrize('cacheado', [False, True])
+def test_sin_tildes_igual_a_la_version_fila_a_fila(tmp_path, cacheado):
+    df = _desde_cache(tmp_path, _tipologia()) if cacheado else _tipologia()
+
+    def fila_a_fila(texto):
+        if pd.isna(texto):
+            return ''
+        texto = str(texto).strip()
+        for con, sin in zip('áéíóúñÁÉÍÓÚÑ', 'aeiounAEIOUN'):
+            texto = texto.replace(con, sin)
+        return texto
+
+    esperado = [fila_a_fila(texto) for texto in _tipologia()['Cod. necesidad']]
+    assert sin_tildes(df['Cod. necesidad']).tolist() == esperado
+
+
+@pytest.mark.parametrize('cacheado', [False, True])
+def test_normalizar_por_valor_conserva_los_nulos_como_texto(tmp_path, cacheado):
+    df = _desde_cache(tmp_path, _tipologia()) if cacheado else _tipologia()
+
+    resultado = normalizar_por_valor(df['Cod. necesidad'], lambda textos: textos.astype(str).str.strip())
+
+    # Igual que aplicar la cadena a la columna completa: los nulos quedan 'None' / 'nan'
+    assert resultado.tolist() == ['Tienda Ñaña', 'None', 'CAFÉ', 'nan', 'Tienda Ñaña']
+
+
+def test_normalizar_por_valor_categorica_con_nulos():
+    serie = pd.Series(['b', None, 'a', 'b'])
+
+    resultado = normalizar_por_valor(serie, lambda textos: textos.astype(str), categorica=True)
+
+    esperado = serie.astype(str).astype('category')
+    pd.testing.assert_series_equal(resultado, esperado)
+
+
+@pytest.mark.parametrize('cacheado', [False, True])
+def test_normalizar_por_valor_no_modifica_la_columna_de_origen(tmp_path, cacheado):
+    # Tipos mezclados: no se agrupa por valor y la transformación recibe la columna completa
+    original = pd.DataFrame({'Código': ['A1', 7, None, 2.5], 'Otra': ['x', None, 'y', 'z']})
+    df = _desde_cache(tmp_path, original) if cacheado else original.copy()
+
+    normalizar_por_valor(df['Código'], lambda codigos: codigos.astype(str).str.strip())
+    normalizar_por_valor(df['Otra'], lambda textos: textos.astype(str).str.strip())
+
+    pd.testing.assert_frame_equal(df, original)
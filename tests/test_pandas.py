@@ -0,0 +1,21 @@
+# test_pandas.py
+# Las funciones internas de pandas solo se entregan con la versión verificada
+
+import pandas as pd
+import pytest
+
+from tsol_pandas import PANDAS_VERIFICADO, internos_pandas
+
+
+def test_version_instalada_es_la_verificada():
+    # requirements.txt fija la misma versión: si este test falla, hay que revisar los TXT antes de actualizar
+    assert pd.__version__ == PANDAS_VERIFICADO
+    internos = internos_pandas()
+    assert internos.TextParser is not None and internos.find_common_type is not None
+
+
+def test_otra_version_de_pandas_falla_al_iniciar(monkeypatch):
+    monkeypatch.setattr(pd, '__version__', '2.2.0')
+
+    with pytest.raises(ImportError, match='2.2.0'):
+        internos_pandas()
@@ -0,0 +1,299 @@
+# test_pipeline.py
+# Planificador de etapas: grafo de dependencias, errores de declaración, ejecución en paralelo y ruta crítica;
+# puntos de control y --resume
+
+import json
+import os
+import threading
+import zipfile
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from tsol_escritor import SalidaTsol
+from tsol_pipeline import Etapa, Planificador, PuntosControl, huella_ejecucion
+
+
+def _registrar(registro, nombre, valor=None):
+    """Función de etapa que anota su nombre al ejecutarse."""
+    def funcion():
+        registro.append(nombre)
+        return valor
+    return funcion
+
+
+def _etapas(registro):
+    """Grafo como el de las empresas: ventas -> procesar -> (archivos en paralelo) -> comprimir."""
+    return [
+        Etapa('cargar', _registrar(registro, 'cargar'), salidas=['ventas_periodo']),
+        Etapa('procesar', _registrar(registro, 'procesar'), entradas=['ventas_periodo'], salidas=['filtered_data']),
+        Etapa('ventas', _registrar(registro, 'ventas'), entradas=['filtered_data'], salidas=['ventas.txt']),
+        Etapa('sku', _registrar(registro, 'sku'), salidas=['sku_maestra', 'SKU (Productos).txt']),
+        Etapa('inventario', _registrar(registro, 'inventario'), entradas=['sku_maestra'], salidas=['Inventario.txt']),
+        Etapa('comprimir', _registrar(registro, 'comprimir', 'final.zip'),
+              entradas=['ventas.txt', 'SKU (Productos).txt', 'Inventario.txt'], salidas=['zip_path'])
+    ]
+
+
+def test_dependencias_deducidas_de_entradas_y_salidas():
+    planificador = Planificador(_etapas([]))
+
+    assert planificador.dependencias == {
+        'cargar': [], 'procesar': ['cargar'], 'ventas': ['procesar'], 'sku': [],
+        'inventario': ['sku'], 'comprimir': ['ventas', 'sku', 'inventario']
+    }
+    assert planificador.describir_grafo().splitlines()[0] == 'cargar <- (inicio)'
+
+
+def test_orden_secuencial_adelanta_solo_lo_necesario():
+    etapas = [
+        Etapa('comprimir', lambda: None, entradas=['ventas.txt']),
+        Etapa('clientes', lambda: None, salidas=['Clientes.txt']),
+        Etapa('ventas', lambda: None, salidas=['ventas.txt'])
+    ]
+
+    assert Planificador(etapas).orden() == ['ventas', 'comprimir', 'clientes']
+
+
+def test_etapa_duplicada():
+    with pytest.raises(ValueError, match='Etapa duplicada: ventas'):
+        Planificador([Etapa('ventas', lambda: None), Etapa('ventas', lambda: None)])
+
+
+def test_salida_producida_por_dos_etapas():
+    with pytest.raises(ValueError, match="'ventas.txt' lo producen dos etapas: a y b"):
+        Planificador([Etapa('a', lambda: None, salidas=['ventas.txt']),
+                      Etapa('b', lambda: None, salidas=['ventas.txt'])])
+
+
+def test_entrada_que_ninguna_etapa_produce():
+    with pytest.raises(ValueError, match="Ninguna etapa produce 'sku_maestra', requerida por inventario"):
+        Planificador([Etapa('inventario', lambda: None, entradas=['sku_maestra'])])
+
+
+def test_ciclo_de_dependencias():
+    with pytest.raises(ValueError, match='Ciclo de dependencias: a -> b -> a'):
+        Planificador([Etapa('a', lambda: None, entradas=['y'], salidas=['x']),
+                      Etapa('b', lambda: None, entradas=['x'], salidas=['y'])])
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_cada_etapa_corre_despues_de_sus_dependencias(workers):
+    registro = []
+    planificador = Planificador(_etapas(registro), workers=workers)
+
+    resultados = planificador.ejecutar()
+
+    assert sorted(registro) == sorted(planificador.etapas)
+    for nombre, dependencias in planificador.dependencias.items():
+        assert all(registro.index(dependencia) < registro.index(nombre) for dependencia in dependencias)
+    assert resultados['comprimir'] == 'final.zip'
+    if workers == 1:
+        assert registro == planificador.orden()
+
+
+def test_etapas_independientes_corren_a_la_vez():
+    # Las tres etapas esperan en la barrera: solo terminan si corren al mismo tiempo
+    barrera = threading.Barrier(3, timeout=5)
+    hilos = set()
+
+    def esperar():
+        hilos.add(threading.current_thread().name)
+        barrera.wait()
+
+    etapas = [Etapa(nombre, esperar, salidas=[f'{nombre}.txt']) for nombre in ('vendedores', 'sku', 'rutas')]
+    Planificador(etapas, workers=3).ejecutar()
+
+    assert len(hilos) == 3
+
+
+def test_error_en_paralelo_espera_las_etapas_en_curso_y_no_lanza_sus_dependientes():
+    registro = []
+    liberar = threading.Event()
+
+    def fallar():
+        liberar.set()
+        raise RuntimeError('ruterojass.xlsx bloqueado')
+
+    def lenta():
+        liberar.wait(5)
+        registro.append('lenta')
+
+    etapas = [
+        Etapa('rutas', fallar, salidas=['Rutas.txt']),
+        Etapa('lenta', lenta, salidas=['Clientes.txt']),
+        Etapa('comprimir', _registrar(registro, 'comprimir'), entradas=['Rutas.txt', 'Clientes.txt'])
+    ]
+
+    with pytest.raises(RuntimeError, match='ruterojass.xlsx bloqueado'):
+        Planificador(etapas, workers=2).ejecutar()
+    assert registro == ['lenta']
+
+
+def test_ruta_critica_es_la_cadena_mas_larga():
+    planificador = Planificador(_etapas([]))
+    planificador.duraciones = {'cargar': 1.0, 'procesar': 2.0, 'ventas': 0.5, 'sku': 3.0,
+                               'inventario': 0.2, 'comprimir': 1.0}
+
+    ruta, duracion = planificador.ruta_critica()
+
+    # cargar + procesar + ventas (3.5) supera a sku + inventario (3.2)
+    assert ruta == ['cargar', 'procesar', 'ventas', 'comprimir']
+    assert duracion == pytest.approx(4.5)
+
+
+def test_ruta_critica_sin_etapas():
+    assert Planificador([]).ruta_critica() == ([], 0.0)
+
+
+class _Empresa:
+    """Etapas mínimas de una empresa en modo zip_directo: dos archivos y el ZIP final en 'historico'."""
+
+    def __init__(self, tmp_path, fallar_zip=False):
+        self.salida = SalidaTsol(str(tmp_path / 'salida'), zip_directo=True)
+        os.makedirs(self.salida.output_folder, exist_ok=True)
+        self.objeto = SimpleNamespace(filas=None)
+        self.ejecutadas = []
+        self.fallar_zip = fallar_zip
+        self.carpeta = str(tmp_path / 'checkpoints' / 'EMPRESA')
+
+    def _escribir(self, nombre, df):
+        self.ejecutadas.append(nombre)
+        self.salida.escribir_txt(df, os.path.join(self.salida.output_folder, nombre))
+
+    def ventas(self):
+        self.objeto.filas = 2
+        self._escribir('ventas.txt', pd.DataFrame({'Factura': ['F1', 'F2'], 'Valor': ['1,50', '2,00']}))
+
+    def clientes(self):
+        self._escribir('Clientes.txt', pd.DataFrame({'Código': ['001'], 'Nombre': ['Tienda Tuluá']}))
+
+    def comprimir(self):
+        self.ejecutadas.append('comprimir')
+        if self.fallar_zip:
+            raise OSError('disco lleno')
+        return self.salida.cerrar_zip(os.path.join(self.salida.historico_folder, 'final.zip'))
+
+    def ejecutar(self, reanudar=False):
+        etapas = [
+            Etapa('ventas', self.ventas, salidas=['ventas.txt'], estado=['filas']),
+            Etapa('clientes', self.clientes, salidas=['Clientes.txt']),
+            Etapa('comprimir', self.comprimir, entradas=['ventas.txt', 'Clientes.txt'], salidas=['zip_path'])
+        ]
+        self.puntos_control = PuntosControl(self.carpeta, self.objeto, salida=self.salida, reanudar=reanudar, huella='h')
+        try:
+            return Planificador(etapas, workers=2, puntos_control=self.puntos_control).ejecutar()
+        finally:
+            # Como al terminar el proceso: la carpeta queda libre para --resume
+            self.puntos_control.liberar()
+
+
+def _contenido_zip(ruta):
+    with zipfile.ZipFile(ruta) as zipf:
+        return {nombre: zipf.read(nombre) for nombre in zipf.namelist()}
+
+
+def test_reanudar_tras_fallo_ftp_no_vuelve_a_armar_el_zip(tmp_path):
+    # Primera ejecución completa; el envío FTP falla y los puntos de control quedan para --resume
+    primera = _Empresa(tmp_path)
+    ruta_zip = primera.ejecutar()['comprimir']
+    esperado = _contenido_zip(ruta_zip)
+
+    reanudada = _Empresa(tmp_path)
+    resultados = reanudada.ejecutar(reanudar=True)
+
+    assert reanudada.ejecutadas == []
+    assert resultados['comprimir'] == ruta_zip
+    assert reanudada.objeto.filas == 2
+    # Ningún ZIP temporal a medias junto al definitivo
+    assert os.listdir(reanudada.salida.historico_folder) == ['final.zip']
+    assert _contenido_zip(ruta_zip) == esperado
+
+
+def test_reanudar_tras_fallo_al_comprimir_reescribe_los_archivos_grabados(tmp_path):
+    primera = _Empresa(tmp_path, fallar_zip=True)
+    with pytest.raises(OSError, match='disco lleno'):
+        primera.ejecutar()
+
+    reanudada = _Empresa(tmp_path)
+    ruta_zip = reanudada.ejecutar(reanudar=True)['comprimir']
+
+    assert reanudada.ejecutadas == ['comprimir']
+    assert os.listdir(reanudada.salida.historico_folder) == ['final.zip']
+    contenido = _contenido_zip(ruta_zip)
+    assert sorted(contenido) == ['Clientes.txt', 'ventas.txt']
+    assert contenido['Clientes.txt'].decode('utf-8').splitlines() == ['Código{Nombre', '001{Tienda Tuluá']
+
+
+def _config(tmp_path):
+    insumo = tmp_path / 'Info proveedores.xlsx'
+    insumo.write_bytes(b'exportado el lunes')
+    return {
+        'files': {'ventas': str(insumo), 'mm': str(tmp_path / 'no_existe.xlsx')},
+        'checkpoint': {'carpeta': str(tmp_path / 'checkpoints')},
+        'ftp': {'user': 'usuario', 'password': 'secreto'}
+    }
+
+
+def test_manifiesto_guarda_un_digest_y_no_las_credenciales(tmp_path):
+    puntos_control = PuntosControl.desde_config(_config(tmp_path), SimpleNamespace(), 'EMPRESA')
+
+    with open(os.path.join(puntos_control.carpeta, PuntosControl.MANIFIESTO), encoding='utf-8') as archivo:
+        texto = archivo.read()
+    assert 'secreto' not in texto and 'usuario' not in texto
+    assert len(json.loads(texto)['huella']) == 32
+
+
+def test_huella_cambia_con_el_contenido_de_los_insumos(tmp_path):
+    config = _config(tmp_path)
+    intercliente = tmp_path / 'intercliente.txt'
+    intercliente.write_bytes(b'001{Tienda')
+    antes = huella_ejecucion(config, [config['files']['ventas'], str(intercliente)])
+
+    intercliente.write_bytes(b'002{Tienda')
+
+    assert huella_ejecucion(config, [config['files']['ventas'], str(intercliente)]) != antes
+
+
+def test_no_se_reanuda_si_el_erp_volvio_a_exportar_un_insumo(tmp_path):
+    config = _config(tmp_path)
+    intercliente = tmp_path / 'intercliente.txt'
+    intercliente.write_bytes(b'001{Tienda')
+    primera = PuntosControl.desde_config(config, SimpleNamespace(), 'EMPRESA', archivos=[str(intercliente)])
+    primera.ejecutar(Etapa('cargar', lambda: 'ventas'))
+    primera.liberar()
+
+    mismos = PuntosControl.desde_config(config, SimpleNamespace(), 'EMPRESA', reanudar=True,
+                                        archivos=[str(intercliente)])
+    assert mismos.carpeta == primera.carpeta and mismos.completada('cargar')
+    mismos.liberar()
+
+    (tmp_path / 'Info proveedores.xlsx').write_bytes(b'exportado el martes')
+    otra = PuntosControl.desde_config(config, SimpleNamespace(), 'EMPRESA', reanudar=True,
+                                      archivos=[str(intercliente)])
+    assert not otra.completada('cargar')
+
+
+def test_una_ejecucion_nueva_no_borra_la_que_sigue_en_curso(tmp_path):
+    carpeta = str(tmp_path / 'checkpoints' / 'EMPRESA')
+    en_curso = PuntosControl(carpeta, SimpleNamespace(), huella='h')
+    en_curso.ejecutar(Etapa('cargar', lambda: 'ventas'))
+
+    # Segundo lanzamiento de la misma empresa mientras la primera ejecución sigue escribiendo
+    segunda = PuntosControl(carpeta, SimpleNamespace(), huella='h')
+    assert os.path.isdir(en_curso.carpeta) and segunda.carpeta != en_curso.carpeta
+    en_curso.ejecutar(Etapa('procesar', lambda: None))
+
+    # --resume no toma una ejecución en curso
+    reanudada = PuntosControl(carpeta, SimpleNamespace(), reanudar=True, huella='h')
+    assert reanudada.carpeta not in (en_curso.carpeta, segunda.carpeta)
+    assert not reanudada.completada('cargar')
+
+    segunda.finalizar()
+    reanudada.finalizar()
+    en_curso.liberar()
+    # Ya terminada (por ejemplo, falló el FTP), la siguiente ejecución nueva sí la descarta
+    nueva = PuntosControl(carpeta, SimpleNamespace(), huella='h')
+    assert os.listdir(carpeta) == [os.path.basename(nueva.carpeta)]
+    nueva.finalizar()
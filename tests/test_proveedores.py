@@ -0,0 +1,64 @@
+# test_proveedores.py
+# FiltroProveedores contra el filtro original str.contains(patrón escapado, case=False, na=False)
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tsol_proveedores import FiltroProveedores
+
+
+def _como_str_contains(serie, proveedores):
+    """Filtro del script original."""
+    patron = '|'.join(re.escape(proveedor) for proveedor in proveedores)
+    return serie.str.contains(patron, case=False, na=False)
+
+
+PROVEEDORES = ['Colgate', 'P&G (S.A.)', 'ALPINA+', 'Nestlé', '[Bimbo]', 'C*']
+
+VALORES = [
+    'COLGATE PALMOLIVE', 'colgate', 'P&G (S.A.) Colombia', 'P&G SA', 'alpina+ s.a.s', 'ALPINA',
+    'NESTLÉ DE COLOMBIA', 'nestle', 'Grupo [bimbo]', 'Bimbo', 'C* LTDA', 'CC', '', None, np.nan,
+    20030, 1.5, 'Colgate', 'colgate', 20030
+]
+
+
+@pytest.mark.parametrize('proveedores', [PROVEEDORES, ['Colgate'], []], ids=['varios', 'uno', 'vacio'])
+def test_mascara_igual_a_str_contains(proveedores):
+    serie = pd.Series(VALORES, dtype=object, name='Proveedor', index=range(100, 100 + len(VALORES)))
+
+    mascara = FiltroProveedores(proveedores).mascara(serie)
+
+    pd.testing.assert_series_equal(mascara, _como_str_contains(serie, proveedores))
+
+
+def test_lista_vacia_acepta_todo_texto_y_ningun_nulo_ni_numero():
+    serie = pd.Series(['COLGATE', '', None, np.nan, 20030], dtype=object)
+
+    assert FiltroProveedores([]).mascara(serie).tolist() == [True, True, False, False, False]
+    assert FiltroProveedores(None).mascara(serie).tolist() == [True, True, False, False, False]
+
+
+def test_mascara_en_columna_categorica():
+    serie = pd.Series(['COLGATE', 'OTRO', None, 'Colgate'], dtype='category')
+
+    assert FiltroProveedores(['colgate']).mascara(serie).tolist() == [True, False, False, True]
+
+
+def test_filtrar_conserva_filas_e_indice_del_original():
+    df = pd.DataFrame({'Proveedor': VALORES, 'Valor': range(len(VALORES))}, index=range(50, 50 + len(VALORES)))
+
+    filtrado = FiltroProveedores(PROVEEDORES).filtrar(df, 'Proveedor')
+
+    pd.testing.assert_frame_equal(filtrado, df[_como_str_contains(df['Proveedor'], PROVEEDORES)])
+
+
+def test_decision_por_valor_distinto():
+    filtro = FiltroProveedores(['Colgate'])
+    serie = pd.Series(['COLGATE', 'OTRO'] * 1000, dtype=object)
+
+    filtro.mascara(serie)
+
+    assert filtro._decisiones == {'COLGATE': True, 'OTRO': False}
@@ -0,0 +1,118 @@
+# test_ventas.py
+# Frame compacto de ventas y listado de facturas contra el groupby del cálculo original; modo de memoria
+# ligera activado solo desde los puntos de entrada
+
+import importlib
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tsol_ventas import compactar_ventas, configurar_memoria, desde_centavos, fecha_entera, fechas_de, sumar_por_claves
+
+
+CLAVES = ['Código Cliente', 'Código Vendedor', 'Fecha', 'Numero Documento']
+
+
+def _ventas(filas=2000, semilla=7):
+    """Ventas sintéticas con horas distintas dentro del mismo día y algunos clientes nulos."""
+    rng = np.random.default_rng(semilla)
+    fechas = (
+        pd.Timestamp('2024-03-01')
+        + pd.to_timedelta(rng.integers(0, 5, filas), unit='D')
+        + pd.to_timedelta(rng.integers(0, 3, filas) * 7, unit='h')
+    )
+    clientes = rng.choice(['C1', 'C2', 'C10', '999'], filas).astype(object)
+    clientes[::41] = None
+    return pd.DataFrame({
+        'Código Cliente': clientes,
+        'Código Vendedor': rng.choice(['V2', 'V1'], filas),
+        'Fecha': fechas,
+        'Numero Documento': rng.integers(100, 140, filas).astype(str),
+        'Valor Total Item Vendido': rng.normal(1000, 400, filas).round(2),
+        'Costo': rng.normal(500, 100, filas).round(2)
+    })
+
+
+def _listado_original(ventas):
+    """Listado de facturas como lo calculaba el script original: fecha como texto '%Y/%m/%d'."""
+    original = ventas.assign(Fecha=ventas['Fecha'].dt.strftime('%Y/%m/%d'))
+    resumen = original.groupby(CLAVES)['Valor Total Item Vendido'].sum().round(2).reset_index()
+    return resumen
+
+
+def test_fecha_entera_descarta_la_hora():
+    fechas = pd.Series(pd.to_datetime(['2024-03-01 08:00', '2024-03-01 17:30', '2024-03-02 00:00']))
+
+    assert fecha_entera(fechas).tolist() == [20240301, 20240301, 20240302]
+    assert fecha_entera(fechas).dtype == 'int32'
+
+
+def test_fecha_entera_sin_fecha_queda_nula():
+    fechas = pd.Series(pd.to_datetime(['2024-03-01 08:00', None]))
+
+    enteras = fecha_entera(fechas)
+
+    assert enteras.dtype == 'Int32'
+    assert enteras.isna().tolist() == [False, True]
+    assert fechas_de(enteras).isna().tolist() == [False, True]
+
+
+def test_listado_de_facturas_igual_al_groupby_original():
+    ventas = _ventas()
+    esperado = _listado_original(ventas)
+
+    resumen, total = sumar_por_claves(compactar_ventas(ventas), CLAVES, 'Valor Total Item Vendido')
+
+    assert len(resumen) == len(esperado)
+    assert resumen['Código Cliente'].astype(str).tolist() == esperado['Código Cliente'].tolist()
+    assert resumen['Código Vendedor'].astype(str).tolist() == esperado['Código Vendedor'].tolist()
+    assert fechas_de(resumen['Fecha']).dt.strftime('%Y/%m/%d').tolist() == esperado['Fecha'].tolist()
+    assert resumen['Numero Documento'].astype(str).tolist() == esperado['Numero Documento'].tolist()
+    np.testing.assert_allclose(desde_centavos(total).round(2), esperado['Valor Total Item Vendido'])
+
+
+@pytest.mark.parametrize('fecha', ['datetime', 'entera'])
+def test_sumar_por_claves_igual_a_groupby(fecha):
+    ventas = compactar_ventas(_ventas(semilla=11))
+    if fecha == 'datetime':
+        ventas = ventas.assign(Fecha=fechas_de(ventas['Fecha']))
+    esperado = ventas.groupby(CLAVES, observed=True)['Valor Total Item Vendido'].sum().reset_index()
+
+    resumen, total = sumar_por_claves(ventas, CLAVES, 'Valor Total Item Vendido')
+
+    pd.testing.assert_frame_equal(resumen, esperado[CLAVES])
+    assert total.tolist() == esperado['Valor Total Item Vendido'].tolist()
+
+
+def test_sumar_por_claves_con_horas_y_nulos_igual_a_groupby():
+    # Claves sin compactar: timestamps con hora (cada hora es un grupo), NaT y textos object
+    ventas = _ventas(filas=500, semilla=3)
+    ventas.loc[::37, 'Fecha'] = pd.NaT
+    esperado = ventas.groupby(CLAVES)['Valor Total Item Vendido'].sum().reset_index()
+
+    resumen, total = sumar_por_claves(ventas, CLAVES, 'Valor Total Item Vendido')
+
+    pd.testing.assert_frame_equal(resumen, esperado[CLAVES])
+    np.testing.assert_allclose(total.to_numpy(), esperado['Valor Total Item Vendido'].to_numpy())
+
+
+@pytest.mark.parametrize('modulo, empresa', [
+    ('PlanosTsol_Distrijass', 'distrijass'), ('PlanosTsol_Eje', 'eje_cafetero'), ('PlanosTsol_Colgate', None)
+])
+def test_crear_el_procesador_no_cambia_la_opcion_global_de_pandas(tmp_path, monkeypatch, modulo, empresa):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'config.json').write_text(json.dumps({
+        'memoria': {'ligera': True},
+        'files': {'catalogo_principal': 'PROVEE-TSOL.xlsx'},
+        'cache': {'carpeta': 'cache'},
+        'companies': {empresa or 'colgate': {'output_subfolder': 'salida', 'codigo': '1'}}
+    }), encoding='utf-8')
+    clase = importlib.import_module(modulo).VentaProcessor
+
+    with pd.option_context('mode.copy_on_write', False):
+        clase('config.json', empresa=empresa) if empresa else clase('config.json')
+        assert not pd.get_option('mode.copy_on_write')
+        # El punto de entrada es quien la activa
+        assert configurar_memoria({'memoria': {'ligera': True}})
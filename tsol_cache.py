@@ -0,0 +1,346 @@
+# tsol_cache.py
+# Caché binaria en disco para los insumos que se vuelven a leer en cada ejecución TSOL
+# Compartida por PlanosTsol_Distrijass.py, PlanosTsol_Eje.py y PlanosTsol_Colgate.py
+
+import pandas as pd
+import os
+import json
+import hashlib
+import glob
+import inspect
+import pickle
+import logging
+import threading
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+
+logger = logging.getLogger()
+
+# Módulos compartidos que también producen los bytes de las etapas (lectores, normalización, ventas,
+# escritor...): forman parte de la huella de cada etapa junto con el script que la define
+MODULOS_COMPARTIDOS = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tsol_*.py')))
+
+
+def huella_archivo(ruta, contenido=True):
+    """Calcula la huella de un archivo: ruta absoluta, tamaño, mtime y (opcional) hash del contenido."""
+    estado = os.stat(ruta)
+    huella = {
+        'ruta': os.path.abspath(ruta),
+        'tamano': estado.st_size,
+        'mtime': estado.st_mtime_ns
+    }
+    if contenido:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(ruta, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+                digest.update(bloque)
+        huella['contenido'] = digest.hexdigest()
+    return huella
+
+
+class CacheBinaria:
+    """
+    Guarda DataFrames en formato columnar (Parquet si pyarrow está instalado, pickle en otro caso).
+    Cada entrada ocupa un "slot" determinado por espacio + parámetros; la huella del archivo de origen
+    se guarda junto al frame y, si no coincide con la actual, la entrada se reconstruye y se sobrescribe.
+    Con limite_mb, al guardar se borran las entradas usadas hace más tiempo hasta volver bajo el límite
+    (cada lectura exitosa marca la entrada como usada).
+    """
+
+    def __init__(self, carpeta='cache', habilitada=True, limite_mb=None):
+        self.carpeta = carpeta
+        self.habilitada = habilitada
+        self.limite_mb = limite_mb
+        if self.habilitada and not os.path.exists(self.carpeta):
+            os.makedirs(self.carpeta)
+            logger.info(f"Carpeta de caché creada: {self.carpeta}")
+
+    @classmethod
+    def desde_config(cls, config):
+        """Crea la caché a partir de la sección 'cache' del config.json."""
+        cache_config = config.get('cache', {})
+        return cls(
+            carpeta=cache_config.get('carpeta', 'cache'),
+            habilitada=cache_config.get('habilitada', True),
+            limite_mb=cache_config.get('limite_mb', 2048)
+        )
+
+    def _slot(self, espacio, parametros):
+        """Nombre base del archivo de caché para un espacio y sus parámetros."""
+        texto = json.dumps(parametros, sort_keys=True, default=str)
+        digest = hashlib.blake2b(texto.encode('utf-8'), digest_size=10).hexdigest()
+        return os.path.join(self.carpeta, f"{espacio}_{digest}")
+
+    def cargar(self, espacio, parametros, huella):
+        """Devuelve el DataFrame guardado si la huella coincide, o None si no hay entrada válida."""
+        if not self.habilitada:
+            return None
+        base = self._slot(espacio, parametros)
+        ruta_meta = base + '.json'
+        if not os.path.isfile(ruta_meta):
+            return None
+        try:
+            with open(ruta_meta, 'r', encoding='utf-8') as archivo:
+                meta = json.load(archivo)
+            if meta.get('huella') != huella:
+                logger.info(f"Caché '{espacio}' desactualizada, se reconstruirá.")
+                return None
+            if meta['formato'] == 'parquet':
+                df = pd.read_parquet(base + '.parquet')
+            else:
+                df = pd.read_pickle(base + '.pkl')
+            df.attrs.update(meta.get('attrs', {}))
+            self.marcar_uso(ruta_meta)
+            return df
+        except Exception as e:
+            logger.warning(f"No se pudo leer la caché '{espacio}': {e}")
+            return None
+
+    def guardar(self, espacio, parametros, huella, df):
+        """Guarda el DataFrame y su huella; escribe en temporales y reemplaza para no dejar entradas a medias."""
+        if not self.habilitada:
+            return
+        base = self._slot(espacio, parametros)
+        # Temporales por proceso e hilo: varias empresas o etapas en paralelo pueden guardar la misma entrada a la vez
+        tmp = f'.{os.getpid()}_{threading.get_ident()}.tmp'
+        formato = 'pickle'
+        try:
+            if PARQUET_DISPONIBLE:
+                try:
+                    # Los attrs van en el .json de metadatos; to_parquet los serializaría con json.dumps
+                    columnar = df.copy(deep=False)
+                    columnar.attrs = {}
+                    columnar.to_parquet(base + '.parquet' + tmp, index=True)
+                    os.replace(base + '.parquet' + tmp, base + '.parquet')
+                    formato = 'parquet'
+                except Exception as e:
+                    # Columnas con tipos mezclados (frecuentes en hojas Excel) no son serializables en Parquet
+                    logger.warning(f"Parquet no disponible para '{espacio}' ({e}); se usa pickle.")
+                    if os.path.exists(base + '.parquet' + tmp):
+                        os.remove(base + '.parquet' + tmp)
+            if formato == 'pickle':
+                df.to_pickle(base + '.pkl' + tmp)
+                os.replace(base + '.pkl' + tmp, base + '.pkl')
+
+            meta = {
+                'espacio': espacio,
+                'parametros': parametros,
+                'huella': huella,
+                'formato': formato,
+                'attrs': df.attrs
+            }
+            with open(base + '.json' + tmp, 'w', encoding='utf-8') as archivo:
+                json.dump(meta, archivo, default=str)
+            os.replace(base + '.json' + tmp, base + '.json')
+            logger.info(f"Caché '{espacio}' guardada ({formato}): {base}")
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la caché '{espacio}': {e}")
+        self.recortar(conservar=base)
+
+    @staticmethod
+    def marcar_uso(ruta):
+        """Actualiza la fecha de la entrada para que recortar() la considere usada recientemente."""
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+
+    def recortar(self, conservar=None):
+        """
+        Borra las entradas usadas hace más tiempo mientras la carpeta supere limite_mb. Una entrada son
+        los archivos con el mismo nombre base (frame y metadatos); su último uso es la fecha más reciente
+        entre ellos. 'conservar' (ruta base) nunca se borra: es la entrada que se acaba de guardar.
+        """
+        if not self.habilitada or not self.limite_mb:
+            return
+        entradas = {}
+        for nombre in os.listdir(self.carpeta):
+            if nombre.endswith('.tmp'):
+                continue
+            ruta = os.path.join(self.carpeta, nombre)
+            try:
+                estado = os.stat(ruta)
+            except OSError:
+                continue
+            base = os.path.join(self.carpeta, nombre.split('.', 1)[0])
+            tamano, uso, rutas = entradas.get(base, (0, 0.0, []))
+            entradas[base] = (tamano + estado.st_size, max(uso, estado.st_mtime), rutas + [ruta])
+
+        total = sum(tamano for tamano, _, _ in entradas.values())
+        limite = self.limite_mb * 1024 * 1024
+        for base, (tamano, _, rutas) in sorted(entradas.items(), key=lambda item: item[1][1]):
+            if total <= limite:
+                break
+            if base == conservar:
+                continue
+            for ruta in rutas:
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+            total -= tamano
+            logger.info(f"Caché: entrada {base} eliminada por límite de tamaño ({tamano / 1024 / 1024:.1f} MB)")
+
+    def obtener(self, espacio, ruta_origen, construir, parametros=None, contenido=True):
+        """Devuelve el frame cacheado para ruta_origen o lo construye con 'construir()' y lo guarda."""
+        if not self.habilitada:
+            return construir()
+        parametros = dict(parametros or {}, ruta=os.path.abspath(ruta_origen))
+        huella = huella_archivo(ruta_origen, contenido=contenido)
+        df = self.cargar(espacio, parametros, huella)
+        if df is not None:
+            logger.info(f"Caché '{espacio}' reutilizada para {ruta_origen}")
+            return df
+        df = construir()
+        self.guardar(espacio, parametros, huella, df)
+        return df
+
+
+class CacheEtapas:
+    """
+    Reutiliza el resultado de etapas del pipeline cuyas entradas no cambiaron desde la ejecución anterior.
+    La huella de una etapa combina el contenido de los archivos que lee, la porción del config que usa,
+    las claves en memoria que recibe de otras etapas (por ejemplo, los códigos de vendedor vendidos) y
+    el código que la ejecuta: el script que la define y los módulos tsol_* (MODULOS_COMPARTIDOS).
+    Se guarda el frame que la etapa deja en el procesador y los bytes de los archivos que escribió;
+    con la misma huella, la etapa no se ejecuta: se restaura el frame y se reescriben esos bytes.
+    """
+
+    def __init__(self, cache, salida, espacio, habilitada=True):
+        self.cache = cache
+        self.salida = salida
+        self.espacio = str(espacio)
+        self.habilitada = habilitada and cache.habilitada
+
+    @classmethod
+    def desde_config(cls, config, cache, salida, espacio):
+        """Crea la caché de etapas según 'cache.etapas' del config.json (habilitada por defecto)."""
+        return cls(cache, salida, espacio, habilitada=config.get('cache', {}).get('etapas', True))
+
+    @staticmethod
+    def huella(archivos=(), config=None, claves=()):
+        """
+        Huella de las entradas de una etapa. Los archivos cuentan por contenido (no por fecha), y las claves
+        se comparan como conjuntos de valores distintos, con su tipo: 1 y '1' no filtran igual con isin.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for ruta in archivos:
+            digest.update(huella_archivo(ruta)['contenido'].encode('ascii'))
+        digest.update(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))
+        for valores in claves:
+            distintos = sorted((type(valor).__name__, str(valor)) for valor in pd.unique(pd.Series(valores).dropna()))
+            digest.update(json.dumps(distintos).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _ruta(self, nombre):
+        return self.cache._slot(f'etapa_{nombre}', {'empresa': self.espacio}) + '.pkl'
+
+    def _cargar(self, nombre, huella):
+        """Devuelve la entrada guardada de la etapa si su huella coincide, o None."""
+        ruta = self._ruta(nombre)
+        if not os.path.isfile(ruta):
+            return None
+        try:
+            with open(ruta, 'rb') as archivo:
+                entrada = pickle.load(archivo)
+            if entrada.get('huella') != huella:
+                logger.info(f"Etapa '{nombre}': las entradas cambiaron, se ejecutará de nuevo.")
+                return None
+            self.cache.marcar_uso(ruta)
+            return entrada
+        except Exception as e:
+            logger.warning(f"No se pudo leer la caché de la etapa '{nombre}': {e}")
+            return None
+
+    def _guardar(self, nombre, huella, frame, archivos):
+        """Guarda frame y archivos de la etapa reemplazando la entrada anterior de forma atómica."""
+        ruta = self._ruta(nombre)
+        tmp = f'{ruta}.{os.getpid()}_{threading.get_ident()}.tmp'
+        try:
+            with open(tmp, 'wb') as archivo:
+                pickle.dump({'huella': huella, 'frame': frame, 'archivos': archivos}, archivo,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, ruta)
+            logger.info(f"Caché de la etapa '{nombre}' guardada: {ruta}")
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la caché de la etapa '{nombre}': {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.cache.recortar(conservar=os.path.splitext(ruta)[0])
+
+    def envolver(self, nombre, funcion, huella, objeto=None, atributo=None):
+        """
+        Devuelve una versión de 'funcion' que consulta la caché. 'huella' es una función que se evalúa al
+        momento de ejecutar (cuando las etapas previas ya dejaron sus claves en memoria); 'atributo' es el
+        frame que la etapa deja en 'objeto' y que se restaura al reutilizarla.
+        """
+        if not self.habilitada:
+            return funcion
+
+        def ejecutar():
+            # El código también es entrada: un cambio en el script o en un módulo tsol_* invalida sus resultados
+            clave = self.huella(archivos=[inspect.getfile(funcion)] + MODULOS_COMPARTIDOS, config=huella())
+            entrada = self._cargar(nombre, clave)
+            if entrada is not None:
+                for nombre_archivo, contenido in entrada['archivos'].items():
+                    self.salida.escribir_bytes(os.path.join(self.salida.output_folder, nombre_archivo), contenido)
+                if atributo is not None:
+                    setattr(objeto, atributo, entrada['frame'])
+                logger.info(f"Etapa '{nombre}' reutilizada desde la caché (entradas sin cambios)")
+                return None
+
+            with self.salida.grabar() as archivos:
+                resultado = funcion()
+            frame = getattr(objeto, atributo) if atributo is not None else None
+            self._guardar(nombre, clave, frame, archivos)
+            return resultado
+
+        return ejecutar
+
+
+class LibroExcel:
+    """
+    Abre un libro Excel una sola vez y parsea cada hoja como máximo una vez por ejecución.
+    Todas las etapas reciben el mismo DataFrame por hoja, por lo que no deben modificarlo en sitio.
+    Si se entrega una CacheBinaria, las hojas parseadas también se conservan entre ejecuciones.
+    Es seguro usarlo desde varias etapas a la vez: el libro se lee con un hilo a la vez.
+    """
+
+    def __init__(self, ruta, cache=None):
+        self.ruta = ruta
+        self.cache = cache
+        self._libro = None
+        self._hojas = {}
+        self._lock = threading.RLock()
+
+    def _parsear(self, nombre):
+        """Parsea la hoja abriendo el libro solo la primera vez que se necesita."""
+        if self._libro is None:
+            self._libro = pd.ExcelFile(self.ruta)
+            logger.info(f"Libro abierto: {self.ruta}")
+        return self._libro.parse(nombre)
+
+    def hoja(self, nombre):
+        """Devuelve el DataFrame de la hoja, parseándolo solo la primera vez."""
+        with self._lock:
+            if nombre not in self._hojas:
+                if self.cache is not None:
+                    self._hojas[nombre] = self.cache.obtener(
+                        'libro', self.ruta, lambda: self._parsear(nombre), parametros={'hoja': nombre}
+                    )
+                else:
+                    self._hojas[nombre] = self._parsear(nombre)
+                logger.info(f"Hoja '{nombre}' disponible: {len(self._hojas[nombre])} registros")
+            return self._hojas[nombre]
+
+    def cerrar(self):
+        """Cierra el libro si quedó abierto; las hojas ya parseadas siguen disponibles."""
+        with self._lock:
+            if self._libro is not None:
+                self._libro.close()
+                self._libro = None
@@ -0,0 +1,299 @@
+# tsol_escritor.py
+# Escritura de los archivos planos TSOL (separador '{', primera fila de encabezado, utf-8)
+# Compartido por PlanosTsol_Distrijass.py, PlanosTsol_Eje.py y PlanosTsol_Colgate.py
+
+import pandas as pd
+import numpy as np
+import os
+import io
+import logging
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+
+from pandas.api.types import is_extension_array_dtype
+
+from tsol_pandas import internos_pandas
+from tsol_ventas import desde_centavos, fechas_de
+
+
+logger = logging.getLogger()
+
+# Internos de pandas que reproducen el tipo de fila de iterrows() (versión verificada)
+PANDAS_INTERNO = internos_pandas()
+
+SEPARADOR = '{'
+# Filas que se arman en memoria antes de cada escritura
+FILAS_POR_BLOQUE = 100000
+
+# Formatos de salida por tipo de campo (docs/especificaciones_tracksales.md).
+# La especificación describe fechas DDMMYYYY y punto decimal, pero los planos que TrackSales
+# recibe hoy de Distrijass usan AAAA/MM/DD y coma decimal; se conservan esos formatos.
+FORMATO_FECHA = '%Y/%m/%d'
+DECIMALES = 2
+SEPARADOR_DECIMAL = ','
+
+# Campos con formato en ventas.txt (el resto se escribe con str); el frame compacto de tsol_ventas
+# guarda la fecha como AAAAMMDD entero y los valores en centavos
+FORMATOS_VENTAS = {
+    'Fecha': 'fecha',
+    'Valor Total Item Vendido': 'centavos',
+    'Costo': 'centavos'
+}
+
+
+def _por_valor_unico(codigos, unicos, formatear):
+    """Formatea cada valor distinto una sola vez y lo reparte a las filas; el código -1 (nulo) queda NaN."""
+    textos = np.empty(len(unicos) + 1, dtype=object)
+    textos[:-1] = [formatear(valor) for valor in unicos]
+    textos[-1] = np.nan
+    return textos[codigos]
+
+
+def formatear_fecha(serie, formato=FORMATO_FECHA):
+    """
+    Fechas (datetime o AAAAMMDD enteros) a texto con el formato TSOL, igual que serie.dt.strftime(formato)
+    (NaT queda NaN).
+    """
+    codigos, unicos = pd.factorize(fechas_de(serie))
+    textos = _por_valor_unico(codigos, unicos.strftime(formato), lambda texto: texto)
+    return pd.Series(textos, index=serie.index, name=serie.name)
+
+
+def formatear_decimal(serie, decimales=DECIMALES, separador=SEPARADOR_DECIMAL):
+    """
+    Números a texto con decimales fijos, igual que f"{x:.2f}".replace('.', ',') por valor (NaN queda 'nan').
+    Los valores se agrupan por su representación binaria para no confundir 0.0 con -0.0.
+    """
+    valores = serie.to_numpy(dtype='float64')
+    codigos, unicos = pd.factorize(valores.view('int64'))
+    patron = f"{{:.{decimales}f}}"
+    textos = _por_valor_unico(codigos, unicos.view('float64'), lambda valor: patron.format(valor).replace('.', separador))
+    return pd.Series(textos, index=serie.index, name=serie.name)
+
+
+def formatear_centavos(serie, decimales=DECIMALES, separador=SEPARADOR_DECIMAL):
+    """Centavos enteros (Int64) a texto decimal, igual que formatear_decimal sobre el valor redondeado."""
+    return formatear_decimal(desde_centavos(serie), decimales=decimales, separador=separador)
+
+
+FORMATEADORES = {
+    'fecha': formatear_fecha,
+    'decimal': formatear_decimal,
+    'centavos': formatear_centavos
+}
+
+
+def aplicar_formatos(df, formatos):
+    """Devuelve el frame con las columnas de 'formatos' ({columna: tipo}) convertidas a texto TSOL."""
+    return df.assign(**{
+        columna: FORMATEADORES[tipo](df[columna])
+        for columna, tipo in formatos.items()
+        if columna in df.columns
+    })
+
+
+def _tipo_de_fila(df):
+    """
+    Tipo con el que df.iterrows() entrega cada fila: el tipo común de todas las columnas
+    (object si hay tipos de extensión o mezclas). Define cómo se ven los valores al pasarlos a str;
+    por ejemplo, un entero en un frame solo numérico con columnas float se escribe como '5.0'.
+    """
+    tipo = PANDAS_INTERNO.find_common_type(list(df.dtypes))
+    if is_extension_array_dtype(tipo):
+        return np.dtype(object)
+    return tipo
+
+
+def _columna_como_texto(serie, tipo_fila):
+    """Convierte una columna a str exactamente como quedaría dentro de una fila de iterrows()."""
+    if tipo_fila == object:
+        # En filas object las fechas llegan como Timestamp y los tipos de extensión como sus escalares
+        if serie.dtype.kind in 'Mm' or is_extension_array_dtype(serie.dtype):
+            return serie.astype(object).map(str)
+        return serie.astype(str)
+    if tipo_fila.kind in 'Mm':
+        return serie.astype(tipo_fila).astype(object).map(str)
+    return serie.astype(tipo_fila).astype(str)
+
+
+def lineas_tsol(df):
+    """Devuelve una Serie con cada fila del frame unida por SEPARADOR (sin salto de línea)."""
+    if df.shape[1] == 0:
+        return pd.Series([''] * len(df), index=df.index, dtype=object)
+    tipo_fila = _tipo_de_fila(df)
+    lineas = None
+    for posicion in range(df.shape[1]):
+        texto = _columna_como_texto(df.iloc[:, posicion], tipo_fila)
+        lineas = texto if lineas is None else lineas + SEPARADOR + texto
+    return lineas
+
+
+def escribir_tsol(archivos, df, columnas=None, formatos=None):
+    """
+    Escribe el frame en uno o varios archivos de texto ya abiertos: encabezado con los nombres de columna
+    y una línea por fila, con el mismo contenido que el recorrido fila a fila con iterrows() y
+    '{'.join(map(str, fila)). Las columnas de 'formatos' se convierten aquí, de modo que el frame puede
+    conservar fechas y números tipados hasta la escritura. Las líneas se arman por columnas y se
+    escriben en bloques de FILAS_POR_BLOQUE.
+    """
+    if columnas is not None:
+        df = df[columnas]
+    if formatos:
+        df = aplicar_formatos(df, formatos)
+    encabezado = SEPARADOR.join(str(columna) for columna in df.columns)
+
+    for archivo in archivos:
+        archivo.write(encabezado + '\n')
+    for desde in range(0, len(df), FILAS_POR_BLOQUE):
+        bloque = '\n'.join(lineas_tsol(df.iloc[desde:desde + FILAS_POR_BLOQUE])) + '\n'
+        for archivo in archivos:
+            archivo.write(bloque)
+    return len(df)
+
+
+def escribir_txt(df, ruta, columnas=None, formatos=None, encoding='utf-8'):
+    """Escribe el frame como archivo plano TSOL en 'ruta' (ver escribir_tsol)."""
+    inicio = time.perf_counter()
+    # Modo texto: los saltos de línea se escriben igual que antes (os.linesep)
+    with open(ruta, 'w', encoding=encoding) as archivo:
+        filas = escribir_tsol([archivo], df, columnas=columnas, formatos=formatos)
+    logger.debug(f"{filas} filas escritas en {ruta} en {time.perf_counter() - inicio:.2f}s")
+    return ruta
+
+
+class SalidaTsol:
+    """
+    Destino de los archivos TSOL de una empresa (sección 'salida' del config.json).
+    - zip_directo = false: cada archivo se escribe como TXT en output_folder y comprimir_archivos
+      arma el ZIP después (comportamiento original).
+    - zip_directo = true: cada archivo se escribe directamente como miembro del ZIP en 'historico',
+      en una sola pasada; el ZIP se crea con un nombre temporal y cerrar_zip le pone el nombre final.
+      Con conservar_txt = true también se deja una copia TXT en output_folder.
+    """
+
+    NOMBRE_TEMPORAL = 'en_proceso.zip.tmp'
+
+    def __init__(self, output_folder, zip_directo=False, conservar_txt=False, encoding='utf-8'):
+        self.output_folder = output_folder
+        self.zip_directo = zip_directo
+        self.conservar_txt = conservar_txt
+        self.encoding = encoding
+        self.historico_folder = os.path.join(output_folder, 'historico')
+        self._zip = None
+        # zipfile no admite escribir dos miembros a la vez
+        self._lock = threading.Lock()
+        # Archivos grabados por hilo mientras una etapa corre dentro de grabar()
+        self._grabacion = threading.local()
+
+    @classmethod
+    def desde_config(cls, config, output_folder):
+        """Crea el destino a partir de la sección 'salida' del config.json."""
+        salida_config = config.get('salida', {})
+        return cls(
+            output_folder,
+            zip_directo=salida_config.get('zip_directo', False),
+            conservar_txt=salida_config.get('conservar_txt', False)
+        )
+
+    @property
+    def ruta_temporal(self):
+        """Ruta del ZIP mientras se escribe; cerrar_zip lo reemplaza por el nombre definitivo."""
+        return os.path.join(self.historico_folder, self.NOMBRE_TEMPORAL)
+
+    def _abrir_zip(self):
+        """Abre el ZIP temporal en 'historico' la primera vez que se escribe un archivo."""
+        if self._zip is None:
+            if not os.path.exists(self.historico_folder):
+                os.makedirs(self.historico_folder)
+                logger.info(f"Carpeta de histórico creada: {self.historico_folder}")
+            self._zip = zipfile.ZipFile(self.ruta_temporal, 'w', zipfile.ZIP_DEFLATED)
+        return self._zip
+
+    @contextmanager
+    def grabar(self):
+        """
+        Dentro del bloque, guarda en un dict {nombre: bytes} el contenido de cada archivo que escriba
+        el hilo actual, tal como queda en disco; escribir_bytes puede reproducirlo después.
+        """
+        anteriores = getattr(self._grabacion, 'archivos', None)
+        grabados = {}
+        self._grabacion.archivos = grabados
+        try:
+            yield grabados
+        finally:
+            # Una grabación dentro de otra también le entrega sus archivos a la exterior
+            self._grabacion.archivos = anteriores
+            if anteriores is not None:
+                anteriores.update(grabados)
+
+    @contextmanager
+    def _abrir_miembro(self, nombre):
+        """Abre un miembro nuevo del ZIP para escribir bytes; debe usarse con el lock tomado."""
+        zipf = self._abrir_zip()
+        # Fecha del miembro igual a la que tendría el TXT (sin ZipInfo quedaría en 1980)
+        info = zipfile.ZipInfo(nombre, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with zipf.open(info, 'w') as miembro:
+            yield miembro
+
+    def escribir_txt(self, df, ruta, columnas=None, formatos=None):
+        """Escribe el archivo TSOL en 'ruta' o, en modo zip_directo, como miembro del ZIP con su nombre."""
+        grabados = getattr(self._grabacion, 'archivos', None)
+        if not self.zip_directo and grabados is None:
+            return escribir_txt(df, ruta, columnas=columnas, formatos=formatos, encoding=self.encoding)
+
+        inicio = time.perf_counter()
+        nombre = os.path.basename(ruta)
+        grabacion = io.StringIO() if grabados is not None else None
+        if not self.zip_directo:
+            with open(ruta, 'w', encoding=self.encoding) as archivo:
+                filas = escribir_tsol([archivo, grabacion], df, columnas=columnas, formatos=formatos)
+            logger.debug(f"{filas} filas escritas en {ruta} en {time.perf_counter() - inicio:.2f}s")
+        else:
+            with self._lock, self._abrir_miembro(nombre) as miembro:
+                # newline=None traduce '\n' a os.linesep, igual que los TXT escritos en modo texto
+                texto = io.TextIOWrapper(miembro, encoding=self.encoding, newline=None)
+                archivos = [texto]
+                copia = open(ruta, 'w', encoding=self.encoding) if self.conservar_txt else None
+                for extra in (copia, grabacion):
+                    if extra is not None:
+                        archivos.append(extra)
+                try:
+                    filas = escribir_tsol(archivos, df, columnas=columnas, formatos=formatos)
+                finally:
+                    texto.flush()
+                    texto.detach()
+                    if copia is not None:
+                        copia.close()
+            logger.info(f"Archivo '{nombre}' añadido al ZIP: {filas} filas en {time.perf_counter() - inicio:.2f}s")
+
+        if grabacion is not None:
+            grabados[nombre] = grabacion.getvalue().replace('\n', os.linesep).encode(self.encoding)
+        return ruta
+
+    def escribir_bytes(self, ruta, contenido):
+        """Escribe un archivo ya serializado (por ejemplo, grabado con grabar()) en el mismo destino que escribir_txt."""
+        nombre = os.path.basename(ruta)
+        if self.zip_directo:
+            with self._lock, self._abrir_miembro(nombre) as miembro:
+                miembro.write(contenido)
+        if not self.zip_directo or self.conservar_txt:
+            with open(ruta, 'wb') as archivo:
+                archivo.write(contenido)
+        grabados = getattr(self._grabacion, 'archivos', None)
+        if grabados is not None:
+            grabados[nombre] = contenido
+        logger.info(f"Archivo '{nombre}' escrito desde contenido previo ({len(contenido)} bytes)")
+        return ruta
+
+    def cerrar_zip(self, ruta_zip):
+        """Cierra el ZIP escrito en modo zip_directo y lo mueve a su nombre final."""
+        with self._lock:
+            if self._zip is None:
+                self._abrir_zip()
+            self._zip.close()
+            self._zip = None
+            os.replace(self.ruta_temporal, ruta_zip)
+        return ruta_zip
@@ -0,0 +1,568 @@
+# tsol_lectores.py
+# Lectores de insumos para el generador TSOL
+# Compartido por PlanosTsol_Distrijass.py, PlanosTsol_Eje.py y PlanosTsol_Colgate.py
+
+import pandas as pd
+import numpy as np
+import os
+import logging
+import threading
+import time
+from datetime import datetime
+
+import openpyxl
+from openpyxl.cell.cell import ERROR_CODES
+
+from tsol_cache import CacheBinaria, CacheEtapas, LibroExcel
+from tsol_pandas import internos_pandas
+from tsol_proveedores import FiltroProveedores
+
+
+logger = logging.getLogger()
+
+# Internos de pandas que reproducen la inferencia de tipos de pd.read_excel (versión verificada)
+PANDAS_INTERNO = internos_pandas()
+STR_NA_VALUES = PANDAS_INTERNO.STR_NA_VALUES
+
+# Tipos declarados de las columnas de la hoja 'infoventas'.
+# 'codigo': códigos con el tipo que pd.read_excel infería sobre la hoja completa (ver _InferenciaExcel);
+# 'numero': valores numéricos; 'fecha': datetime
+TIPOS_INFOVENTAS = {
+    'Cod. cliente': 'codigo',
+    'Cod. vendedor': 'codigo',
+    'Cod. productto': 'codigo',
+    'Fecha': 'fecha',
+    'Fac. numero': 'codigo',
+    'Cantidad': 'numero',
+    'Vta neta': 'numero',
+    'Tipo': 'codigo',
+    'Costo': 'numero',
+    'Unidad': 'codigo',
+    'Pedido': 'codigo',
+    'Codigo bodega': 'codigo',
+    'Proveedor': 'codigo'
+}
+# Cambia cuando cambia la representación de los frames leídos: forma parte de la clave de la caché
+VERSION_LECTURA = 2
+# Textos que el parser de pandas convierte a bool
+TEXTOS_BOOL = {'True', 'TRUE', 'true', 'False', 'FALSE', 'false'}
+INT64_MAX = 2 ** 63 - 1
+UINT64_MAX = 2 ** 64 - 1
+# Clase de los enteros no negativos que caben en int64 (la más frecuente en columnas de código)
+ENTERO = ('entero', False, False, False)
+
+
+def _celda_a_texto(valor):
+    """Convierte el valor de una celda de código a str; los enteros guardados como float pierden el '.0'."""
+    if valor is None:
+        return np.nan
+    if isinstance(valor, float):
+        if valor != valor:
+            return np.nan
+        if valor.is_integer():
+            return str(int(valor))
+    return str(valor)
+
+
+def _celda_excel(valor):
+    """Valor de la celda como lo entrega el lector openpyxl de pd.read_excel (vacía '', float entero como int)."""
+    if valor is None:
+        return ''
+    if isinstance(valor, float):
+        if valor.is_integer():
+            return int(valor)
+        return valor
+    if isinstance(valor, str) and valor in ERROR_CODES:
+        return np.nan
+    return valor
+
+
+def _clase_excel(valor):
+    """
+    Clase del valor para la inferencia de tipos del parser de pandas: valores de una misma clase
+    llevan la columna al mismo tipo (int64, uint64, float64, bool u object).
+    """
+    if isinstance(valor, bool):
+        return 'bool'
+    if isinstance(valor, int):
+        return ('entero', valor < 0, valor > INT64_MAX, valor > UINT64_MAX)
+    if isinstance(valor, float):
+        return 'nulo' if valor != valor else 'decimal'
+    if not isinstance(valor, str):
+        return 'texto'
+    if valor in STR_NA_VALUES:
+        return 'nulo'
+    if valor.strip() in TEXTOS_BOOL:
+        return 'bool'
+    # Solo dígitos ASCII: int() y float() de Python aceptan '_' y dígitos Unicode, el parser de pandas no
+    if not valor.isascii() or '_' in valor:
+        return 'texto'
+    try:
+        return _clase_excel(int(valor))
+    except ValueError:
+        pass
+    try:
+        float(valor)
+        return 'decimal'
+    except ValueError:
+        return 'texto'
+
+
+class _InferenciaExcel:
+    """
+    Tipos de las columnas de código tal como los infería pd.read_excel: el parser de pandas mira la
+    columna completa de la hoja (todos los meses y proveedores, y las filas vacías intermedias como nulos)
+    y la convierte a número si todos sus valores lo son ('01' pasa a 1, con nulos a float) o la deja
+    object con los valores de cada celda. Como las filas se filtran mientras se leen, se guarda un valor
+    de muestra por clase (_clase_excel) y la conversión final se hace con el parser de pandas sobre las
+    filas conservadas más esas muestras.
+    """
+
+    # Textos ya clasificados que se recuerdan por columna (los códigos se repiten mucho entre filas)
+    LIMITE_VISTOS = 100000
+
+    def __init__(self, posiciones):
+        self.muestras = {posicion: {} for posicion in posiciones}
+        self._vistos = {posicion: set() for posicion in posiciones}
+
+    def registrar(self, fila):
+        for posicion, muestras in self.muestras.items():
+            # Con un texto no numérico la columna queda object: las demás clases ya no cambian el tipo
+            if 'texto' in muestras:
+                continue
+            valor = fila[posicion]
+            if type(valor) is int and 0 <= valor <= INT64_MAX and ENTERO in muestras:
+                continue
+            if type(valor) is str:
+                vistos = self._vistos[posicion]
+                if valor in vistos:
+                    continue
+                if len(vistos) < self.LIMITE_VISTOS:
+                    vistos.add(valor)
+            valor = _celda_excel(valor)
+            muestras.setdefault(_clase_excel(valor), valor)
+
+    def convertir(self, posicion, valores):
+        """Valores de la columna con el tipo inferido sobre la hoja completa."""
+        celdas = [_celda_excel(valor) for valor in valores]
+        muestras = list(self.muestras[posicion].values())
+        if not celdas and not muestras:
+            return pd.Series(dtype=object)
+        columna = PANDAS_INTERNO.TextParser(
+            [[celda] for celda in celdas + muestras], header=None, skip_blank_lines=False
+        ).read()[0]
+        return columna.iloc[:len(celdas)].reset_index(drop=True)
+
+
+def _convertir_columna(valores, tipo, inferencia=None, posicion=None):
+    """Aplica el tipo declarado a la lista de valores leídos de una columna."""
+    if tipo == 'numero':
+        return pd.to_numeric(pd.Series(valores, dtype=object), errors='coerce')
+    if tipo == 'fecha':
+        return pd.to_datetime(pd.Series(valores, dtype=object), errors='coerce')
+    return inferencia.convertir(posicion, valores)
+
+
+def _iterar_columnas(libro, hoja, columnas):
+    """Recorre la hoja en modo read-only y entrega, por fila, solo los valores de 'columnas'."""
+    filas = libro[hoja].iter_rows(values_only=True)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        raise ValueError(f"La hoja '{hoja}' está vacía")
+
+    posiciones = {}
+    for posicion, nombre in enumerate(encabezado):
+        if nombre is not None and str(nombre).strip() not in posiciones:
+            posiciones[str(nombre).strip()] = posicion
+    for columna in columnas:
+        if columna not in posiciones:
+            logger.error(f"Columna requerida no encontrada: {columna}")
+            raise KeyError(f"Columna requerida no encontrada: {columna}")
+
+    indices = [posiciones[columna] for columna in columnas]
+    vacias = 0
+    for fila in filas:
+        seleccion = [fila[indice] if indice < len(fila) else None for indice in indices]
+        if all(valor is None for valor in seleccion):
+            # Las filas vacías al final de la hoja no se entregan; las intermedias sí (read_excel las
+            # cargaba como nulos), pero recién cuando aparece una fila con datos después de ellas
+            if all(valor is None for valor in fila):
+                vacias += 1
+            else:
+                yield seleccion
+            continue
+        for _ in range(vacias):
+            yield [None] * len(indices)
+        vacias = 0
+        yield seleccion
+
+
+def _inferencia_de(columnas, tipos):
+    """Inferencia de tipos para las columnas de código (las demás tienen tipo declarado)."""
+    return _InferenciaExcel([
+        posicion for posicion, columna in enumerate(columnas) if tipos.get(columna, 'codigo') == 'codigo'
+    ])
+
+
+def _construir_frame(columnas, filas, tipos, inferencia):
+    """Arma el DataFrame a partir de las filas seleccionadas aplicando los tipos declarados."""
+    valores = list(zip(*filas)) if filas else [() for _ in columnas]
+    return pd.DataFrame({
+        columna: _convertir_columna(list(lista), tipos.get(columna, 'codigo'), inferencia, posicion)
+        for posicion, (columna, lista) in enumerate(zip(columnas, valores))
+    })
+
+
+def _periodo_de(valor):
+    """Devuelve (año, mes, fecha) de una celda de fecha, o None si no es una fecha válida."""
+    if isinstance(valor, datetime):
+        return valor.year, valor.month, valor
+    if valor is None:
+        return None
+    fecha = pd.to_datetime(valor, errors='coerce')
+    if pd.isna(fecha):
+        return None
+    return fecha.year, fecha.month, fecha.to_pydatetime()
+
+
+def leer_hoja_ventas(ruta, columnas, hoja='infoventas', tipos=None):
+    """
+    Lee solo las columnas indicadas de la hoja de ventas recorriendo las filas con openpyxl
+    en modo read-only, y aplica los tipos declarados en TIPOS_INFOVENTAS (o 'tipos').
+    """
+    tipos = dict(TIPOS_INFOVENTAS, **(tipos or {}))
+    inicio = time.perf_counter()
+
+    inferencia = _inferencia_de(columnas, tipos)
+    filas = []
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        for fila in _iterar_columnas(libro, hoja, columnas):
+            inferencia.registrar(fila)
+            if any(valor is not None for valor in fila):
+                filas.append(fila)
+    finally:
+        libro.close()
+
+    datos = _construir_frame(columnas, filas, tipos, inferencia)
+    logger.info(
+        f"Hoja '{hoja}' leída: {len(datos)} filas, {len(columnas)} columnas "
+        f"en {time.perf_counter() - inicio:.2f}s"
+    )
+    return datos
+
+
+def leer_ventas_periodo(ruta, columnas, proveedores=None, periodo=None, hoja='infoventas',
+                        columna_fecha='Fecha', columna_proveedor='Proveedor', tipos=None):
+    """
+    Lee la hoja de ventas aplicando los filtros mientras se recorren las filas:
+    - periodo: (año, mes) a conservar. Si es None se usa el mes de la fecha más reciente del archivo;
+      para eso se lleva el máximo acumulado y se descartan las filas guardadas cuando aparece un mes posterior.
+    - proveedores: lista de textos; se conservan las filas cuyo proveedor contenga alguno
+      (sin distinguir mayúsculas, igual que str.contains con el patrón escapado).
+    Solo las filas que cumplen ambos filtros se materializan. La fecha máxima de todo el archivo
+    (sin filtrar por proveedor) queda en datos.attrs['fecha_maxima'] como texto ISO y el período
+    conservado en datos.attrs['periodo'] como [año, mes].
+    """
+    tipos = dict(TIPOS_INFOVENTAS, **(tipos or {}))
+    inicio = time.perf_counter()
+    posicion_fecha = columnas.index(columna_fecha)
+    posicion_proveedor = columnas.index(columna_proveedor) if proveedores else None
+
+    filtro = FiltroProveedores(proveedores) if proveedores else None
+    inferencia = _inferencia_de(columnas, tipos)
+
+    fecha_maxima = None
+    periodo_actual = tuple(periodo) if periodo else None
+    filas = []
+    leidas = 0
+
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        for fila in _iterar_columnas(libro, hoja, columnas):
+            leidas += 1
+            # Todas las filas cuentan para el tipo de las columnas de código, aunque no se conserven
+            inferencia.registrar(fila)
+            fecha = _periodo_de(fila[posicion_fecha])
+            if fecha is None:
+                continue
+            ano_mes = fecha[:2]
+            if fecha_maxima is None or fecha[2] > fecha_maxima:
+                fecha_maxima = fecha[2]
+                if periodo is None and ano_mes != periodo_actual:
+                    # Nuevo mes más reciente: lo acumulado pertenece a un período anterior
+                    periodo_actual = ano_mes
+                    filas = []
+            if ano_mes != periodo_actual:
+                continue
+
+            if filtro is not None and not filtro.coincide(_celda_a_texto(fila[posicion_proveedor])):
+                continue
+            filas.append(fila)
+    finally:
+        libro.close()
+
+    datos = _construir_frame(columnas, filas, tipos, inferencia)
+    # attrs solo con tipos JSON: la caché los guarda en sus metadatos (quien los lee usa pd.Timestamp)
+    datos.attrs['fecha_maxima'] = fecha_maxima.isoformat() if fecha_maxima is not None else None
+    datos.attrs['periodo'] = list(periodo_actual) if periodo_actual is not None else None
+    logger.info(
+        f"Hoja '{hoja}' leída con filtros: {leidas} filas recorridas, {len(datos)} conservadas "
+        f"(período {periodo_actual}) en {time.perf_counter() - inicio:.2f}s"
+    )
+    return datos
+
+
+# Columnas de los maestros 'inter*.txt' (sin encabezado, separador '{')
+COLUMNAS_INTERASESOR = [
+    "Codigo", "Documento", "Nombre", "Apellido", "Telefono", "Direccion",
+    "Cargo", "Portafolio", "Estado", "Codigo supervisor", "Codigo bodega"
+]
+COLUMNAS_INTERSUPERVISOR = [
+    "Codigo", "Documento", "Nombre", "Apellido", "Telefono", "Direccion",
+    "Cargo", "Portafolio", "Estado", "Codigo bodega"
+]
+COLUMNAS_INTERCIUDAD = ["Código", "Nombre"]
+COLUMNAS_INTERCLIENTE = [
+    "Cod. Cliente", "Nom. Cliente", "Fecha Ingreso", "Nit", "Direccion",
+    "Telefono", "Representante Legal", "Codigo Municipio",
+    "Codigo Negocio", "Tipo Negocio", "Estracto", "Barrio"
+]
+# Comillas que se quitan de los extremos de cada línea, en este orden
+COMILLAS_INTERCLIENTE = ('"', '“', '”', "'", '`')
+
+
+def limpiar_linea(linea, comillas=COMILLAS_INTERCLIENTE):
+    """Quita espacios y comillas de los extremos de una línea (cada comilla con su propio strip, en orden)."""
+    linea = linea.strip()
+    for comilla in comillas:
+        linea = linea.strip(comilla)
+    # Equivale a re.sub(r'^"|"$', '', linea): como mucho una comilla recta por extremo
+    if linea.startswith('"'):
+        linea = linea[1:]
+    if linea.endswith('"'):
+        linea = linea[:-1]
+    return linea.strip()
+
+
+def codigo_cliente(campo):
+    """Código de intercliente.txt normalizado como en generar_clientes: sin espacios, '-' por '999' y sin comillas."""
+    return campo.strip().replace('-', '999').replace('"', '').strip()
+
+
+class LineasLimpias:
+    """
+    Archivo de solo lectura que entrega las líneas de otro ya limpias, a medida que el parser las pide:
+    la limpieza y el parseo ocurren en una sola pasada, sin archivo temporal ni copia completa en memoria.
+    'conservar' decide por línea (ya limpia) si llega al parser; las descartadas no se tokenizan.
+    """
+
+    def __init__(self, archivo, limpiar=None, conservar=None):
+        self._lineas = self._filtrar(archivo, limpiar, conservar)
+        self._pendiente = ''
+        self.caracteres = 0
+        self.leidas = 0
+        self.conservadas = 0
+
+    def _filtrar(self, archivo, limpiar, conservar):
+        for linea in archivo:
+            self.leidas += 1
+            if limpiar is not None:
+                linea = limpiar(linea) + '\n'
+            if conservar is None or conservar(linea):
+                self.conservadas += 1
+                yield linea
+
+    def read(self, tamano=-1):
+        if tamano is None or tamano < 0:
+            texto = self._pendiente + ''.join(self._lineas)
+            self._pendiente = ''
+        else:
+            partes = [self._pendiente]
+            largo = len(self._pendiente)
+            for linea in self._lineas:
+                partes.append(linea)
+                largo += len(linea)
+                if largo >= tamano:
+                    break
+            texto = ''.join(partes)
+            texto, self._pendiente = texto[:tamano], texto[tamano:]
+        self.caracteres += len(texto)
+        return texto
+
+    def __iter__(self):
+        return iter(self.read().splitlines(keepends=True))
+
+
+def _conservar_por_clave(claves, clave=None):
+    """
+    Filtro de líneas por el primer campo: conserva las que pueden pasar un isin(claves) posterior.
+    Es un filtro amplio: también deja pasar los campos entre comillas (el parser los interpreta) y los
+    que pandas lee como nulos, para que el resultado final sea el mismo que sin filtrar.
+    """
+    claves = set(claves)
+
+    def conservar(linea):
+        campo = linea.split('{', 1)[0].rstrip('\r\n')
+        if campo.startswith('"') or campo in STR_NA_VALUES:
+            return True
+        return (clave(campo) if clave is not None else campo) in claves
+
+    return conservar
+
+
+def leer_maestro(ruta, columnas, encoding='latin1', limpiar=None, claves=None, clave=None):
+    """
+    Lee un maestro 'inter*.txt' con el parser C de pandas y todas las columnas como texto: los códigos
+    conservan sus ceros a la izquierda y se comparan como str con los de ventas.
+    Las líneas con menos campos se completan con NaN y las que traen campos de más se recortan a
+    'columnas', sin importar en qué línea aparezcan. 'limpiar' se aplica a cada línea antes de parsearla.
+    Con 'claves' (códigos activos del mes) solo se parsean las líneas cuyo primer campo, normalizado con
+    'clave', está en el conjunto; quien llama conserva su isin, el filtro solo evita tokenizar el resto.
+    """
+    inicio = time.perf_counter()
+    conservar = _conservar_por_clave(claves, clave) if claves is not None else None
+    with open(ruta, 'r', encoding=encoding) as archivo:
+        origen = archivo
+        if limpiar is not None or conservar is not None:
+            origen = LineasLimpias(archivo, limpiar, conservar)
+        # Con 'names' el parser entrega un frame vacío (columnas object) si ninguna línea llega hasta él
+        datos = pd.read_csv(
+            origen,
+            sep='{',
+            engine='c',
+            dtype=str,
+            names=columnas,
+            usecols=range(len(columnas))
+        )
+
+    detalle = ''
+    if conservar is not None:
+        detalle = f" ({origen.conservadas} de {origen.leidas} líneas con código activo)"
+    logger.info(
+        f"Maestro {os.path.basename(ruta)} leído: {len(datos)} filas{detalle} "
+        f"en {time.perf_counter() - inicio:.2f}s"
+    )
+    return datos
+
+
+def leer_intercliente(ruta, comillas=COMILLAS_INTERCLIENTE, encoding='Windows-1252', clientes=None):
+    """
+    Lee intercliente.txt quitando las comillas de cada línea mientras se parsea, sin archivo temporal.
+    Con 'clientes' (códigos ya normalizados con codigo_cliente) solo se parsean esos clientes.
+    """
+    return leer_maestro(ruta, COLUMNAS_INTERCLIENTE, encoding=encoding,
+                        limpiar=lambda linea: limpiar_linea(linea, comillas),
+                        claves=clientes, clave=codigo_cliente)
+
+
+class EntradasCompartidas:
+    """
+    Insumos leídos una sola vez y compartidos por todas las empresas que se procesan en el mismo proceso:
+    ventas (infoventas), inventario, rutero y PROVEE-TSOL. Cada VentaProcessor se registra con sus
+    columnas y proveedores; la hoja de ventas se lee una vez con la unión de ambos y luego cada
+    empresa toma su parte con un filtro en memoria. Los maestros 'inter*.txt' parseados (solo los códigos
+    activos) se guardan en la caché (config 'cache.maestros') y se reutilizan mientras el archivo
+    conserve tamaño y fecha y los códigos activos no cambien.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.cache = CacheBinaria.desde_config(config)
+        self._persistir_libros = config.get('cache', {}).get('libros_excel', True)
+        self._persistir_maestros = config.get('cache', {}).get('maestros', True) and self.cache.habilitada
+        self._libros = {}
+        self._ventas = {}
+        self._ventas_proveedores = {}
+        self._columnas_ventas = []
+        self._proveedores_ventas = []
+        self._ventas_sin_filtro = False
+        self._lock = threading.Lock()
+
+    def registrar_consumidor(self, columnas, proveedores):
+        """Registra las columnas y proveedores que necesita una empresa antes de la primera lectura."""
+        for columna in columnas:
+            if columna not in self._columnas_ventas:
+                self._columnas_ventas.append(columna)
+        if not proveedores:
+            # Una empresa sin filtro de proveedores necesita todas las filas del período
+            self._ventas_sin_filtro = True
+        for proveedor in proveedores or []:
+            if proveedor not in self._proveedores_ventas:
+                self._proveedores_ventas.append(proveedor)
+
+    def libro(self, ruta):
+        """Devuelve el LibroExcel compartido para la ruta (abierto una sola vez)."""
+        clave = os.path.abspath(ruta)
+        with self._lock:
+            if clave not in self._libros:
+                self._libros[clave] = LibroExcel(ruta, cache=self.cache if self._persistir_libros else None)
+            return self._libros[clave]
+
+    def ventas_periodo(self, ruta, columnas, proveedores, periodo=None):
+        """Devuelve las ventas del período para una empresa: columnas pedidas y filas de sus proveedores."""
+        clave = (os.path.abspath(ruta), tuple(periodo) if periodo else None)
+        if clave not in self._ventas:
+            columnas_lectura = list(self._columnas_ventas) or list(columnas)
+            proveedores_lectura = None if self._ventas_sin_filtro else sorted(self._proveedores_ventas or proveedores or [])
+            self._ventas[clave] = self.cache.obtener(
+                'infoventas',
+                ruta,
+                lambda: leer_ventas_periodo(
+                    ruta,
+                    columnas_lectura,
+                    proveedores=proveedores_lectura,
+                    periodo=periodo
+                ),
+                parametros={
+                    'columnas': columnas_lectura, 'proveedores': proveedores_lectura, 'periodo': periodo,
+                    'version': VERSION_LECTURA
+                }
+            )
+            self._ventas_proveedores[clave] = proveedores_lectura
+
+        ventas = self._ventas[clave]
+        # Si la lectura ya se filtró exactamente por los proveedores de esta empresa no hace falta repetirlo
+        if proveedores and sorted(proveedores) != self._ventas_proveedores[clave]:
+            ventas = FiltroProveedores(proveedores).filtrar(ventas, 'Proveedor')
+        datos = ventas[list(columnas)]
+        datos.attrs = dict(ventas.attrs)
+        return datos
+
+    def maestro(self, ruta, columnas, encoding='latin1', comillas=None, claves=None, clave=None):
+        """
+        Devuelve un maestro 'inter*.txt' (ver leer_maestro); con 'claves' solo se parsean las líneas de
+        esos códigos (quien llama conserva su isin). Con la caché de maestros el frame leído, ya filtrado,
+        se guarda y las siguientes ejecuciones lo cargan mientras no cambien la ruta, el tamaño o la fecha
+        del archivo ni el conjunto de claves: cada conjunto de códigos activos es una entrada propia
+        (recortar() descarta las que dejan de usarse). Cada llamada entrega un frame propio que se puede modificar.
+        """
+        limpiar = (lambda linea: limpiar_linea(linea, comillas)) if comillas is not None else None
+
+        def leer():
+            return leer_maestro(ruta, columnas, encoding=encoding, limpiar=limpiar, claves=claves, clave=clave)
+
+        if not self._persistir_maestros:
+            return leer()
+        return self.cache.obtener(
+            'maestro',
+            ruta,
+            leer,
+            parametros={
+                'columnas': list(columnas), 'encoding': encoding, 'comillas': comillas,
+                # Las claves entran como conjunto de valores distintos con su tipo (igual que en CacheEtapas)
+                'claves': CacheEtapas.huella(claves=[claves]) if claves is not None else None,
+                'clave': clave.__name__ if clave is not None else None
+            },
+            contenido=False
+        )
+
+    def intercliente(self, ruta, comillas=COMILLAS_INTERCLIENTE, clientes=None):
+        """Devuelve intercliente.txt (ver leer_intercliente y maestro)."""
+        return self.maestro(ruta, COLUMNAS_INTERCLIENTE, encoding='Windows-1252', comillas=comillas,
+                            claves=clientes, clave=codigo_cliente)
+
+    def cerrar(self):
+        """Cierra los libros abiertos."""
+        for libro in self._libros.values():
+            libro.cerrar()
@@ -0,0 +1,91 @@
+# tsol_normalizacion.py
+# Normalización de columnas de códigos (clientes, SKU, tipos de negocio) evaluada una vez por valor distinto
+# Compartido por PlanosTsol_Distrijass.py, PlanosTsol_Eje.py y PlanosTsol_Colgate.py
+
+import pandas as pd
+import numpy as np
+from pandas.api.types import infer_dtype
+
+
+def _factorizable(valores):
+    """
+    True si agrupar por valor distinto no mezcla valores que la transformación trataría distinto.
+    pd.factorize considera iguales 1 y 1.0 (y -0.0 y 0.0), pero str() no; por eso solo se agrupan
+    columnas de texto o enteras y el resto se transforma fila a fila como antes.
+    """
+    if valores.dtype == object:
+        return infer_dtype(valores, skipna=True) in ('string', 'empty')
+    return valores.dtype.kind in 'iub'
+
+
+def _por_codigo(serie):
+    """
+    (códigos, Serie de valores distintos) de la columna, o None si no conviene agrupar.
+    Las columnas categóricas (frame compacto de tsol_ventas) ya traen sus códigos y categorías.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories
+        if not _factorizable(categorias):
+            return None
+        return serie.cat.codes.to_numpy(), pd.Series(categorias, dtype=categorias.dtype)
+    if not _factorizable(serie):
+        return None
+    codigos, unicos = pd.factorize(serie)
+    return codigos, pd.Series(unicos, dtype=serie.dtype)
+
+
+def normalizar_por_valor(serie, transformar, categorica=False):
+    """
+    Aplica 'transformar' (una función de Serie a Serie, p. ej. la cadena .astype(str).str.strip()...)
+    solo a los valores distintos de la columna y reparte el resultado a cada fila con un take.
+    El costo pasa a depender de la cantidad de códigos distintos y no de la cantidad de filas.
+    Los nulos se transforman con sus valores originales para conservar 'nan' / 'None' tal cual.
+    Con categorica=True devuelve directamente la columna categórica (igual que .astype('category')
+    sobre el resultado), sin volver a agrupar los textos de cada fila.
+    """
+    def original():
+        # Fila a fila una categórica se vería como texto: se transforma como la columna object original
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            return serie.astype(object)
+        # Copia propia: en pandas 2.1 astype(str) puede escribir sobre el arreglo object de origen, que
+        # puede ser una hoja compartida por varias etapas o leída desde la caché pickle
+        return serie.copy() if serie.dtype == object else serie
+
+    agrupada = _por_codigo(serie)
+    if agrupada is None:
+        resultado = transformar(original())
+        return resultado.astype('category') if categorica else resultado
+
+    codigos, unicos = agrupada
+    resultado = transformar(unicos).to_numpy(dtype=object)
+    nulos = codigos == -1
+    if categorica and not nulos.any() and infer_dtype(resultado) in ('string', 'empty'):
+        # Categorías ordenadas como las deja astype('category'); dos códigos pueden quedar en el mismo texto
+        finales, categorias = pd.factorize(resultado, sort=True)
+        categoricos = pd.Categorical.from_codes(finales.take(codigos), categories=pd.Index(categorias, dtype=object))
+        return pd.Series(categoricos, index=serie.index, name=serie.name)
+
+    # El código -1 (nulo) toma cualquier posición; esas filas se reemplazan abajo
+    valores = resultado.take(codigos) if len(resultado) else np.empty(len(codigos), dtype=object)
+    if nulos.any():
+        valores[nulos] = transformar(original()[nulos]).to_numpy(dtype=object)
+    normalizada = pd.Series(valores, index=serie.index, name=serie.name)
+    return normalizada.astype('category') if categorica else normalizada
+
+
+# Tildes y eñes que se quitan para cruzar códigos de tipología (mismas letras que se reemplazaban una a una)
+TABLA_SIN_TILDES = str.maketrans('áéíóúñÁÉÍÓÚÑ', 'aeiounAEIOUN')
+
+
+def sin_tildes(serie):
+    """
+    Texto sin espacios en los extremos y sin tildes ni eñes, calculado por valor distinto con una
+    tabla de traducción (una pasada por texto en lugar de doce reemplazos). Los nulos quedan ''.
+    """
+    def transformar(textos):
+        # Los nulos se marcan antes de astype(str): en pandas 2.1 astype(str) puede escribir 'nan' / 'None'
+        # sobre el arreglo object de origen (frames leídos desde la caché pickle) y notna() ya no los vería
+        nulos = textos.isna().to_numpy()
+        return textos.astype(str).str.strip().str.translate(TABLA_SIN_TILDES).mask(nulos, '')
+
+    return normalizar_por_valor(serie, transformar)
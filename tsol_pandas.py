@@ -0,0 +1,33 @@
+# tsol_pandas.py
+# Funciones internas de pandas con las que los módulos TSOL reproducen exactamente el resultado de
+# pd.read_excel e iterrows() del script original
+# Compartido por tsol_lectores.py y tsol_escritor.py
+
+from types import SimpleNamespace
+
+import pandas as pd
+
+
+# Versión de pandas (requirements.txt) con la que se verificó que estas funciones internas dan el
+# resultado original; al actualizar pandas hay que volver a correr tests/ y ajustar esta versión
+PANDAS_VERIFICADO = '2.1.4'
+
+
+def internos_pandas():
+    """
+    Devuelve las funciones internas de pandas que no forman parte de su API pública:
+    - STR_NA_VALUES y TextParser: inferencia de tipos de pd.read_excel (tsol_lectores._InferenciaExcel).
+    - find_common_type: tipo con el que iterrows() entrega cada fila (tsol_escritor._tipo_de_fila).
+    Lanza ImportError si la versión instalada no es PANDAS_VERIFICADO: una actualización de pandas
+    debe fallar al iniciar en lugar de cambiar en silencio los tipos y el contenido de los TXT.
+    """
+    if pd.__version__ != PANDAS_VERIFICADO:
+        raise ImportError(
+            f"pandas {pd.__version__} no está verificado para los módulos TSOL (se espera "
+            f"{PANDAS_VERIFICADO}, ver requirements.txt). Verifique la salida con tests/ y actualice "
+            f"PANDAS_VERIFICADO en tsol_pandas.py."
+        )
+    from pandas._libs.parsers import STR_NA_VALUES
+    from pandas.core.dtypes.cast import find_common_type
+    from pandas.io.parsers import TextParser
+    return SimpleNamespace(STR_NA_VALUES=STR_NA_VALUES, TextParser=TextParser, find_common_type=find_common_type)
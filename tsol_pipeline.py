@@ -0,0 +1,443 @@
+# tsol_pipeline.py
+# Planificador de etapas del generador TSOL: cada etapa declara qué datos lee y produce,
+# y las etapas independientes se ejecutan en paralelo en un pool de hilos
+# Compartido por PlanosTsol_Distrijass.py y PlanosTsol_Eje.py
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from tsol_cache import huella_archivo
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+logger = logging.getLogger()
+
+
+def memoria_pico_mb():
+    """Memoria máxima usada por el proceso actual en MB, o None si no se puede medir."""
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+    try:
+        import psutil
+        memoria = psutil.Process().memory_info()
+        return getattr(memoria, 'peak_wset', memoria.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def _texto_memoria():
+    """Sufijo de log con la memoria pico del proceso (vacío si no se puede medir)."""
+    pico = memoria_pico_mb()
+    return '' if pico is None else f" (memoria pico {pico:.0f} MB)"
+
+
+def _bloquear(ruta):
+    """
+    Abre 'ruta' y toma un bloqueo exclusivo sin esperar. Devuelve el archivo abierto (el bloqueo dura hasta
+    cerrarlo o hasta que el proceso termina, aunque sea por un error) o None si otra ejecución lo tiene.
+    """
+    archivo = None
+    try:
+        archivo = open(ruta, 'a+')
+        if fcntl is not None:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+        return archivo
+    except OSError:
+        if archivo is not None:
+            archivo.close()
+        return None
+
+
+def huella_ejecucion(config, archivos=()):
+    """
+    Huella de una ejecución: digest del config.json y del contenido de sus insumos ('archivos'; los que
+    no existen cuentan como ausentes). Solo se guarda el digest, no el config, que trae las credenciales FTP.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))
+    for ruta in archivos:
+        contenido = huella_archivo(ruta)['contenido'] if os.path.isfile(ruta) else None
+        digest.update(json.dumps([os.path.abspath(ruta), contenido]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Etapa:
+    """
+    Paso del pipeline. 'entradas' y 'salidas' son nombres lógicos (atributos del procesador como
+    'clientes_final' o archivos como 'Clientes.txt'); una etapa depende de las que producen sus entradas.
+    'estado' son los atributos del procesador que la etapa deja y que un punto de control debe guardar
+    para poder reanudar sin ejecutarla (por ejemplo 'filtered_data', 'mes' y 'ano').
+    """
+
+    def __init__(self, nombre, funcion, entradas=(), salidas=(), estado=()):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.entradas = tuple(entradas)
+        self.salidas = tuple(salidas)
+        self.estado = tuple(estado)
+
+    def __repr__(self):
+        return f"Etapa({self.nombre!r})"
+
+
+class PuntosControl:
+    """
+    Guarda en disco, al terminar cada etapa, su resultado y los atributos de su 'estado' (pickle, una
+    entrada por etapa) en una carpeta propia de la ejecución. En modo zip_directo también guarda los bytes
+    de los archivos que escribió, porque el ZIP temporal de una ejecución interrumpida no se puede reabrir.
+    Con reanudar=True se retoma la última ejecución incompleta: las etapas ya terminadas se restauran
+    en lugar de ejecutarse. finalizar() borra la carpeta cuando la ejecución termina bien.
+    Mientras corre, la ejecución tiene bloqueado el archivo BLOQUEO de su carpeta: otra ejecución de la
+    misma empresa (un segundo lanzamiento, ejecutar_todos --paralelo dos veces) no la borra ni la reanuda.
+    """
+
+    MANIFIESTO = 'ejecucion.json'
+    BLOQUEO = 'ejecucion.lock'
+
+    def __init__(self, carpeta, objeto, salida=None, reanudar=False, huella=None):
+        self.carpeta_base = carpeta
+        self.objeto = objeto
+        self.salida = salida
+        self.huella = huella
+        self.completadas = {}
+        self._lock = threading.Lock()
+        self._bloqueo = None
+
+        self.carpeta = self._ultima_ejecucion() if reanudar else None
+        if self.carpeta is None:
+            if reanudar:
+                logger.info("No hay una ejecución incompleta que reanudar; se ejecutan todas las etapas.")
+            # La carpeta queda bloqueada antes de descartar las demás; el sufijo evita choques en el mismo segundo
+            os.makedirs(carpeta, exist_ok=True)
+            self.carpeta = tempfile.mkdtemp(prefix=time.strftime('%Y%m%d_%H%M%S_'), dir=carpeta)
+            self._bloqueo = _bloquear(os.path.join(self.carpeta, self.BLOQUEO))
+            self._escribir_manifiesto()
+            self._descartar_anteriores()
+        else:
+            logger.info(f"Reanudando {self.carpeta}: {len(self.completadas)} etapas ya completadas")
+
+    @classmethod
+    def desde_config(cls, config, objeto, espacio, salida=None, reanudar=False, archivos=()):
+        """
+        Crea los puntos de control según la sección 'checkpoint' del config.json, o None si están deshabilitados.
+        La huella cubre el config y el contenido de config['files'] más los 'archivos' de la empresa (sus
+        'paths'): si el ERP vuelve a exportar un insumo, la ejecución anterior ya no se reanuda.
+        """
+        checkpoint_config = config.get('checkpoint', {})
+        if not checkpoint_config.get('habilitado', True):
+            if reanudar:
+                logger.warning("Se pidió reanudar pero los puntos de control están deshabilitados (config 'checkpoint').")
+            return None
+        huella = huella_ejecucion(config, list(config.get('files', {}).values()) + list(archivos))
+        carpeta = os.path.join(checkpoint_config.get('carpeta', 'checkpoints'), str(espacio))
+        return cls(carpeta, objeto, salida=salida, reanudar=reanudar, huella=huella)
+
+    def _ultima_ejecucion(self):
+        """
+        Carpeta de la ejecución incompleta más reciente con la misma configuración, o None. Las que
+        siguen en curso se omiten; la elegida queda bloqueada por esta ejecución.
+        """
+        if not os.path.isdir(self.carpeta_base):
+            return None
+        for nombre in sorted(os.listdir(self.carpeta_base), reverse=True):
+            ruta = os.path.join(self.carpeta_base, nombre)
+            ruta_manifiesto = os.path.join(ruta, self.MANIFIESTO)
+            if not os.path.isfile(ruta_manifiesto):
+                continue
+            bloqueo = _bloquear(os.path.join(ruta, self.BLOQUEO))
+            if bloqueo is None:
+                logger.info(f"La ejecución {nombre} sigue en curso; no se reanuda.")
+                continue
+            with open(ruta_manifiesto, 'r', encoding='utf-8') as archivo:
+                manifiesto = json.load(archivo)
+            if manifiesto.get('huella') != self.huella:
+                bloqueo.close()
+                logger.warning(f"La configuración o los insumos cambiaron desde la ejecución {nombre}; no se reanuda.")
+                return None
+            self._bloqueo = bloqueo
+            self.completadas = manifiesto.get('etapas', {})
+            return ruta
+        return None
+
+    def _descartar_anteriores(self):
+        """Borra las ejecuciones incompletas anteriores (una ejecución nueva no las reanuda), salvo las que siguen en curso."""
+        for nombre in os.listdir(self.carpeta_base):
+            ruta = os.path.join(self.carpeta_base, nombre)
+            if ruta == self.carpeta or not os.path.isdir(ruta):
+                continue
+            bloqueo = _bloquear(os.path.join(ruta, self.BLOQUEO))
+            if bloqueo is None:
+                logger.info(f"La ejecución {nombre} sigue en curso; se conservan sus puntos de control.")
+                continue
+            bloqueo.close()
+            shutil.rmtree(ruta, ignore_errors=True)
+
+    def _escribir_manifiesto(self):
+        """Escribe la lista de etapas completadas reemplazando el manifiesto anterior."""
+        ruta = os.path.join(self.carpeta, self.MANIFIESTO)
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as archivo:
+            json.dump({'huella': self.huella, 'etapas': self.completadas}, archivo)
+        os.replace(ruta + '.tmp', ruta)
+
+    def _grabar_archivos(self):
+        """En modo zip_directo, los archivos escritos por la etapa también se guardan en el punto de control."""
+        return self.salida is not None and self.salida.zip_directo
+
+    def completada(self, nombre):
+        return nombre in self.completadas
+
+    def ejecutar(self, etapa):
+        """Ejecuta la etapa y guarda su punto de control."""
+        if self._grabar_archivos():
+            with self.salida.grabar() as archivos:
+                resultado = etapa.funcion()
+        else:
+            resultado, archivos = etapa.funcion(), {}
+
+        inicio = time.perf_counter()
+        entrada = {
+            'resultado': resultado,
+            'estado': {atributo: getattr(self.objeto, atributo) for atributo in etapa.estado},
+            'archivos': archivos
+        }
+        nombre_archivo = f"{etapa.nombre}.pkl"
+        ruta = os.path.join(self.carpeta, nombre_archivo)
+        with open(ruta + '.tmp', 'wb') as archivo:
+            pickle.dump(entrada, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(ruta + '.tmp', ruta)
+        with self._lock:
+            self.completadas[etapa.nombre] = nombre_archivo
+            self._escribir_manifiesto()
+        logger.debug(f"Punto de control de '{etapa.nombre}' guardado en {time.perf_counter() - inicio:.2f}s")
+        return resultado
+
+    def restaurar(self, etapa, archivos=True):
+        """
+        Restaura el estado, los archivos y el resultado de una etapa completada en la ejecución anterior.
+        Con archivos=False no se vuelven a escribir sus archivos: las etapas que los usan ya terminaron
+        (por ejemplo, el ZIP ya se cerró y solo falta reintentar el envío FTP).
+        """
+        with open(os.path.join(self.carpeta, self.completadas[etapa.nombre]), 'rb') as archivo:
+            entrada = pickle.load(archivo)
+        for atributo, valor in entrada['estado'].items():
+            setattr(self.objeto, atributo, valor)
+        if archivos:
+            for nombre_archivo, contenido in entrada['archivos'].items():
+                self.salida.escribir_bytes(os.path.join(self.salida.output_folder, nombre_archivo), contenido)
+        return entrada['resultado']
+
+    def liberar(self):
+        """Suelta el bloqueo de la carpeta y la conserva: una ejecución con --resume puede retomarla."""
+        if self._bloqueo is not None:
+            self._bloqueo.close()
+            self._bloqueo = None
+
+    def finalizar(self):
+        """Borra la carpeta de la ejecución: ya no hay nada que reanudar."""
+        self.liberar()
+        shutil.rmtree(self.carpeta, ignore_errors=True)
+
+
+class Planificador:
+    """
+    Arma el grafo de dependencias de las etapas y las ejecuta: cada etapa arranca en cuanto terminan
+    las que producen sus entradas, con 'workers' hilos como máximo. Con workers=1 las etapas corren
+    una a una en el orden declarado. Tras ejecutar, 'duraciones' y 'ruta_critica()' muestran qué
+    cadena de etapas determina el tiempo total. Con 'puntos_control' (PuntosControl) cada etapa
+    guarda su resultado al terminar y las ya completadas en una ejecución anterior se restauran.
+    """
+
+    def __init__(self, etapas, workers=4, puntos_control=None):
+        self.etapas = {}
+        for etapa in etapas:
+            if etapa.nombre in self.etapas:
+                raise ValueError(f"Etapa duplicada: {etapa.nombre}")
+            self.etapas[etapa.nombre] = etapa
+        self.workers = max(1, int(workers or 1))
+        self.puntos_control = puntos_control
+        self.dependencias = self._construir_dependencias()
+        self.consumidores = {nombre: [] for nombre in self.etapas}
+        for nombre, dependencias in self.dependencias.items():
+            for dependencia in dependencias:
+                self.consumidores[dependencia].append(nombre)
+        self.duraciones = {}
+        self.resultados = {}
+
+    def _construir_dependencias(self):
+        """Relaciona cada etapa con las etapas que producen sus entradas."""
+        productores = {}
+        for etapa in self.etapas.values():
+            for salida in etapa.salidas:
+                if salida in productores:
+                    raise ValueError(
+                        f"'{salida}' lo producen dos etapas: {productores[salida]} y {etapa.nombre}"
+                    )
+                productores[salida] = etapa.nombre
+
+        dependencias = {}
+        for etapa in self.etapas.values():
+            dependencias[etapa.nombre] = []
+            for entrada in etapa.entradas:
+                if entrada not in productores:
+                    raise ValueError(f"Ninguna etapa produce '{entrada}', requerida por {etapa.nombre}")
+                if productores[entrada] not in dependencias[etapa.nombre]:
+                    dependencias[etapa.nombre].append(productores[entrada])
+        self._verificar_ciclos(dependencias)
+        return dependencias
+
+    def _verificar_ciclos(self, dependencias):
+        """Lanza ValueError si el grafo tiene un ciclo."""
+        estado = {}
+
+        def visitar(nombre, camino):
+            if estado.get(nombre) == 'listo':
+                return
+            if estado.get(nombre) == 'visitando':
+                raise ValueError(f"Ciclo de dependencias: {' -> '.join(camino + [nombre])}")
+            estado[nombre] = 'visitando'
+            for dependencia in dependencias[nombre]:
+                visitar(dependencia, camino + [nombre])
+            estado[nombre] = 'listo'
+
+        for nombre in dependencias:
+            visitar(nombre, [])
+
+    def orden(self):
+        """Orden de ejecución secuencial: el declarado, adelantando solo lo que una etapa necesita antes."""
+        orden = []
+
+        def agregar(nombre):
+            if nombre not in orden:
+                for dependencia in self.dependencias[nombre]:
+                    agregar(dependencia)
+                orden.append(nombre)
+
+        for nombre in self.etapas:
+            agregar(nombre)
+        return orden
+
+    def describir_grafo(self):
+        """Devuelve el grafo de dependencias como texto, una etapa por línea en el orden declarado."""
+        lineas = []
+        for nombre, dependencias in self.dependencias.items():
+            origen = ', '.join(dependencias) if dependencias else '(inicio)'
+            lineas.append(f"{nombre} <- {origen}")
+        return '\n'.join(lineas)
+
+    def ejecutar(self):
+        """Ejecuta todas las etapas respetando las dependencias; devuelve los resultados por etapa."""
+        logger.info(f"Grafo de etapas ({self.workers} hilos):\n{self.describir_grafo()}")
+        logger.info(f"Inicio del pipeline{_texto_memoria()}")
+        inicio = time.perf_counter()
+        if self.workers == 1:
+            for nombre in self.orden():
+                self._ejecutar_etapa(nombre)
+        else:
+            self._ejecutar_en_paralelo()
+        total = time.perf_counter() - inicio
+
+        ruta, duracion_ruta = self.ruta_critica()
+        logger.info(
+            f"Pipeline completado en {total:.2f}s (suma de etapas {sum(self.duraciones.values()):.2f}s). "
+            f"Ruta crítica ({duracion_ruta:.2f}s): {' -> '.join(ruta)}{_texto_memoria()}"
+        )
+        return self.resultados
+
+    def _ejecutar_etapa(self, nombre):
+        """Ejecuta una etapa y registra su duración."""
+        inicio = time.perf_counter()
+        etapa = self.etapas[nombre]
+        if self.puntos_control is None:
+            self.resultados[nombre] = etapa.funcion()
+        elif self.puntos_control.completada(nombre):
+            # Los archivos grabados solo se reescriben si alguna etapa que los usa todavía tiene que correr
+            pendientes = [consumidor for consumidor in self.consumidores[nombre]
+                          if not self.puntos_control.completada(consumidor)]
+            self.resultados[nombre] = self.puntos_control.restaurar(etapa, archivos=bool(pendientes))
+            self.duraciones[nombre] = time.perf_counter() - inicio
+            logger.info(f"Etapa '{nombre}' restaurada del punto de control en {self.duraciones[nombre]:.2f}s")
+            return nombre
+        else:
+            self.resultados[nombre] = self.puntos_control.ejecutar(etapa)
+        self.duraciones[nombre] = time.perf_counter() - inicio
+        logger.info(f"Etapa '{nombre}' terminada en {self.duraciones[nombre]:.2f}s{_texto_memoria()}")
+        return nombre
+
+    def _ejecutar_en_paralelo(self):
+        """Lanza cada etapa cuando sus dependencias terminaron; ante un error espera las que ya corren y lo relanza."""
+        pendientes = dict(self.dependencias)
+        terminadas = set()
+        en_curso = {}
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='etapa') as pool:
+            while pendientes or en_curso:
+                if error is None:
+                    # Las etapas se lanzan en el orden declarado para que el resultado sea predecible
+                    listas = [nombre for nombre, dependencias in pendientes.items()
+                              if all(dependencia in terminadas for dependencia in dependencias)]
+                    for nombre in listas:
+                        del pendientes[nombre]
+                        en_curso[pool.submit(self._ejecutar_etapa, nombre)] = nombre
+                if not en_curso:
+                    break
+
+                hechas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in hechas:
+                    nombre = en_curso.pop(futuro)
+                    try:
+                        futuro.result()
+                        terminadas.add(nombre)
+                    except Exception as e:
+                        logger.error(f"Error en la etapa '{nombre}': {e}")
+                        if error is None:
+                            error = e
+
+        if error is not None:
+            raise error
+
+    def ruta_critica(self):
+        """Cadena de etapas dependientes con mayor duración acumulada: (lista de etapas, segundos)."""
+        mejor = {}
+        for nombre in self.etapas:
+            self._acumulado(nombre, mejor)
+        if not mejor:
+            return [], 0.0
+        final = max(mejor, key=lambda nombre: mejor[nombre][0])
+        duracion, ruta = mejor[final]
+        return ruta, duracion
+
+    def _acumulado(self, nombre, mejor):
+        """Mayor duración acumulada hasta 'nombre' (incluida) y la ruta que la produce."""
+        if nombre not in mejor:
+            previo = (0.0, [])
+            for dependencia in self.dependencias[nombre]:
+                candidato = self._acumulado(dependencia, mejor)
+                if not previo[1] or candidato[0] > previo[0]:
+                    previo = candidato
+            mejor[nombre] = (previo[0] + self.duraciones.get(nombre, 0.0), previo[1] + [nombre])
+        return mejor[nombre]
@@ -0,0 +1,43 @@
+# tsol_proveedores.py
+# Filtro de proveedores (proveedores.txt o filtro_proveedores.criterios) evaluado una vez por valor distinto
+# Compartido por PlanosTsol_Distrijass.py, PlanosTsol_Eje.py, PlanosTsol_Colgate.py y tsol_lectores.py
+
+import pandas as pd
+import numpy as np
+import re
+
+
+class FiltroProveedores:
+    """
+    Decide si un proveedor pertenece a la lista: el valor es texto y contiene alguno de los proveedores
+    sin distinguir mayúsculas, igual que str.contains(patrón escapado, case=False, na=False).
+    El patrón se evalúa una sola vez por valor distinto y la decisión queda guardada, de modo que una
+    columna con millones de filas y pocos cientos de proveedores solo ejecuta pocos cientos de búsquedas.
+    """
+
+    def __init__(self, proveedores):
+        self.proveedores = list(proveedores or [])
+        # Sin proveedores el patrón queda vacío y, como str.contains(''), acepta cualquier texto
+        self._patron = re.compile('|'.join(re.escape(proveedor) for proveedor in self.proveedores), re.IGNORECASE)
+        self._decisiones = {}
+
+    def coincide(self, valor):
+        """True si el valor es texto y contiene alguno de los proveedores."""
+        try:
+            return self._decisiones[valor]
+        except KeyError:
+            decision = isinstance(valor, str) and self._patron.search(valor) is not None
+            self._decisiones[valor] = decision
+            return decision
+
+    def mascara(self, serie):
+        """Serie booleana con la decisión de cada fila, calculada por valor distinto (nulos: False)."""
+        codigos, unicos = pd.factorize(serie)
+        decisiones = np.zeros(len(unicos) + 1, dtype=bool)
+        decisiones[:-1] = [self.coincide(valor) for valor in unicos]
+        # El código -1 de pd.factorize (nulo) toma la última posición: False
+        return pd.Series(decisiones[codigos], index=serie.index, name=serie.name)
+
+    def filtrar(self, df, columna):
+        """Filas de df cuyo valor en 'columna' coincide con algún proveedor."""
+        return df[self.mascara(df[columna])]
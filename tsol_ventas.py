@@ -0,0 +1,247 @@
+# tsol_ventas.py
+# Representación compacta del frame de ventas y reglas vectorizadas de procesar_datos
+# Compartido por PlanosTsol_Distrijass.py, PlanosTsol_Eje.py, PlanosTsol_Colgate.py y tsol_escritor.py
+
+import pandas as pd
+import numpy as np
+import logging
+import time
+
+from tsol_normalizacion import normalizar_por_valor
+
+
+logger = logging.getLogger()
+
+# Códigos que se repiten muchas veces: se guardan como categorías (un entero por fila y cada texto una vez)
+COLUMNAS_CODIGO = [
+    'Código Cliente', 'Código Vendedor', 'Código Producto (Sku)', 'Numero Documento',
+    'Tipo', 'Unidad de Medida', 'Codigo bodega'
+]
+# Valores con dos decimales: se guardan como centavos enteros (Int64, los nulos quedan <NA>)
+COLUMNAS_CENTAVOS = ['Valor Total Item Vendido', 'Costo']
+
+
+def a_centavos(serie):
+    """Valores numéricos redondeados a dos decimales, como centavos enteros (Int64)."""
+    valores = pd.to_numeric(serie, errors='coerce').to_numpy(dtype='float64')
+    centavos = np.rint(np.round(valores, 2) * 100)
+    return pd.Series(pd.array(centavos, dtype='Int64'), index=serie.index, name=serie.name)
+
+
+def desde_centavos(serie):
+    """Centavos enteros a float64 con dos decimales (los <NA> quedan NaN), igual que el valor redondeado original."""
+    if serie.dtype != 'Int64':
+        return serie
+    valores = serie.to_numpy(dtype='float64', na_value=np.nan) / 100
+    return pd.Series(valores, index=serie.index, name=serie.name)
+
+
+def fecha_entera(serie):
+    """
+    Fechas como enteros AAAAMMDD (int32), solo la fecha calendario: el listado de facturas agrupaba por
+    el texto '%Y/%m/%d', así que dos líneas del mismo día con distinta hora son la misma factura.
+    Si alguna fila no tiene fecha la columna queda Int32 con <NA> (sumar_por_claves descarta esas filas).
+    """
+    if serie.dtype.kind in 'iu':
+        return serie
+    fechas = pd.to_datetime(serie)
+    enteros = fechas.dt.year * 10000 + fechas.dt.month * 100 + fechas.dt.day
+    return enteros.astype('Int32' if enteros.isna().any() else 'int32')
+
+
+def fechas_de(serie):
+    """Convierte una columna de fechas (AAAAMMDD enteros o datetime) a datetime64; los <NA> quedan NaT."""
+    if serie.dtype.kind in 'iu':
+        codigos, unicos = pd.factorize(serie)
+        fechas = pd.to_datetime(np.asarray(unicos).astype(str), format='%Y%m%d')
+        return pd.Series(fechas.take(codigos, fill_value=pd.NaT), index=serie.index, name=serie.name)
+    return pd.to_datetime(serie)
+
+
+def _compactar_columna(nombre, serie):
+    """Representación compacta de una columna de ventas según su nombre (las demás quedan igual)."""
+    if nombre in COLUMNAS_CODIGO:
+        return serie if isinstance(serie.dtype, pd.CategoricalDtype) else serie.astype('category')
+    if nombre in COLUMNAS_CENTAVOS:
+        return serie if serie.dtype == 'Int64' else a_centavos(serie)
+    if nombre == 'Fecha':
+        return fecha_entera(serie)
+    return serie
+
+
+def compactar_ventas(df):
+    """
+    Devuelve el frame de ventas con códigos categóricos, fecha entera y valores en centavos.
+    Los textos se arman solo al escribir (tsol_escritor: formatos 'fecha' y 'centavos').
+    """
+    compacto = df.assign(**{
+        columna: _compactar_columna(columna, df[columna])
+        for columna in df.columns
+        if columna in COLUMNAS_CODIGO or columna in COLUMNAS_CENTAVOS or columna == 'Fecha'
+    })
+    # Solo se mide el frame compacto: medir los textos object del original cuesta casi tanto como compactarlo
+    logger.debug(f"Frame de ventas compactado: {compacto.memory_usage(deep=True).sum() / 2**20:.1f} MB ({len(df)} filas)")
+    return compacto
+
+
+def superponer(base, columnas):
+    """
+    Variante del frame 'base' con algunas columnas reemplazadas ({nombre: Serie}), compactadas igual que
+    la base. Con Copy-on-Write (config 'memoria.ligera') las demás columnas no se copian: la variante
+    comparte los datos con la base hasta que alguna de las dos las modifique.
+    """
+    return base.assign(**{nombre: _compactar_columna(nombre, serie) for nombre, serie in columnas.items()})
+
+
+def configurar_memoria(config):
+    """
+    Activa el modo de memoria ligera (config 'memoria.ligera'): Copy-on-Write de pandas, con el que
+    selecciones, rename y assign devuelven vistas perezosas en lugar de copias completas.
+    La opción es global del proceso, así que se llama una vez desde el punto de entrada (el __main__ de
+    cada script o ejecutar_todos.py) y no al crear un VentaProcessor; devuelve True si quedó activa.
+    """
+    if config.get('memoria', {}).get('ligera', False):
+        pd.set_option('mode.copy_on_write', True)
+        logger.info("Memoria ligera: Copy-on-Write de pandas activado")
+    return bool(pd.get_option('mode.copy_on_write'))
+
+
+def _codigos_clave(serie):
+    """
+    Códigos enteros de una clave de agrupación y su cantidad de valores distintos, con los códigos en el
+    orden en que groupby(sort=True) ordena la clave: las categóricas ya traen categorías ordenadas, el
+    resto se factoriza con sort=True. Los nulos quedan en -1.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(dtype='int64'), len(serie.cat.categories)
+    codigos, unicos = pd.factorize(serie, sort=True)
+    return codigos.astype('int64'), len(unicos)
+
+
+def sumar_por_claves(df, claves, columna):
+    """
+    Suma 'columna' agrupando por varias claves, igual que groupby(claves, observed=True)[columna].sum(),
+    sobre una sola clave entera por fila: los códigos de cada clave se combinan en base mixta (y se
+    recomprimen con factorize si el producto de cardinalidades no cabe en int64). Se agrupa con
+    sort=False y solo se ordenan los grupos, para conservar el orden del listado. Las filas con alguna
+    clave nula se descartan. Devuelve (frame de claves, Serie de sumas) alineados por posición.
+    """
+    combinada = np.zeros(len(df), dtype='int64')
+    cardinalidad = 1
+    validas = np.ones(len(df), dtype=bool)
+    for clave in claves:
+        codigos, distintos = _codigos_clave(df[clave])
+        distintos = max(distintos, 1)
+        validas &= codigos != -1
+        if cardinalidad * distintos > np.iinfo('int64').max:
+            combinada, unicos = pd.factorize(combinada, sort=True)
+            combinada, cardinalidad = combinada.astype('int64'), len(unicos)
+        combinada = combinada * distintos + codigos
+        cardinalidad *= distintos
+
+    filas = np.flatnonzero(validas)
+    grupos, unicos = pd.factorize(combinada[filas], sort=False)
+    sumas = df[columna].iloc[filas].groupby(grupos, sort=False).sum()
+
+    # Primera fila de cada grupo (la asignación inversa deja la primera aparición) y orden de los grupos
+    primeras = np.empty(len(unicos), dtype='int64')
+    primeras[grupos[::-1]] = filas[::-1]
+    orden = np.argsort(unicos, kind='stable')
+
+    resumen = df[claves].iloc[primeras[orden]].reset_index(drop=True)
+    return resumen, pd.Series(sumas.array[orden], name=columna)
+
+
+class Regla:
+    """
+    Transformación de una columna del frame de ventas. 'transformar' recibe el frame completo (para
+    reglas que dependen de otra columna, como el signo según 'Tipo') y devuelve la columna nueva
+    con operaciones vectorizadas, sin funciones de Python por fila.
+    """
+
+    def __init__(self, nombre, columna, transformar):
+        self.nombre = nombre
+        self.columna = columna
+        self.transformar = transformar
+
+    def __repr__(self):
+        return f"Regla({self.nombre!r}, {self.columna!r})"
+
+
+def aplicar_reglas(df, reglas, etapa):
+    """
+    Aplica las reglas sobre df en una sola pasada: todas leen el frame de entrada y sus columnas
+    reemplazan a las originales con superponer (el resto se comparte). Registra el tiempo de cada regla.
+    """
+    columnas = {}
+    tiempos = []
+    for regla in reglas:
+        inicio = time.perf_counter()
+        columnas[regla.columna] = regla.transformar(df)
+        tiempos.append(f"{regla.nombre} {time.perf_counter() - inicio:.3f}s")
+    logger.info(f"Reglas de ventas '{etapa}' ({len(df)} filas): {', '.join(tiempos)}")
+    return superponer(df, columnas)
+
+
+def _codigo(serie, transformar):
+    """Columna de código normalizada por valor distinto y guardada directamente como categoría."""
+    return normalizar_por_valor(serie, transformar, categorica=True)
+
+
+def _positivo_si_devolucion(columna):
+    """Valor absoluto en las filas con Tipo == '1' (devoluciones); NaN / <NA> quedan igual."""
+    def transformar(df):
+        devolucion = (df['Tipo'] == '1').to_numpy(dtype=bool)
+        return df[columna].mask(devolucion, df[columna].abs())
+    return transformar
+
+
+# Tipos y formato de las columnas de ventas ya renombradas
+REGLAS_TIPOS = [
+    Regla('vendedor', 'Código Vendedor', lambda df: _codigo(df['Código Vendedor'], lambda codigos: codigos.astype(str))),
+    Regla('sku', 'Código Producto (Sku)', lambda df: _codigo(
+        df['Código Producto (Sku)'], lambda skus: skus.astype(str).str.strip().str.upper()
+    )),
+    Regla('documento', 'Numero Documento', lambda df: _codigo(df['Numero Documento'], lambda codigos: codigos.astype(str))),
+    Regla('tipo', 'Tipo', lambda df: _codigo(df['Tipo'], lambda tipos: tipos.astype(str))),
+    Regla('cantidad', 'Cantidad', lambda df: df['Cantidad'].astype(int)),
+    # Redondeo a dos decimales y centavos en un solo paso
+    Regla('valor', 'Valor Total Item Vendido', lambda df: a_centavos(df['Valor Total Item Vendido'])),
+    Regla('costo', 'Costo', lambda df: a_centavos(df['Costo'])),
+    # Reemplazar guiones en Código Cliente con "999"
+    Regla('cliente', 'Código Cliente', lambda df: _codigo(
+        df['Código Cliente'], lambda codigos: codigos.astype(str).str.replace('-', '999')
+    ))
+]
+
+# filtered_data_total: códigos de cliente y SKU sin comillas, valores con su signo original
+REGLAS_TOTAL = [
+    Regla('cliente sin comillas', 'Código Cliente', lambda df: _codigo(
+        df['Código Cliente'],
+        lambda codigos: (
+            codigos
+            .astype(str)
+            .str.strip()
+            .str.replace('-', '999')
+            .str.replace('"', '')
+            .str.replace("'", '')
+        )
+    )),
+    Regla('sku sin comillas', 'Código Producto (Sku)', lambda df: _codigo(
+        df['Código Producto (Sku)'],
+        lambda skus: (
+            skus
+            .astype(str)
+            .str.strip()
+            .str.replace('"', '')
+            .str.replace("'", '')
+        )
+    ))
+]
+
+# filtered_data: cantidades, valores y costos positivos cuando Tipo == '1'
+REGLAS_SIGNO = [
+    Regla('cantidad positiva', 'Cantidad', _positivo_si_devolucion('Cantidad')),
+    Regla('valor positivo', 'Valor Total Item Vendido', _positivo_si_devolucion('Valor Total Item Vendido')),
+    Regla('costo positivo', 'Costo', _positivo_si_devolucion('Costo'))
+]